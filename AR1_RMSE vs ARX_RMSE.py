@@ -1,4 +1,8 @@
 import pandas as pd, os, numpy as np
+
+from forecast_significance import significance
+
+SIG_WORKERS = 1   # processes for the bootstrap (1 = serial)
 # Path to your manual forecast summary (adjust depending where you saved it)
 SUM_FILE_CANDIDATES = [
     r"C:\Disertation\processed\Forecasts_manual\forecast_summary_manual.csv",
@@ -33,8 +37,26 @@ comp['delta'] = comp['AR1_RMSE'] - comp['ARX_RMSE']
 print("\nTop 10 games where ARX (with sentiment) reduced RMSE the most:")
 print(comp.sort_values('delta', ascending=False)[['game','AR1_RMSE','ARX_RMSE','delta']].head(10).to_string(index=False))
 
+# Significance: Diebold-Mariano + block bootstrap on the per-origin errors
+# written next to the summary by `forecast_models.py --backtest`
+pooled = None
+err_file = os.path.join(os.path.dirname(sum_file), "forecast_backtest_errors.csv")
+if os.path.exists(err_file):
+    per_game, pooled = significance(pd.read_csv(err_file, low_memory=False), workers=SIG_WORKERS)
+    comp = comp.merge(per_game, on='game', how='left')
+    sig = comp['DM_p'] < 0.05
+    print(f"\nARX significantly better (DM p<0.05): {(sig & (comp['mean_loss_diff'] > 0)).sum()} games, "
+          f"significantly worse: {(sig & (comp['mean_loss_diff'] < 0)).sum()} games")
+    print(f"Pooled over {pooled['n_diff']} forecasts: mean loss diff {pooled['mean_loss_diff']:.4g}, "
+          f"DM={pooled['DM_stat']:.2f} (p={pooled['DM_p']:.3g}), "
+          f"bootstrap 95% CI [{pooled['boot_ci_low']:.4g}, {pooled['boot_ci_high']:.4g}] (p={pooled['boot_p']:.3g})")
+else:
+    print("\nNo per-origin errors found (run `forecast_models.py --backtest`); significance tests skipped.")
+
 # Save
 outdir = r"C:\Disertation\processed\Company_Analysis"
 os.makedirs(outdir, exist_ok=True)
 comp.to_csv(os.path.join(outdir,"forecast_AR1_vs_ARX_comparison.csv"), index=False)
+if pooled is not None:
+    pd.DataFrame([pooled]).to_csv(os.path.join(outdir,"forecast_AR1_vs_ARX_pooled_significance.csv"), index=False)
 print("\nSaved comparison to:", outdir)
@@ -1,56 +1,104 @@
 # aggregate_monthly_sentiment_allgames.py
-# Usage: py aggregate_monthly_sentiment_allgames.py
+# Usage: py aggregate_monthly_sentiment_allgames.py [--workers N] [--full] [--store] [--check] [--profile N]
 import os
+import io
+import json
+import pstats
+import hashlib
+import argparse
+import cProfile
 import pandas as pd
 import numpy as np
 from glob import glob
 import chardet      # optional but helpful; pip install chardet
 import csv
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from sentiment_lexicon import load_lexicon
+from stage_timer import StageTimer
 
 # CONFIG - update paths if needed
 REVIEWS_FOLDER = r"C:\Disertation\reviews\game reviews"
 OUTPUT_CSV = r"C:\Disertation\processed\monthly_sentiment_50games.csv"
 LOG_CSV = r"C:\Disertation\processed\aggregation_log.csv"
+MANIFEST_FILE = r"C:\Disertation\processed\aggregation_manifest.json"   # per-file stats for incremental runs
 CHUNKSIZE = 200000   # adjust for memory / speed
+PROBE_BYTES = 65536  # start of each file read once to detect encoding, delimiter and columns
+PROFILE_DIR = r"C:\Disertation\processed\aggregation_profiles"   # --profile N: cProfile of the N slowest files
+# per-file phases timed in the log (<phase>_wall_s / <phase>_cpu_s columns)
+PHASES = ['hash', 'sniff', 'parse', 'datetime', 'scoring', 'groupby']
 
-# small keyword fallback estimator (used only if no sentiment column and no numeric score)
-keyword_weights = {
-    'excellent': 2, 'love': 2, 'great': 1.5, 'good': 1, 'fun': 1,
-    'awesome':1.5, 'amazing':2, 'best':2,
-    'hate': -2, 'broken': -1.5, 'bad': -1, 'lag': -1.5, 'crash': -2,
-    'bug': -1.5, 'slow': -1, 'disappoint': -1.5
-}
+# small keyword fallback estimator (used only if no sentiment column and no numeric score);
+# weights are the "keyword_estimate" lexicon in sentiment_lexicon.json
+KEYWORD_LEXICON = load_lexicon("keyword_estimate")
 
 def estimate_sentiment_from_text(text):
-    text = str(text).lower()
-    score = 5.0  # base midpoint (range 1..10)
-    for kw, w in keyword_weights.items():
-        if kw in text:
-            score += w
+    score = KEYWORD_LEXICON.score(str(text))  # base midpoint 5 + weight of every keyword present
     return max(1.0, min(10.0, score))
 
-def detect_encoding(path, nbytes=10000):
-    # try chardet if available (robust detection for non-utf files)
+def estimate_sentiment_batch(texts):
+    # estimate_sentiment_from_text for a whole column in one pass
+    scores = KEYWORD_LEXICON.score_many([str(t) for t in texts.tolist()])
+    return pd.Series(np.clip(scores, 1.0, 10.0), index=texts.index)
+
+def detect_encoding(raw):
+    # try chardet if available (robust detection for non-utf files) on the first bytes of a file
     try:
-        with open(path, 'rb') as f:
-            raw = f.read(nbytes)
-        res = chardet.detect(raw)
+        res = chardet.detect(raw[:10000])
         enc = res.get('encoding') or 'utf-8'
         return enc
     except Exception:
         return 'utf-8'
 
-def try_read_head(path, nrows=5):
-    # Try common separators and encodings, return dataframe or raise
-    enc = detect_encoding(path)
+def probe_file(path):
+    # one look at the start of a file: encoding, delimiter, header and column roles
+    with open(path, 'rb') as f:
+        raw = f.read(PROBE_BYTES)
+    enc = detect_encoding(raw)
+    if len(raw) == PROBE_BYTES and b'\n' in raw:
+        raw = raw[:raw.rfind(b'\n') + 1]   # whole lines only
+    sample = raw.decode(enc)
+    # the separator giving the most columns wins (ties: earlier in the list)
+    best = None
     for sep in [',',';','\t','|']:
         try:
-            return pd.read_csv(path, nrows=nrows, sep=sep, encoding=enc, low_memory=False)
+            head = pd.read_csv(io.StringIO(sample), nrows=5, sep=sep)
         except Exception:
             continue
-    # final fallback
-    return pd.read_csv(path, nrows=nrows, encoding=enc, low_memory=False)
+        if best is None or len(head.columns) > len(best[1].columns):
+            best = (sep, head)
+    if best is None:
+        raise ValueError("Unable to read file with common separators")
+    sep, head = best
+    cols = list(head.columns)
+    date_col = find_date_column(cols)
+    date_format = None
+    if date_col is not None:
+        try:
+            values = pd.read_csv(io.StringIO(sample), sep=sep, usecols=[date_col], dtype=str)[date_col]
+            date_format = detect_date_format(values)
+        except Exception:
+            pass   # sample cut inside a quoted field etc. -> generic parsing
+    roles = {'date': date_col, 'text': find_text_column(cols),
+             'sentiment': find_sentiment_column(cols), 'score': find_score_column(cols)}
+    # sentiment / score columns whose sampled values are all numbers are read as float64
+    numeric = []
+    for col in (roles['sentiment'], roles['score']):
+        if col is None:
+            continue
+        try:
+            values = pd.read_csv(io.StringIO(sample), sep=sep, usecols=[col], dtype=str)[col].dropna()
+            if pd.to_numeric(values.str.strip(), errors='coerce').notna().all():
+                numeric.append(col)
+        except Exception:
+            pass   # -> read as text
+    header_len = raw.find(b'\n') + 1 or len(raw)
+    return {'encoding': enc, 'sep': sep, 'columns': cols, 'roles': roles,
+            'date_format': date_format, 'numeric': numeric,
+            'header_len': header_len, 'header_sha1': hashlib.sha1(raw[:header_len]).hexdigest(),
+            'bytes': len(raw)}
 
 def find_date_column(cols):
     lower = [c.lower() for c in cols]
@@ -84,142 +132,588 @@ def find_score_column(cols):
             return cols[lower.index(candidate)]
     return None
 
-# iterate files and aggregate
-aggregates = []   # list of dataframes to concat
-log_records = []
-files = sorted([f for f in os.listdir(REVIEWS_FOLDER) if f.lower().endswith('.csv')])
-if not files:
-    raise SystemExit(f"No CSVs found in {REVIEWS_FOLDER}")
+# ---------- Timestamps & month keys ----------
+# The Steam scrapers write epoch seconds, the Play Store exports ISO strings. The
+# probe picks the format from its sample so chunks take a fixed-format fast path;
+# values that path cannot read (a stray other format) go through pandas' generic
+# per-value parser, so the result is never worse than parsing everything that way.
+ISO_DATE_RE = r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?'
+
+def detect_date_format(values):
+    # 'epoch_s' / 'epoch_ms' / 'iso' for the form most sampled values have, else None
+    values = values.dropna().str.strip()
+    values = values[values != '']
+    if values.empty:
+        return None
+    digits = values.str.extract(r'^(\d+)(?:\.\d*)?$')[0].str.len()
+    counts = {'epoch_s': digits.between(9, 11).sum(), 'epoch_ms': digits.between(12, 14).sum(),
+              'iso': values.str.fullmatch(ISO_DATE_RE).sum()}
+    best = max(counts, key=counts.get)
+    return best if counts[best] * 2 > len(values) else None
+
+def parse_dates(values, date_format=None):
+    # review timestamps -> UTC datetimes (NaT where unparseable)
+    if date_format in ('epoch_s', 'epoch_ms'):
+        try:
+            numbers = values.astype('float64')
+        except (ValueError, TypeError):
+            numbers = pd.to_numeric(values, errors='coerce')
+        unit = 's' if date_format == 'epoch_s' else 'ms'
+        dates = pd.to_datetime(numbers, unit=unit, errors='coerce', utc=True)
+    elif date_format == 'iso':
+        dates = pd.to_datetime(values, format='ISO8601', errors='coerce', utc=True)
+    else:
+        return pd.to_datetime(values, errors='coerce', utc=True)
+    rest = dates.isna() & values.notna()
+    if rest.any():
+        dates[rest] = pd.to_datetime(values[rest], errors='coerce', utc=True)
+    return dates
+
+def month_keys(dates):
+    # UTC datetimes -> integer month key year*12 + month (cheap to group on)
+    months = dates.dt.tz_localize(None).to_numpy().astype('datetime64[M]').astype('int64')
+    return pd.Series(months + (1970 * 12 + 1), index=dates.index)
+
+def month_key_text(keys):
+    # integer month keys -> "YYYY-MM" (formatted once per distinct month)
+    keys = pd.Series(keys)
+    labels = {k: f"{(k - 1) // 12:04d}-{(k - 1) % 12 + 1:02d}" for k in keys.unique().tolist()}
+    return keys.map(labels)
+
+def month_key_from_text(values):
+    # "YYYY-MM" labels (e.g. store partitions) -> integer month keys
+    values = pd.Series(values, dtype=object)
+    keys = {v: int(v[:4]) * 12 + int(v[5:7]) for v in values.unique().tolist()}
+    return values.map(keys).astype('int64')
+
+# ---------- Mergeable monthly statistics ----------
+# Partial aggregates hold sufficient statistics per (game, month_key), so chunk,
+# file and worker results can be merged in any order into exact weighted means.
+GROUP_KEYS = ['game','month_key']
+
+def chunk_stats(df):
+    # sentiment_score rows -> (sum, sum of squares, count, min, max) per game & month
+    g = df.assign(sentiment_sq=df['sentiment_score'] ** 2).groupby(GROUP_KEYS)
+    stats = g['sentiment_score'].agg(['sum','count','min','max'])
+    stats['sum_sq'] = g['sentiment_sq'].sum()
+    return stats[['sum','sum_sq','count','min','max']].reset_index()
+
+def merge_stats(frames):
+    # associative merge of chunk_stats frames
+    df = pd.concat(frames, ignore_index=True)
+    return df.groupby(GROUP_KEYS).agg({'sum':'sum','sum_sq':'sum','count':'sum','min':'min','max':'max'}).reset_index()
+
+def finalize_stats(df):
+    # merged stats -> monthly output columns (std is the sample std, NaN for one review)
+    n = df['count']
+    mean = df['sum'] / n
+    var = ((df['sum_sq'] - n * mean ** 2) / (n - 1)).clip(lower=0)
+    out = pd.DataFrame({'game': df['game'], 'year_month': month_key_text(df['month_key'])})
+    out['avg_sentiment'] = mean
+    out['review_count'] = n
+    out['sentiment_std'] = np.sqrt(var.where(n > 1))
+    out['sentiment_min'] = df['min']
+    out['sentiment_max'] = df['max']
+    return out
+
+# ---------- Manifest (incremental runs) ----------
+# Per-file partial stats are kept between runs, keyed by path, size, mtime and
+# content hash: unchanged files are skipped, and files that only grew at the end
+# (scraper output) have just the appended bytes read.
+MANIFEST_VERSION = 4
+
+def hash_file(path, prefix_len=None):
+    # sha1 of the whole file, plus sha1 of its first prefix_len bytes if asked
+    h = hashlib.sha1()
+    prefix = None
+    with open(path, 'rb') as f:
+        if prefix_len is not None:
+            left = prefix_len
+            while left > 0:
+                block = f.read(min(1 << 20, left))
+                if not block:
+                    break
+                h.update(block)
+                left -= len(block)
+            prefix = h.hexdigest() if left == 0 else None
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest(), prefix
+
+def manifest_settings():
+    # anything that changes per-file stats without touching the review files
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_lexicon.json"), 'rb') as f:
+        lexicon_hash = hashlib.sha1(f.read()).hexdigest()
+    return {'version': MANIFEST_VERSION, 'lexicon': lexicon_hash}
+
+def load_manifest(path):
+    # {file path: entry}; empty if missing, unreadable or built with other settings
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('settings') != manifest_settings():
+        print("Manifest settings changed -> full rescan")
+        return {}
+    entries = data.get('files', {})
+    for entry in entries.values():
+        entry['stats'] = pd.DataFrame(entry['stats'])
+    return entries
+
+def save_manifest(path, entries):
+    files = {}
+    for key, entry in entries.items():
+        files[key] = dict(entry, stats=entry['stats'].to_dict(orient='list'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'settings': manifest_settings(), 'files': files}, f)
+    os.replace(tmp, path)   # never leave a half-written manifest behind
+
+def review_columns(probe):
+    # (date, text, sentiment, score) column names of a probed file, None where absent
+    roles = probe['roles']
+    return tuple(roles[k].strip() if roles[k] else None for k in ('date', 'text', 'sentiment', 'score'))
+
+def iter_review_chunks(source, probe, game_name, record, timer=None):
+    # chunked read of a review CSV (path or file object) yielding chunks with parsed
+    # dates and a game column. Only the date / text / sentiment / score (and game)
+    # columns are parsed.
+    timer = timer or StageTimer()
+    date_col, text_col, sent_col, score_col = review_columns(probe)
+    if date_col is None:
+        # cannot find timestamps in this file -> skip
+        return
+    wanted = {date_col, text_col, sent_col, score_col, 'game'} - {None}
+    usecols = [c for c in probe['columns'] if c.strip() in wanted]
+    # every column gets an explicit dtype: numbers as float64 where the probe saw only
+    # numbers, the rest (and any sentiment / score column with text in it) as str
+    numeric = probe.get('numeric', [])
+    dtype = {c: 'float64' if c in numeric else str for c in usecols}
+    record['columns_read'] = f"{len(usecols)}/{len(probe['columns'])}"
+    with timer.stage('parse'):
+        reader = iter(pd.read_csv(source, chunksize=CHUNKSIZE, encoding=probe['encoding'], sep=probe['sep'],
+                                  usecols=usecols, dtype=dtype, low_memory=False))
+    while True:
+        with timer.stage('parse'):
+            chunk = next(reader, None)
+        if chunk is None:
+            break
+        timer.count('chunks')
+        record['peak_chunk_mb'] = max(record.get('peak_chunk_mb', 0), chunk.memory_usage(deep=True).sum() / 2**20)
+        # unify columns
+        chunk.columns = [c.strip() for c in chunk.columns]
+
+        # parse datetime
+        with timer.stage('datetime'):
+            chunk[date_col] = parse_dates(chunk[date_col], probe.get('date_format'))
+            chunk = chunk.dropna(subset=[date_col])    # drop rows with no date
+        if chunk.empty:
+            continue
+
+        # set game column if not present
+        if 'game' not in chunk.columns:
+            chunk['game'] = game_name
+        yield chunk
+
+def score_scale(minv, maxv):
+    # (a, b): a store score x maps to a * x + b on 1..10 (best-effort)
+    # detect typical scale: if max <=5 assume 1-5 scale; if <=10 assume 1-10 else rescale
+    if pd.notna(maxv) and 5 < maxv <= 10:
+        return 1.0, 0.0  # already ~1..10
+    if not maxv > minv:
+        return np.nan, np.nan  # one distinct score (or none): every value is NaN
+    # min-max to 1..10
+    a = 9 / (maxv - minv)
+    return a, 1 - minv * a
+
+def review_sentiment(chunk, sent_col, score_col, text_col, score_range=None):
+    # sentiment per row on the 1..10 scale, or None if the chunk has no usable column.
+    # Store scores are rescaled by the chunk's own min / max unless score_range is given.
+    if sent_col and sent_col in chunk.columns:
+        return pd.to_numeric(chunk[sent_col], errors='coerce')
+    elif score_col and score_col in chunk.columns:
+        sc = pd.to_numeric(chunk[score_col], errors='coerce')
+        if score_range is None:
+            score_range = (sc.min(skipna=True), sc.max(skipna=True))
+        a, b = score_scale(*score_range)
+        return sc * a + b
+    elif text_col and text_col in chunk.columns:
+        return estimate_sentiment_batch(chunk[text_col])
+    return None
+
+def rescale_stats(df, score_range):
+    # stats of raw store scores -> stats of the rescaled ones (score_scale is affine,
+    # so sum, sum of squares, min and max map over directly)
+    a, b = score_scale(*score_range)
+    if np.isnan(a):
+        return df.assign(sum=0.0, sum_sq=0.0, count=0, min=np.nan, max=np.nan)
+    n = df['count']
+    return df.assign(sum=a * df['sum'] + b * n,
+                     sum_sq=a * a * df['sum_sq'] + 2 * a * b * df['sum'] + b * b * n,
+                     min=a * df['min'] + b, max=a * df['max'] + b)
+
+def float_parse_error(e):
+    # the error read_csv raises for text in a column read as float64; decoding errors
+    # and malformed rows (ValueError subclasses) are not retried
+    return type(e) is ValueError and str(e).startswith("could not convert string to float")
+
+def read_stats(source, probe, game_name, record, timer=None):
+    # chunked read of a review CSV (path or file object) -> (merged stats or None,
+    # score range). When the sentiment comes from a store score column the stats are
+    # of the raw scores and the range is their (min, max) (None for other files);
+    # rescale_stats turns them into 1..10 sentiment, with this or a stored range.
+    try:
+        return _read_stats(source, probe, game_name, record, timer)
+    except ValueError as e:
+        if not (probe.get('numeric') and float_parse_error(e)):
+            raise
+    # a sentiment / score value past the probed sample is not a number -> read the
+    # file again with those columns as text (to_numeric turns such values into NaN)
+    print(f"Non-numeric {'/'.join(probe['numeric'])} values in {game_name} -> reading them as text")
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    record['rows_processed'] = 0
+    return _read_stats(source, dict(probe, numeric=[]), game_name, record, timer)
+
+def _read_stats(source, probe, game_name, record, timer):
+    timer = timer or StageTimer()
+    date_col, text_col, sent_col, score_col = review_columns(probe)
+    raw = sent_col is None and score_col is not None   # raw store scores, rescaled later
+    minv = maxv = np.nan
+    month_rows = []  # will collect per-chunk aggregates
+    for chunk in iter_review_chunks(source, probe, game_name, record, timer):
+        # determine sentiment per row
+        with timer.stage('scoring'):
+            if raw:
+                score = pd.to_numeric(chunk[score_col], errors='coerce')
+                minv, maxv = np.fmin(minv, score.min()), np.fmax(maxv, score.max())
+            else:
+                score = review_sentiment(chunk, sent_col, score_col, text_col)
+        if score is None:
+            # no way to compute sentiment -> skip chunk
+            continue
+        chunk['sentiment_score'] = score
 
-for fn in files:
+        # month key
+        with timer.stage('datetime'):
+            chunk['month_key'] = month_keys(chunk[date_col])
+
+        with timer.stage('groupby'):
+            month_rows.append(chunk_stats(chunk))
+        record['rows_processed'] += len(chunk)
+
+    # merge chunk stats (some months may be repeated from multiple chunks)
+    with timer.stage('groupby'):
+        stats = merge_stats(month_rows) if month_rows else None
+    return stats, (None if not raw or np.isnan(minv) else [float(minv), float(maxv)])
+
+def process_file(fn, entry=None, profile_dir=None):
+    # aggregate one review file -> (monthly stats or None, log record, message,
+    # manifest entry or None). `entry` is the file's entry from the last run.
+    # The log record gets wall / CPU time per phase, throughput and peak memory;
+    # with profile_dir the run is also profiled into <profile_dir>/<fn>.prof.
+    timer = StageTimer()
+    if profile_dir is None:
+        result = _process_file(fn, entry, timer)
+    else:
+        prof = cProfile.Profile()
+        result = prof.runcall(_process_file, fn, entry, timer)
+        os.makedirs(profile_dir, exist_ok=True)
+        prof.dump_stats(os.path.join(profile_dir, fn + '.prof'))
+    record = result[1]
+    record.update(timer.columns(rows=record['rows_processed'], nbytes=record['bytes_read'], stages=PHASES))
+    return result
+
+def _process_file(fn, entry, timer):
     path = os.path.join(REVIEWS_FOLDER, fn)
     filesize = os.path.getsize(path)
-    record = {'file': fn, 'size_bytes': filesize, 'status': 'ok', 'rows_processed': 0}
+    mtime = os.path.getmtime(path)
+    record = {'file': fn, 'size_bytes': filesize, 'status': 'ok', 'rows_processed': 0,
+              'bytes_read': 0, 'columns_read': '', 'peak_chunk_mb': 0.0}
     if filesize < 50:   # tiny/empty file
         record['status'] = 'empty_or_too_small'
-        log_records.append(record)
-        print(f"Skipping (empty/small): {fn}")
-        continue
+        return None, record, f"Skipping (empty/small): {fn}", None
+
+    # Determine game name from filename (strip extension)
+    game_name = os.path.splitext(fn)[0].strip()
 
+    probe = None
     try:
-        # Read head to detect columns & separator/encoding
-        head = try_read_head(path, nrows=5)
+        if entry is not None:
+            if entry['size'] == filesize and entry['mtime'] == mtime:
+                record['status'] = 'unchanged'
+                return entry['stats'], record, f"Unchanged {fn}: reused manifest", entry
+            with timer.stage('hash'):
+                digest, prefix = hash_file(path, entry['size'] if filesize >= entry['size'] else None)
+            if digest == entry['sha1']:
+                record['status'] = 'unchanged'
+                return entry['stats'], record, f"Unchanged {fn}: reused manifest", dict(entry, mtime=mtime)
+            with open(path, 'rb') as f:
+                header = f.read(entry['probe']['header_len'])
+                f.seek(entry['size'])
+                tail = f.read() if prefix == entry['sha1'] and entry['ends_with_newline'] else None
+            stats = None
+            if tail is not None:
+                # only appended: parse the new bytes under the original header line
+                record['bytes_read'] = len(header) + len(tail)
+                stats, tail_range = read_stats(io.BytesIO(header + tail), entry['probe'], game_name, record, timer)
+                # appended store scores must fall inside the range the stored stats were
+                # rescaled with, else every row's score changes -> full rescan
+                old_range = entry['score_range']
+                if tail_range is not None and (old_range is None or tail_range[0] < old_range[0]
+                                               or tail_range[1] > old_range[1]):
+                    print(f"Appended scores of {fn} outside the stored range -> full rescan")
+                    tail = None
+                    record['rows_processed'] = 0
+                elif stats is not None and tail_range is not None:
+                    stats = rescale_stats(stats, old_range)
+            if hashlib.sha1(header).hexdigest() == entry['probe']['header_sha1']:
+                probe = entry['probe']   # same header line: the cached probe still applies
+            if tail is not None:
+                if stats is not None:
+                    with timer.stage('groupby'):
+                        stats = merge_stats([entry['stats'], stats])
+                else:
+                    stats = entry['stats']
+                record['status'] = 'appended'
+                new_entry = dict(entry, size=filesize, mtime=mtime, sha1=digest, stats=stats,
+                                 ends_with_newline=tail.endswith(b'\n') if tail else entry['ends_with_newline'])
+                return stats, record, f"Appended {fn}: rows={record['rows_processed']}", new_entry
     except Exception as e:
-        record['status'] = f'error_read_head: {e}'
-        log_records.append(record)
-        print(f"Error reading head of {fn}: {e}")
-        continue
-
-    cols = list(head.columns)
-    date_col = find_date_column(cols)
-    text_col = find_text_column(cols)
-    sent_col = find_sentiment_column(cols)
-    score_col = find_score_column(cols)
+        print(f"Manifest entry unusable for {fn} ({e}) -> full rescan")
 
-    # Determine game name from filename (strip extension)
-    game_name = os.path.splitext(fn)[0].strip()
+    if probe is None:
+        try:
+            # detect encoding, separator and columns once
+            with timer.stage('sniff'):
+                probe = probe_file(path)
+        except Exception as e:
+            record['status'] = f'error_read_head: {e}'
+            return None, record, f"Error reading head of {fn}: {e}", None
+        record['bytes_read'] += probe['bytes']
 
     # Read in chunks for memory-efficiency
-    month_rows = []  # will collect per-chunk aggregates
     try:
-        enc = detect_encoding(path)
-        # try separators
-        reader = None
-        for sep in [',',';','\t','|']:
-            try:
-                reader = pd.read_csv(path, chunksize=CHUNKSIZE, encoding=enc, sep=sep, low_memory=False)
-                # quick sanity check: first chunk should have expected cols
-                first = next(reader)
-                # restore iterator (create new)
-                reader = pd.read_csv(path, chunksize=CHUNKSIZE, encoding=enc, sep=sep, low_memory=False)
-                break
-            except Exception:
-                reader = None
-                continue
-        if reader is None:
-            raise ValueError("Unable to read file with common separators")
+        df_file, score_range = read_stats(path, probe, game_name, record, timer)
+        if df_file is not None and score_range is not None:
+            df_file = rescale_stats(df_file, score_range)
+        record['bytes_read'] += filesize
+        if df_file is not None:
+            record['status'] = 'aggregated'
+        else:
+            record['status'] = 'no_valid_rows'
+        new_entry = None
+        if df_file is not None:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                ends_with_newline = f.read(1) == b'\n'
+            with timer.stage('hash'):
+                digest = hash_file(path)[0]
+            new_entry = {'size': filesize, 'mtime': mtime, 'sha1': digest,
+                         'ends_with_newline': ends_with_newline, 'probe': probe,
+                         'score_range': score_range, 'stats': df_file}
+        return df_file, record, (f"Processed {fn}: status={record['status']} rows={record['rows_processed']} "
+                                 f"columns={record['columns_read']} peak_chunk={record['peak_chunk_mb']:.1f}MB"), new_entry
 
-        for chunk in reader:
-            # unify columns
-            chunk.columns = [c.strip() for c in chunk.columns]
+    except Exception as e:
+        record['status'] = f'error:{e}'
+        return None, record, f"Error processing {fn}: {e}", None
 
-            # pick date col
-            if date_col and date_col in chunk.columns:
-                dcol = date_col
+def process_store_game(game, dataset):
+    # monthly stats of one game from the Parquet review store (review_store.py); only
+    # the partition's year_month and the one column the sentiment comes from are read
+    import review_store
+    record = {'file': f'store:{game}', 'size_bytes': 0, 'status': 'ok', 'rows_processed': 0,
+              'bytes_read': 0, 'columns_read': '', 'peak_chunk_mb': 0.0}
+    timer = StageTimer()
+    flt = review_store.store_filter(games=[game])
+    # same precedence as for CSVs: sentiment column, else store score, else text.
+    # Store scores are rescaled by the game's overall min / max.
+    sent_col = score_col = text_col = score_range = None
+    for col in ('sentiment', 'score'):
+        values = dataset.to_table(columns=[col], filter=flt).column(col).to_pandas()
+        if values.notna().any():
+            if col == 'sentiment':
+                sent_col = col
             else:
-                # attempt to auto-detect in chunk
-                dcol = find_date_column(chunk.columns)
-            if dcol is None:
-                # cannot find timestamps in this file -> skip
-                continue
+                score_col, score_range = col, (values.min(), values.max())
+            break
+    else:
+        text_col = 'review'
+    record['columns_read'] = f"1/{len(review_store.STORE_COLUMNS)}"
+    month_rows = []
+    batches = iter(review_store.iter_review_batches(['year_month', sent_col or score_col or text_col], games=[game],
+                                                    batch_size=CHUNKSIZE, dataset=dataset))
+    while True:
+        with timer.stage('parse'):
+            chunk = next(batches, None)
+        if chunk is None:
+            break
+        timer.count('chunks')
+        record['peak_chunk_mb'] = max(record['peak_chunk_mb'], chunk.memory_usage(deep=True).sum() / 2**20)
+        with timer.stage('scoring'):
+            chunk['sentiment_score'] = review_sentiment(chunk, sent_col, score_col, text_col, score_range)
+        with timer.stage('datetime'):
+            chunk['month_key'] = month_key_from_text(chunk['year_month'])
+        chunk['game'] = game
+        with timer.stage('groupby'):
+            month_rows.append(chunk_stats(chunk))
+        record['rows_processed'] += len(chunk)
+    with timer.stage('groupby'):
+        df_game = merge_stats(month_rows) if month_rows else None
+    record['status'] = 'aggregated' if df_game is not None else 'no_valid_rows'
+    record.update(timer.columns(rows=record['rows_processed'], stages=PHASES))
+    return df_game, record, f"Processed store:{game}: status={record['status']} rows={record['rows_processed']}", None
 
-            # parse datetime
-            chunk[dcol] = pd.to_datetime(chunk[dcol], errors='coerce', utc=True)
-            chunk = chunk.dropna(subset=[dcol])    # drop rows with no date
-            if chunk.empty:
-                continue
+def failed_result(fn, error):
+    # process_file-style result for a file whose worker raised or died
+    record = {'file': fn, 'size_bytes': os.path.getsize(os.path.join(REVIEWS_FOLDER, fn)),
+              'status': f'error:{error}', 'rows_processed': 0}
+    return None, record, f"Error processing {fn}: {error}", None
 
-            # determine sentiment per row
-            if sent_col and sent_col in chunk.columns:
-                chunk['sentiment_score'] = pd.to_numeric(chunk[sent_col], errors='coerce')
-            elif score_col and score_col in chunk.columns:
-                # map store score range to 1..10 (best-effort)
-                # detect typical scale: if max <=5 assume 1-5 scale; if <=10 assume 1-10 else rescale
-                sc = pd.to_numeric(chunk[score_col], errors='coerce')
-                maxv = sc.max(skipna=True)
-                minv = sc.min(skipna=True)
-                if pd.notna(maxv) and maxv <= 5:
-                    chunk['sentiment_score'] = ((sc - minv) / (maxv - minv)) * 9 + 1
-                elif pd.notna(maxv) and maxv <= 10:
-                    chunk['sentiment_score'] = sc  # already ~1..10
-                else:
-                    # generic min-max to 1..10
-                    chunk['sentiment_score'] = ((sc - minv) / (maxv - minv)) * 9 + 1
-            elif text_col and text_col in chunk.columns:
-                chunk['sentiment_score'] = chunk[text_col].apply(estimate_sentiment_from_text)
-            else:
-                # no way to compute sentiment -> skip chunk
+def run_in_pool(fn_list, workers, results, index, manifest, profile_dir=None):
+    # submit files to one pool, store results; returns the files lost to a dead worker
+    crashed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, fn, manifest.get(os.path.join(REVIEWS_FOLDER, fn)), profile_dir): fn
+                   for fn in fn_list}
+        for fut in as_completed(futures):
+            fn = futures[fut]
+            try:
+                results[index[fn]] = fut.result()
+            except BrokenProcessPool:
+                crashed.append(fn)
                 continue
+            except Exception as e:
+                results[index[fn]] = failed_result(fn, e)
+            print(results[index[fn]][2])
+    return sorted(crashed)
+
+def process_files_parallel(files, workers, manifest, profile_dir=None):
+    # run process_file over a process pool; results come back in `files` order.
+    # Only the small per-file monthly stats are sent back to the parent.
+    results = [None] * len(files)
+    index = {fn: i for i, fn in enumerate(files)}
+    crashed = run_in_pool(files, workers, results, index, manifest, profile_dir)
+    # a worker that dies (e.g. out of memory) takes the whole pool down with it:
+    # retry the unfinished files one per pool, so only the culprit is lost
+    for fn in crashed:
+        if run_in_pool([fn], 1, results, index, manifest, profile_dir):
+            results[index[fn]] = failed_result(fn, 'worker process crashed')
+            print(results[index[fn]][2])
+    return results
+
+def keep_slowest_profiles(profile_dir, records, n):
+    # keep the .prof of the n slowest files (plus a readable top-30 .txt), drop the rest
+    timed = sorted((r for r in records if 'wall_s' in r), key=lambda r: r['wall_s'], reverse=True)
+    for i, r in enumerate(timed):
+        path = os.path.join(profile_dir, r['file'] + '.prof')
+        if not os.path.exists(path):
+            continue
+        if i >= n:
+            os.remove(path)
+            continue
+        with open(path[:-5] + '.txt', 'w', encoding='utf-8') as out:
+            out.write(f"{r['file']}: {r['wall_s']:.2f}s wall, {r['rows_processed']} rows\n")
+            pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(30)
+        print(f"Profile of {r['file']} ({r['wall_s']:.2f}s): {path}")
 
-            # month key
-            chunk['year_month'] = chunk[dcol].dt.to_period('M').astype(str)
+def check_appended(files, results):
+    # re-read every appended file in full and compare with its incremental stats
+    # -> names of the files that differ
+    differ = []
+    for fn, (df_file, record, message, entry) in zip(files, results):
+        if record['status'] != 'appended':
+            continue
+        full = process_file(fn)[0]
+        a, b = finalize_stats(df_file), None if full is None else finalize_stats(full)
+        same = (b is not None and a.shape == b.shape and a['year_month'].equals(b['year_month'])
+                and np.allclose(a.iloc[:, 2:], b.iloc[:, 2:], rtol=1e-12, atol=0, equal_nan=True))
+        print(f"Check {fn}: {'matches' if same else 'DIFFERS from'} a full re-read")
+        if not same:
+            differ.append(fn)
+    return differ
 
-            # set game column if not present
-            if 'game' not in chunk.columns:
-                chunk['game'] = game_name
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate monthly sentiment for all review files.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes (default 1 = serial)")
+    parser.add_argument('--full', action='store_true',
+                        help="ignore the manifest and re-read every file")
+    parser.add_argument('--store', action='store_true',
+                        help="read the Parquet review store (built by review_store.py) instead of the CSVs")
+    parser.add_argument('--profile', type=int, metavar='N', default=0,
+                        help=f"cProfile every file, keep the N slowest in {PROFILE_DIR}")
+    parser.add_argument('--check', action='store_true',
+                        help="re-read appended files in full and fail if their stats differ")
+    args = parser.parse_args()
 
-            agg = chunk.groupby(['game','year_month'])['sentiment_score'].agg(['mean','count']).reset_index()
-            agg.rename(columns={'mean':'avg_sentiment','count':'review_count'}, inplace=True)
-            month_rows.append(agg)
-            record['rows_processed'] += len(chunk)
+    # iterate files and aggregate
+    aggregates = []   # list of dataframes to concat
+    log_records = []
+    if args.store:
+        import review_store
+        games = review_store.store_games()
+        if not games:
+            raise SystemExit(f"No games found in {review_store.STORE_DIR} (run review_store.py first)")
+        dataset = review_store.open_store()
+        results = []
+        for game in games:
+            results.append(process_store_game(game, dataset))
+            print(results[-1][2])
+        for df_game, record, message, entry in results:
+            if df_game is not None:
+                aggregates.append(df_game)
+            log_records.append(record)
+    else:
+        files = sorted([f for f in os.listdir(REVIEWS_FOLDER) if f.lower().endswith('.csv')])
+        if not files:
+            raise SystemExit(f"No CSVs found in {REVIEWS_FOLDER}")
+        manifest = {} if args.full else load_manifest(MANIFEST_FILE)
+        profile_dir = PROFILE_DIR if args.profile > 0 else None
+        if profile_dir and os.path.isdir(profile_dir):
+            for old in glob(os.path.join(profile_dir, '*.prof')) + glob(os.path.join(profile_dir, '*.txt')):
+                os.remove(old)
 
-        if month_rows:
-            df_file = pd.concat(month_rows, ignore_index=True)
-            # reduce by regrouping (some months may be repeated from multiple chunks)
-            df_file = df_file.groupby(['game','year_month']).agg({'avg_sentiment':'mean','review_count':'sum'}).reset_index()
-            aggregates.append(df_file)
-            record['status'] = 'aggregated'
+        if args.workers > 1:
+            results = process_files_parallel(files, args.workers, manifest, profile_dir)
         else:
-            record['status'] = 'no_valid_rows'
-        log_records.append(record)
-        print(f"Processed {fn}: status={record['status']} rows={record['rows_processed']}")
+            results = []
+            for fn in files:
+                results.append(process_file(fn, manifest.get(os.path.join(REVIEWS_FOLDER, fn)), profile_dir))
+                print(results[-1][2])
+        if profile_dir:
+            keep_slowest_profiles(profile_dir, [r[1] for r in results], args.profile)
 
-    except Exception as e:
-        record['status'] = f'error:{e}'
-        log_records.append(record)
-        print(f"Error processing {fn}: {e}")
-
-# combine all aggregates
-if aggregates:
-    all_df = pd.concat(aggregates, ignore_index=True)
-    all_df = all_df.groupby(['game','year_month']).agg({'avg_sentiment':'mean','review_count':'sum'}).reset_index()
-    os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
-    all_df.to_csv(OUTPUT_CSV, index=False)
-    print("Wrote aggregated monthly sentiment to:", OUTPUT_CSV)
-else:
-    print("No aggregates created (no valid data).")
-
-# write log
-os.makedirs(os.path.dirname(LOG_CSV), exist_ok=True)
-pd.DataFrame(log_records).to_csv(LOG_CSV, index=False)
-print("Wrote log to:", LOG_CSV)
+        # collect in file order, so the output does not depend on which file finished first
+        new_manifest = {}
+        for fn, (df_file, record, message, entry) in zip(files, results):
+            if df_file is not None:
+                aggregates.append(df_file)
+            log_records.append(record)
+            if entry is not None:
+                new_manifest[os.path.join(REVIEWS_FOLDER, fn)] = entry
+        save_manifest(MANIFEST_FILE, new_manifest)
+
+    differ = check_appended(files, results) if args.check and not args.store else []
+
+    # combine all aggregates
+    if aggregates:
+        all_df = finalize_stats(merge_stats(aggregates))
+        os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
+        all_df.to_csv(OUTPUT_CSV, index=False)
+        print("Wrote aggregated monthly sentiment to:", OUTPUT_CSV)
+    else:
+        print("No aggregates created (no valid data).")
+
+    # write log
+    os.makedirs(os.path.dirname(LOG_CSV), exist_ok=True)
+    pd.DataFrame(log_records).to_csv(LOG_CSV, index=False)
+    print("Wrote log to:", LOG_CSV)
+    if differ:
+        raise SystemExit(f"--check: {len(differ)} appended file(s) differ from a full re-read: {', '.join(differ)}")
+
+if __name__ == "__main__":
+    main()
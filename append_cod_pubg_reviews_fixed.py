@@ -1,67 +1,158 @@
 import os
+import json
+import shutil
+import argparse
 import pandas as pd
 
 # === Paths ===
 reviews_folder = r"C:\Disertation\reviews\game reviews"
 combined_reviews_file = r"C:\Disertation\reviews\combined_reviews_50_games_ordered.csv"
 output_file = r"C:\Disertation\reviews\combined_reviews_50_games_final.csv"
+index_file = output_file + ".index.json"   # sidecar: columns + games / row counts in output_file
 
 # Games to add
 games_to_add = ["call of duty", "pubg mobile"]
 
+CHUNKSIZE = 200000
+
 def normalize(name: str) -> str:
     return name.strip().lower().replace("_", " ")
 
-print("🔄 Loading combined review dataset...")
-
-# --- Load combined file safely ---
-try:
-    df_combined = pd.read_csv(combined_reviews_file, encoding="utf-8", on_bad_lines="skip", engine="python")
-except Exception as e:
-    print(f"⚠️ Default read failed, retrying with latin1 encoding...\nError: {e}")
-    df_combined = pd.read_csv(combined_reviews_file, encoding="latin1", on_bad_lines="skip", engine="python")
-
-# --- Force all column names to strings ---
-df_combined.columns = df_combined.columns.map(str)
-
-# --- Identify the Game_Name column ---
-game_col = None
-for col in df_combined.columns:
-    if "game" in col.lower():
-        game_col = col
-        break
-if not game_col:
-    game_col = df_combined.columns[-1]  # assume last column
-    print(f"⚠️ Could not detect 'Game_Name' column automatically. Assuming: {game_col}")
-
-# --- Normalize names ---
-df_combined[game_col] = df_combined[game_col].astype(str).str.strip().str.lower()
-
-existing_games = set(df_combined[game_col].unique())
-print(f"📊 Found {len(existing_games)} existing games in combined file.\n")
-
-# --- Append missing reviews ---
-added_files = []
-for file in os.listdir(reviews_folder):
-    if not file.endswith(".csv"):
-        continue
-    lower_file = file.lower()
-    for g in games_to_add:
-        if g.replace(" ", "_") in lower_file or g in lower_file:
-            print(f"🧩 Found match for '{g.title()}' in {file}")
-            try:
-                df_new = pd.read_csv(os.path.join(reviews_folder, file), encoding="utf-8", on_bad_lines="skip", engine="python")
-                df_new["Game_Name"] = g.title()
-                added_files.append(df_new)
-                print(f"✅ Added {len(df_new)} reviews from {file}")
-            except Exception as e:
-                print(f"⚠️ Skipped {file}: {e}")
-
-# --- Combine and save ---
-if added_files:
-    df_final = pd.concat([df_combined] + added_files, ignore_index=True)
-    df_final.to_csv(output_file, index=False, encoding="utf-8-sig")
-    print(f"\n💾 Updated combined file saved as: {output_file}")
-    print(f"🎮 Total unique games now: {df_final['Game_Name'].nunique()}")
-else:
-    print("⚠️ No new reviews added — files may already exist or not found.")
+def file_encoding(path):
+    # utf-8 if the whole file decodes as utf-8, else latin1 (same fallback as before)
+    try:
+        with open(path, encoding="utf-8") as f:
+            while f.read(1 << 20):
+                pass
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin1"
+
+def find_game_column(columns):
+    # --- Identify the Game_Name column ---
+    for col in columns:
+        if "game" in col.lower():
+            return col
+    print(f"⚠️ Could not detect 'Game_Name' column automatically. Assuming: {columns[-1]}")
+    return columns[-1]  # assume last column
+
+# ---------- Sidecar index ----------
+# The output file is only ever appended to, so its games and row counts are kept
+# next to it. The index is trusted while the file's size and mtime match; only then
+# can a new game be added without reading the combined file at all.
+def file_stat(path):
+    return {"size": os.path.getsize(path), "mtime": os.path.getmtime(path)}
+
+def save_index(index):
+    index.update(file_stat(output_file))
+    tmp = index_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, index_file)   # never leave a half-written index behind
+
+def build_index():
+    # one pass over the game column of the output file (C parser, chunked)
+    print("🔄 Indexing combined review dataset (one-off)...")
+    encoding = file_encoding(output_file)
+    columns = list(pd.read_csv(output_file, nrows=0, encoding=encoding).columns.map(str))
+    game_col = find_game_column(columns)
+    counts = pd.Series(dtype="int64")
+    for chunk in pd.read_csv(output_file, encoding=encoding, on_bad_lines="skip", usecols=[game_col],
+                             dtype=str, chunksize=CHUNKSIZE):
+        names = chunk[game_col].astype(object).where(chunk[game_col].notna(), "nan")
+        counts = counts.add(names.map(normalize).value_counts(), fill_value=0)
+    games = {g: {"rows": int(n), "sources": {}} for g, n in counts.items()}
+    index = {"columns": columns, "game_col": game_col, "encoding": encoding, "games": games}
+    save_index(index)
+    return index
+
+def load_index(rebuild=False):
+    if not os.path.exists(output_file):
+        # first run: start the output as a byte copy of the combined file (no parsing)
+        shutil.copyfile(combined_reviews_file, output_file)
+        rebuild = True
+    if not rebuild and os.path.exists(index_file):
+        with open(index_file, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("size") == os.path.getsize(output_file) and index.get("mtime") == os.path.getmtime(output_file):
+            return index
+        print("⚠️ Combined file changed outside this script, re-indexing.")
+    return build_index()
+
+# ---------- Append ----------
+def append_game(path, game, index):
+    # stream one per-game CSV onto the end of the output file in its column order;
+    # returns rows written. On failure the output is cut back to where it was.
+    columns, game_col = index["columns"], index["game_col"]
+    encoding = file_encoding(path)
+    start = os.path.getsize(output_file)
+    rows = 0
+    try:
+        if start:
+            with open(output_file, "r+b") as f:   # make sure the last row ends with a newline
+                f.seek(start - 1)
+                if f.read(1) not in (b"\n", b"\r"):
+                    f.write(os.linesep.encode())
+        with open(output_file, "a", encoding=index["encoding"], errors="replace", newline="") as out:
+            for chunk in pd.read_csv(path, encoding=encoding, on_bad_lines="skip", chunksize=CHUNKSIZE):
+                chunk.columns = chunk.columns.map(str)
+                chunk[game_col] = game.title()
+                extra = [c for c in chunk.columns if c not in columns]
+                if extra and rows == 0:
+                    print(f"⚠️ {os.path.basename(path)}: columns not in the combined file are dropped: {extra}")
+                chunk.reindex(columns=columns).to_csv(out, header=False, index=False)
+                rows += len(chunk)
+    except Exception:
+        with open(output_file, "r+b") as f:
+            f.truncate(start)
+        raise
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Append per-game review CSVs to the combined reviews file.")
+    parser.add_argument("--reindex", action="store_true", help="rebuild the sidecar index from the combined file")
+    args = parser.parse_args()
+
+    index = load_index(args.reindex)
+    print(f"📊 Found {len(index['games'])} existing games in combined file.\n")
+
+    # --- Append missing reviews ---
+    added = 0
+    for file in sorted(os.listdir(reviews_folder)):
+        if not file.endswith(".csv"):
+            continue
+        lower_file = file.lower()
+        for g in games_to_add:
+            if g.replace(" ", "_") in lower_file or g in lower_file:
+                print(f"🧩 Found match for '{g.title()}' in {file}")
+                path = os.path.join(reviews_folder, file)
+                entry = index["games"].get(normalize(g))
+                if entry and not entry["sources"]:
+                    print(f"⏭️ '{g.title()}' is already in the combined file ({entry['rows']} reviews)")
+                    continue
+                if entry and file in entry["sources"]:
+                    if entry["sources"][file] != file_stat(path):
+                        print(f"⚠️ {file} changed since it was appended; rebuild the combined file to replace it")
+                    else:
+                        print(f"⏭️ {file} is already in the combined file")
+                    continue
+                try:
+                    rows = append_game(path, g, index)
+                except Exception as e:
+                    print(f"⚠️ Skipped {file}: {e}")
+                    continue
+                entry = index["games"].setdefault(normalize(g), {"rows": 0, "sources": {}})
+                entry["rows"] += rows
+                entry["sources"][file] = file_stat(path)
+                save_index(index)
+                added += rows
+                print(f"✅ Added {rows} reviews from {file}")
+
+    if added:
+        print(f"\n💾 Updated combined file saved as: {output_file}")
+        print(f"🎮 Total unique games now: {len(index['games'])}")
+    else:
+        print("⚠️ No new reviews added — files may already exist or not found.")
+
+if __name__ == "__main__":
+    main()
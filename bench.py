@@ -0,0 +1,202 @@
+# bench.py
+# Benchmarks of the hot paths on synthetic data (synthetic_data.py):
+#   score_scalar     calculate_sentiment_score, one review at a time
+#   score_batch      calculate_sentiment_score_batch, whole chunks
+#   estimate_scalar  estimate_sentiment_from_text (aggregate_monthly_sentiment_allgames.py)
+#   estimate_batch   estimate_sentiment_batch
+#   aggregate        full aggregate_monthly_sentiment_allgames.py run (--full, serial) on the corpus
+#   lag_correlation  lag_correlations, sentiment vs users / revenue / Dominance, lags 0-12
+#   rollup           rollup_windows (all / 3 / 6 / 12 months) of the monthly panel
+# Each benchmark runs in a fresh process, so peak RSS is its own. Results are appended
+# to bench_results.csv; --save-baseline stores them in bench_baseline.json and later
+# runs flag anything more than TOLERANCE slower (rows/s) or bigger (peak RSS).
+#   python bench.py --rows 1000000                 compare with the baseline
+#   python bench.py --rows 1000000 --save-baseline
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import subprocess
+
+from stage_timer import peak_rss_mb
+
+# CONFIG - update paths if needed
+BENCH_DIR = r"C:\Disertation\benchmarks"
+BASELINE_FILE = "bench_baseline.json"
+RESULTS_FILE = "bench_results.csv"
+SCALAR_ROWS = 50000     # the one-at-a-time benchmarks score at most this many reviews
+PANEL_MONTHS = 72
+TOLERANCE = 0.2
+BENCHMARKS = ['score_scalar', 'score_batch', 'estimate_scalar', 'estimate_batch', 'aggregate',
+              'lag_correlation', 'rollup']
+
+
+# ---------- Benchmarks (run inside the child process) ----------
+def _scorer(name, manifest, corpus):
+    # -> (rows, seconds spent scoring) over the corpus texts
+    from synthetic_data import iter_texts
+    if name.startswith('score'):
+        from calculate_sentiment_score import calculate_sentiment_score, calculate_sentiment_score_batch
+    else:
+        from aggregate_monthly_sentiment_allgames import estimate_sentiment_from_text, estimate_sentiment_batch
+    scalar = name.endswith('scalar')
+    rows = secs = 0
+    for texts, scores in iter_texts(manifest, corpus, SCALAR_ROWS if scalar else None):
+        start = time.perf_counter()
+        if name == 'score_scalar':
+            users = [None] * len(texts) if scores is None else scores.tolist()
+            for t, u in zip(texts.tolist(), users):
+                calculate_sentiment_score(t, u)
+        elif name == 'score_batch':
+            calculate_sentiment_score_batch(texts.to_numpy(), None if scores is None else scores.to_numpy())
+        elif name == 'estimate_scalar':
+            for t in texts.tolist():
+                estimate_sentiment_from_text(t)
+        else:
+            estimate_sentiment_batch(texts)
+        secs += time.perf_counter() - start
+        rows += len(texts)
+    return rows, secs
+
+
+def _aggregate(manifest, corpus, work):
+    import pandas as pd
+    import aggregate_monthly_sentiment_allgames as agg
+    agg.REVIEWS_FOLDER = corpus
+    agg.OUTPUT_CSV = os.path.join(work, "monthly_sentiment.csv")
+    agg.LOG_CSV = os.path.join(work, "aggregation_log.csv")
+    agg.MANIFEST_FILE = os.path.join(work, "aggregation_manifest.json")
+    argv, sys.argv = sys.argv, ['aggregate', '--full']
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            agg.main()
+    finally:
+        sys.argv = argv
+    secs = time.perf_counter() - start
+    rows = int(pd.read_csv(agg.LOG_CSV)['rows_processed'].sum())
+    total = sum(f['rows'] for f in manifest['files'])
+    if rows < total:
+        print(f"⚠️ aggregate read {rows} of {total} rows (see {agg.LOG_CSV})", file=sys.stderr)
+    return rows, secs
+
+
+def _analysis(name, rows):
+    from synthetic_data import synthetic_panel
+    panel = synthetic_panel(rows, PANEL_MONTHS)
+    start = time.perf_counter()
+    if name == 'lag_correlation':
+        from lag_correlation import lag_correlations
+        lag_correlations(panel, 'avg_sentiment', ['Monthly_Active_Users_Millions',
+                                                  'Monthly_Revenue_USD_Millions', 'Dominance'], 12)
+    else:
+        from rollups import rollup_windows
+        rollup_windows(panel)
+    return len(panel), time.perf_counter() - start
+
+
+def run_one(name, rows, corpus, work):
+    # one benchmark in this process -> result dict
+    from synthetic_data import generate_corpus
+    if name in ('lag_correlation', 'rollup'):
+        n, secs = _analysis(name, rows)
+    else:
+        manifest = generate_corpus(corpus, rows)
+        n, secs = _aggregate(manifest, corpus, work) if name == 'aggregate' else _scorer(name, manifest, corpus)
+    return {'benchmark': name, 'rows': n, 'seconds': round(secs, 4),
+            'rows_per_s': round(n / secs, 1) if secs > 0 else float('nan'), 'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+
+# ---------- Suite ----------
+def run_suite(names, rows, bench_dir=BENCH_DIR):
+    # every benchmark in its own process -> list of result dicts (or {'error': ...})
+    corpus = os.path.join(bench_dir, f"corpus_{rows}")
+    work = os.path.join(bench_dir, "work")
+    os.makedirs(work, exist_ok=True)
+    from synthetic_data import generate_corpus
+    if any(n not in ('lag_correlation', 'rollup') for n in names):
+        print(f"Corpus: {rows} rows -> {corpus}")
+        generate_corpus(corpus, rows)   # once, before any timing
+    results = []
+    for name in names:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, '--rows', str(rows),
+                               '--dir', bench_dir], capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode or not lines:
+            err = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+            results.append({'benchmark': name, 'error': err})
+            print(f"⚠️ {name}: {err}")
+            continue
+        res = json.loads(lines[-1])
+        results.append(res)
+        for line in proc.stderr.splitlines():
+            if line.startswith("⚠️"):
+                print(line)
+        print(f"{name:16s} {res['rows']:>11,d} rows {res['seconds']:>9.3f}s "
+              f"{res['rows_per_s']:>13,.0f} rows/s  peak {res['peak_rss_mb']:>8.1f} MB")
+    return results
+
+
+def compare(results, baseline, rows, tolerance=TOLERANCE):
+    # -> list of regression messages against the baseline for the same row count
+    out = []
+    for res in results:
+        base = baseline.get(f"{res['benchmark']}@{rows}")
+        if base is None or 'error' in res:
+            continue
+        if res['rows_per_s'] < base['rows_per_s'] * (1 - tolerance):
+            out.append(f"{res['benchmark']}: {res['rows_per_s']:,.0f} rows/s vs baseline {base['rows_per_s']:,.0f}")
+        if res['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            out.append(f"{res['benchmark']}: peak {res['peak_rss_mb']:.1f} MB vs baseline {base['peak_rss_mb']:.1f} MB")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scorer, aggregator and analyses.")
+    parser.add_argument('--rows', type=int, default=100000, help="review rows / panel rows (10k .. 50M)")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--dir', default=BENCH_DIR, help="folder for the corpus, baseline and results")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(args.child, args.rows, os.path.join(args.dir, f"corpus_{args.rows}"),
+                                 os.path.join(args.dir, "work"))))
+        return
+
+    import pandas as pd
+    results = run_suite(args.only or BENCHMARKS, args.rows, args.dir)
+    ok = [r for r in results if 'error' not in r]
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    results_path = os.path.join(args.dir, RESULTS_FILE)
+    pd.DataFrame([dict(r, run=stamp) for r in ok]).to_csv(
+        results_path, mode='a', index=False, header=not os.path.exists(results_path))
+
+    baseline_path = os.path.join(args.dir, BASELINE_FILE)
+    try:
+        with open(baseline_path, encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+    if args.save_baseline:
+        baseline.update({f"{r['benchmark']}@{args.rows}": dict(r, run=stamp) for r in ok})
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print("Saved baseline:", baseline_path)
+        return
+    regressions = compare(ok, baseline, args.rows)
+    for msg in regressions:
+        print("⚠️ Regression:", msg)
+    if not any(f"{r['benchmark']}@{args.rows}" in baseline for r in ok):
+        print(f"No baseline for {args.rows} rows yet (run with --save-baseline).")
+    elif not regressions:
+        print("No regressions against the baseline.")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,18 @@
-def calculate_sentiment_score(review_text, user_score=None):
-    import re
+import numpy as np
+import pandas as pd
+
+from sentiment_lexicon import load_lexicon
 
-    # Define word categories
-    positive_strong = {"amazing", "excellent", "love", "masterpiece", "incredible", "fantastic", "awesome", "brilliant"}
-    positive_mild = {"good", "fun", "enjoyable", "nice", "cool", "decent", "smooth"}
-    negative_mild = {"boring", "laggy", "buggy", "slow", "average", "ok", "annoying"}
-    negative_strong = {"hate", "terrible", "awful", "trash", "worst", "broken", "crash", "disgusting"}
+# Word, emoji and punctuation weights live in sentiment_lexicon.json ("review_score")
+LEXICON = load_lexicon("review_score")
 
-    # Emoji lists
-    positive_emojis = {"😍", "🔥", "😊", "👍", "🎉", "❤️"}
-    negative_emojis = {"😡", "😭", "👎", "💀", "🤬"}
 
+def calculate_sentiment_score(review_text, user_score=None):
     # Validate review text
     if not isinstance(review_text, str) or review_text.strip() == "":
         return 5.0  # Neutral default
 
-    review_lower = review_text.lower()
-    words = re.findall(r'\w+', review_lower)
-    score = 5  # Neutral base score
-
-    # Keyword-based scoring
-    for word in words:
-        if word in positive_strong:
-            score += 2
-        elif word in positive_mild:
-            score += 1
-        elif word in negative_mild:
-            score -= 1
-        elif word in negative_strong:
-            score -= 2
-
-    # Punctuation impact
-    score += min(review_text.count("!") * 0.1, 1)  # Max +1 from exclamations
-    score -= min(review_text.count("?") * 0.1, 1)  # Max -1 from confusion/frustration
-
-    # Emoji impact
-    for char in review_text:
-        if char in positive_emojis:
-            score += 1
-        elif char in negative_emojis:
-            score -= 1
+    score = LEXICON.score(review_text)  # words, punctuation and emojis in one pass
 
     # Include user rating if available
     if user_score is not None:
@@ -51,3 +24,67 @@ def calculate_sentiment_score(review_text, user_score=None):
 
     # Final clamp between 1 and 10
     return round(max(1, min(10, score)), 2)
+
+
+# ---------- Batch scoring (whole review columns) ----------
+def _user_score_adjust(user_scores, n):
+    # (user_score - 5) / 2 per row, 0 where the scalar version would ignore the
+    # value (None / not convertible); a real NaN propagates like it does there
+    adjust = np.zeros(n, dtype=float)
+    if user_scores is None:
+        return adjust
+    dtype = getattr(user_scores, 'dtype', None)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and dtype.kind in 'iufb':
+        # nullable / Arrow-backed numbers: np.asarray would turn pd.NA into NaN,
+        # but the scalar version ignores it, so it is read as 5 (adds nothing)
+        arr = pd.array(user_scores).to_numpy(dtype=float, na_value=5.0)
+    else:
+        arr = np.asarray(user_scores)
+    if len(arr) != n:
+        raise ValueError(f"user_scores has {len(arr)} values for {n} texts")
+    if arr.dtype.kind in 'iufb':
+        return (arr.astype(float) - 5) / 2
+    for i, v in enumerate(arr):
+        if v is None:
+            continue
+        try:
+            adjust[i] = (float(v) - 5) / 2
+        except Exception:
+            pass
+    return adjust
+
+
+def calculate_sentiment_score_batch(review_texts, user_scores=None):
+    # Vectorized calculate_sentiment_score: takes a pandas Series / list of texts
+    # (plus an optional array of user scores, same length) and returns a float
+    # NumPy array with exactly the values the scalar function gives row by row.
+    texts = pd.Series(review_texts, dtype=object).to_numpy()
+    n = len(texts)
+    scores = np.full(n, 5.0)
+
+    # non-string texts keep the neutral 5.0; so do blank ones, which only needs
+    # checking when a user score could otherwise be added to them
+    if pd.api.types.infer_dtype(texts, skipna=False) == 'string':
+        idx = np.arange(n)
+    else:
+        idx = np.flatnonzero(np.fromiter((isinstance(t, str) for t in texts), dtype=bool, count=n))
+    if user_scores is not None:
+        strs = texts[idx].tolist()
+        blank = np.fromiter(map(str.isspace, strs), dtype=bool, count=len(strs))
+        blank |= np.fromiter(map(len, strs), dtype=np.int64, count=len(strs)) == 0
+        idx = idx[~blank]
+    if len(idx) == 0:
+        return scores
+    valid = texts if len(idx) == n else texts[idx]
+    raw = LEXICON.score_many(valid.tolist())
+    raw = raw + _user_score_adjust(user_scores, n)[idx]
+
+    # Python's min/max semantics (incl. NaN -> 10), then Python round() on the
+    # few distinct values so results match round(x, 2) bit for bit
+    with np.errstate(invalid='ignore'):
+        clamped = np.where(raw < 10, raw, 10.0)
+        clamped = np.where(clamped > 1, clamped, 1.0)
+    uniq, inverse = np.unique(clamped, return_inverse=True)
+    rounded = np.array([round(float(v), 2) for v in uniq])
+    scores[idx] = rounded[inverse.reshape(-1)]
+    return scores
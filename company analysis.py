@@ -1,37 +1,35 @@
 import pandas as pd
 import numpy as np
 
+from game_dimension import load_dimensions
+from monthly_panel import load_panel
+from rollups import rollup
+
 # ========= FILE PATHS =========
 dom_file = r"C:\Disertation\processed\FINAL_with_Dominance_MONTHLY.csv"
-company_file = r"C:\Disertation\final\pushpa60_SORTED.csv"
+# game -> company comes from game_dimension.py (built from pushpa60_SORTED.csv)
 
 # ========= LOAD FILES =========
-df = pd.read_csv(dom_file)
-df2 = pd.read_csv(company_file)
-
-# Clean company file
-df2 = df2.rename(columns={'ï»¿Date':'Date'})
-df2['game_norm'] = df2['Game_Name'].str.lower().str.strip()
+# typed panel (monthly_panel.py): categorical game_norm / Company, float32 metrics, cached
+merged = load_panel(dom_file)
 
-# Build mapping (unique game -> company)
-mapping = df2[['game_norm','Company']].drop_duplicates()
+# Shared game / company dimension (one company per game)
+games, companies = load_dimensions()
+mapping = games.assign(Company=companies['company'].reindex(games['company_id']).to_numpy())[['game_norm','Company']]
 
 print("\n=== GAME → COMPANY MAPPING CREATED ===\n")
 print(mapping.head(20))
 
-# ========= MERGE COMPANY INTO DOMINANCE DATA =========
-df['game_norm'] = df['game_norm'].str.lower().str.strip()
-
-merged = df.merge(mapping, on='game_norm', how='left')
-
+# ========= COMPANY IN DOMINANCE DATA =========
+# joined once by the loader on integer ids; unmatched games are reported when it builds
 print("\nMerged shape:", merged.shape)
 print("Null companies:", merged['Company'].isna().sum())
 
 # ========= COMPANY LEVEL DOMINANCE =========
+# game -> company -> market rollup of Dominance (rollups.py)
 company_dom = (
-    merged.groupby('Company')['Dominance']
-          .agg(['mean','max','min','std','count'])
-          .rename(columns={'mean':'dom_mean','count':'months'})
+    rollup(merged)['company'].set_index('Company')[['mean','max','min','std','n_obs']]
+          .rename(columns={'mean':'dom_mean','n_obs':'months'})
           .sort_values('dom_mean', ascending=False)
 )
 
@@ -45,7 +43,7 @@ def safe_corr(a, b):
     return float(np.corrcoef(a, b)[0,1])
 
 corr_rows = []
-for comp, grp in merged.groupby('Company'):
+for comp, grp in merged.groupby('Company', observed=True):
     corr_sent_user = safe_corr(grp['avg_sentiment'], grp['Monthly_Active_Users_Millions'])
     corr_sent_dom  = safe_corr(grp['avg_sentiment'], grp['Dominance'])
     
@@ -4,12 +4,12 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
-# Try to import scipy for p-values; if not available, continue gracefully
-try:
-    from scipy import stats
-    SCIPY_AVAILABLE = True
-except Exception:
-    SCIPY_AVAILABLE = False
+from game_dimension import attach_dimensions
+from lag_correlation import lag_correlations
+from monthly_panel import load_panel
+from render_figures import correlation_jobs, render
+from rollups import rollup
+from stage_timer import StageTimer
 
 # ---------- CONFIG ----------
 INPUT_CANDIDATES = [
@@ -31,54 +31,46 @@ REVENUE_COL = "Monthly_Revenue_USD_Millions"
 DOM_COL = "Dominance"
 
 MIN_MONTHS_FOR_CORR = 6  # minimum months to compute correlation
+MAX_LAG = 12             # sentiment_{t-k} vs metric_t for k = 0..MAX_LAG
 
 # ---------- Helpers ----------
 def try_load_first(paths):
+    # -> (df, typed); the monthly dominance file comes from the typed cache (monthly_panel.py)
     for p in paths:
         if os.path.exists(p):
             print("Loading:", p)
-            return pd.read_csv(p, low_memory=False)
+            if p == INPUT_CANDIDATES[0]:
+                return load_panel(p), True
+            return pd.read_csv(p, low_memory=False), False
     raise FileNotFoundError(f"None of the input files found. Checked: {paths}")
 
-def to_ym(x):
-    # normalize to YYYY-MM
+def _to_ym_one(x):
+    # normalize one value to YYYY-MM
     try:
         return pd.to_datetime(x).strftime("%Y-%m")
     except Exception:
         return str(x)[:7]
 
-def pearson_with_p(x, y):
-    # returns r, p (p may be np.nan if scipy not available)
-    if len(x) < 2:
-        return np.nan, np.nan
-    x = np.array(x); y = np.array(y)
-    mask = ~np.isnan(x) & ~np.isnan(y)
-    if mask.sum() < 2:
-        return np.nan, np.nan
-    xr = x[mask]; yr = y[mask]
-    if xr.std() == 0 or yr.std() == 0:
-        return np.nan, np.nan
-    r = np.corrcoef(xr, yr)[0,1]
-    p = np.nan
-    if SCIPY_AVAILABLE:
-        try:
-            p = stats.pearsonr(xr, yr)[1]
-        except Exception:
-            p = np.nan
-    else:
-        # compute t-statistic and p approx using Student t distribution formula if possible
-        try:
-            n = len(xr)
-            t = r * np.sqrt((n-2)/(1-r*r))
-            # can't compute p without CDF; leave as NaN
-            p = np.nan
-        except Exception:
-            p = np.nan
-    return float(r), p
+def to_ym(values):
+    # normalize a column to YYYY-MM with one vectorized ISO parse; only values it
+    # cannot handle go through the per-value parser (once per distinct value)
+    values = values.astype(str)
+    try:
+        dates = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    except (ValueError, TypeError):   # e.g. mixed UTC offsets
+        dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    month = dates.dt.year * 100 + dates.dt.month   # formatted once per distinct month
+    ym = month.map({m: f"{int(m) // 100:04d}-{int(m) % 100:02d}" for m in month.dropna().unique()}).astype(object)
+    rest = dates.isna()
+    if rest.any():
+        ym[rest] = values[rest].map({v: _to_ym_one(v) for v in values[rest].unique()})
+    return ym
 
 # ---------- Main ----------
 def main():
-    df = try_load_first(INPUT_CANDIDATES)
+    timer = StageTimer()
+    with timer.stage('load'):
+        df, typed = try_load_first(INPUT_CANDIDATES)
 
     # Ensure expected columns exist; try to map alternatives
     if DATE_COL not in df.columns:
@@ -95,76 +87,59 @@ def main():
         else:
             raise KeyError("No game name column found. Expected 'game_norm' or 'Game_Name' or 'game'.")
 
-    # company column mapping: if missing, try to load from other candidate file
-    if COMPANY_COL not in df.columns:
-        # try loading pushpa60_SORTED if present
-        fallback = r"C:\Disertation\final\pushpa60_SORTED.csv"
-        if os.path.exists(fallback):
-            meta = pd.read_csv(fallback, low_memory=False)
-            if 'Game_Name' in meta.columns and 'Company' in meta.columns:
-                meta['game_norm'] = meta['Game_Name'].str.lower().str.strip()
-                mapping = meta.set_index('game_norm')['Company'].to_dict()
-                df[COMPANY_COL] = df[GAME_COL].map(mapping)
-                print("Mapped Company from pushpa60_SORTED.csv")
-    # normalize date to ym
-    df[DATE_COL] = df[DATE_COL].astype(str).apply(to_ym)
-
-    # normalize game names lower
-    df[GAME_COL] = df[GAME_COL].astype(str).str.lower().str.strip()
+    if not typed:
+        # canonical game names + company from the shared game dimension (game_dimension.py);
+        # a Company column already in the input is kept
+        company = df[COMPANY_COL] if COMPANY_COL in df.columns else None
+        df = attach_dimensions(df, GAME_COL, COMPANY_COL, source="the input file")
+        if company is not None:
+            df[COMPANY_COL] = company
+        # normalize date to ym
+        df[DATE_COL] = to_ym(df[DATE_COL])
 
     # Ensure numeric cols exist
     for col in [SENT_COL, USERS_COL, REVENUE_COL, DOM_COL]:
         if col not in df.columns:
             df[col] = np.nan
 
-    # ---------- Per-game sentiment vs users correlation ----------
-    games = sorted(df[GAME_COL].unique())
-    corr_rows = []
-    lag_corr_rows = []
-    for g in games:
-        sub = df[df[GAME_COL] == g].sort_values(DATE_COL)
-        # need at least MIN_MONTHS_FOR_CORR rows
-        if len(sub) < MIN_MONTHS_FOR_CORR:
-            continue
-        # direct correlation: sentiment vs users (same month)
-        r, p = pearson_with_p(sub[SENT_COL].values, sub[USERS_COL].values)
-        corr_rows.append({
-            'game': g, 'n_months': len(sub), 'pearson_r': r, 'pearson_p': p,
-            'sent_mean': float(np.nanmean(sub[SENT_COL])),
-            'users_mean': float(np.nanmean(sub[USERS_COL]))
-        })
-        # lagged correlation sentiment_{t-1} vs users_t
-        sent_lag = sub[SENT_COL].shift(1).values
-        users = sub[USERS_COL].values
-        r2, p2 = pearson_with_p(sent_lag, users)
-        lag_corr_rows.append({
-            'game': g, 'n_months': len(sub), 'pearson_r_lag1': r2, 'pearson_p_lag1': p2
-        })
-
-    corr_df = pd.DataFrame(corr_rows).sort_values('pearson_r', ascending=False)
-    lag_corr_df = pd.DataFrame(lag_corr_rows).sort_values('pearson_r_lag1', ascending=False)
+    # ---------- Per-game sentiment correlations (lags 0..MAX_LAG) ----------
+    # one vectorized pass over game x month matrices (lag_correlation.py); lag k pairs
+    # sentiment k calendar months earlier with the metric, using months where both exist
+    n_months = df.groupby(GAME_COL, observed=True).size()
+    n_months = n_months[n_months >= MIN_MONTHS_FOR_CORR]   # need at least MIN_MONTHS_FOR_CORR rows
+    sub = df[df[GAME_COL].isin(n_months.index)]
+    with timer.stage('lag correlations'):
+        lags = lag_correlations(sub, SENT_COL, [USERS_COL, REVENUE_COL, DOM_COL], MAX_LAG, GAME_COL, DATE_COL)
+    lags.to_csv(os.path.join(OUT_DIR, "per_game_sentiment_lag_corr.csv"), index=False)
+
+    # direct correlation: sentiment vs users (same month)
+    users = lags[lags['metric'] == USERS_COL].set_index(['lag', 'game'])
+    means = sub.groupby(GAME_COL, observed=True)[[SENT_COL, USERS_COL]].mean()
+    corr_df = pd.DataFrame({
+        'game': n_months.index, 'n_months': n_months.to_numpy(),
+        'pearson_r': users.loc[0, 'r'].reindex(n_months.index).to_numpy(),
+        'pearson_p': users.loc[0, 'p'].reindex(n_months.index).to_numpy(),
+        'sent_mean': means[SENT_COL].reindex(n_months.index).to_numpy(),
+        'users_mean': means[USERS_COL].reindex(n_months.index).to_numpy()
+    }).sort_values('pearson_r', ascending=False)
+    # lagged correlation sentiment_{t-1} vs users_t
+    lag_corr_df = pd.DataFrame({
+        'game': n_months.index, 'n_months': n_months.to_numpy(),
+        'pearson_r_lag1': users.loc[1, 'r'].reindex(n_months.index).to_numpy(),
+        'pearson_p_lag1': users.loc[1, 'p'].reindex(n_months.index).to_numpy()
+    }).sort_values('pearson_r_lag1', ascending=False)
 
     corr_df.to_csv(os.path.join(OUT_DIR, "per_game_sentiment_users_corr.csv"), index=False)
     lag_corr_df.to_csv(os.path.join(OUT_DIR, "per_game_sentiment_users_lag1_corr.csv"), index=False)
     print("Saved per-game correlation tables to:", OUT_DIR)
-
-    # Save histogram of correlation coefficients
-    plt.figure(figsize=(7,5))
-    vals = corr_df['pearson_r'].dropna()
-    if len(vals) > 0:
-        plt.hist(vals, bins=18)
-        plt.title("Distribution of per-game Pearson r (sentiment vs users)")
-        plt.xlabel("Pearson r")
-        plt.ylabel("Count")
-        plt.tight_layout()
-        plt.savefig(os.path.join(OUT_DIR, "hist_sentiment_users_r.png"), dpi=200)
-        plt.close()
+    # histogram of pearson_r -> hist_sentiment_users_r.png (redrawn only when r changed)
+    render(correlation_jobs(corr_df['pearson_r']), OUT_DIR)
 
     # ---------- Company-level dominance ----------
     # Need company info: map games -> company
     if COMPANY_COL not in df.columns or df[COMPANY_COL].isna().all():
         print("Warning: Company column missing or empty. Company-level aggregation will be 'unknown' unless you provide mapping.")
-        df[COMPANY_COL] = df.get(COMPANY_COL).fillna("unknown")
+        df[COMPANY_COL] = df.get(COMPANY_COL).astype(object).fillna("unknown")
 
     # For company-level aggregation we need Dominance column and optionally revenue for weighting
     # compute two variants: mean(Dominance) and revenue-weighted mean across (game,month) aggregated per company (average over time)
@@ -173,24 +148,21 @@ def main():
     df[REVENUE_COL] = pd.to_numeric(df[REVENUE_COL], errors='coerce')
     df[USERS_COL] = pd.to_numeric(df[USERS_COL], errors='coerce')
 
+    # game / company rollups in one pass (rollups.py), per month for the company-month table
+    with timer.stage('rollups'):
+        rolled = rollup(df, DOM_COL, {'revenue': REVENUE_COL, 'users': USERS_COL}, period='month',
+                        game_col=GAME_COL, company_col=COMPANY_COL, date_col=DATE_COL)
+
     # Aggregate per company-month: average across games (some companies have multiple games in a month)
-    comp_month = df.groupby([COMPANY_COL, DATE_COL]).agg({
-        DOM_COL: 'mean',
-        REVENUE_COL: 'sum',          # company revenue that month (sum over their games)
-        USERS_COL: 'sum'             # total active users across company's games that month
-    }).reset_index().rename(columns={DOM_COL: 'company_dom_mean_monthly'})
+    comp_month = rolled['company'][['month', COMPANY_COL, 'mean', 'revenue_total', 'users_total']].rename(columns={
+        'month': DATE_COL,
+        'mean': 'company_dom_mean_monthly',
+        'revenue_total': REVENUE_COL,    # company revenue that month (sum over their games)
+        'users_total': USERS_COL         # total active users across company's games that month
+    })
 
     # Overall company metrics: mean dominance across months, and revenue-weighted dominance
-    # revenue-weighted dominance across company-months: weight by company revenue that month
-    overall = comp_month.groupby(COMPANY_COL).apply(
-        lambda g: pd.Series({
-            'months': len(g),
-            'dom_mean': float(g['company_dom_meanly'] ) if 'company_dom_meanly' in g.columns else float(g['company_dom_meanly'].mean()) if False else float(g['company_dom_meanly'].mean()) # dummy for compatibility
-        })
-    ).reset_index()
-
-    # The above lambda uses a compatibility guard; we'll compute properly next:
-    overall = comp_month.groupby(COMPANY_COL).agg({
+    overall = comp_month.groupby(COMPANY_COL, observed=True).agg({
         'company_dom_mean_monthly': ['mean', 'count'],
         REVENUE_COL: 'mean',
         USERS_COL: 'mean'
@@ -200,13 +172,13 @@ def main():
 
     # revenue-weighted dominance at company-level: for each company-month, dominance * revenue, summed / total revenue
     comp_month['rev_dom'] = comp_month['company_dom_mean_monthly'] * comp_month[REVENUE_COL]
-    rev_weighted = comp_month.groupby(COMPANY_COL).agg({
+    rev_weighted = comp_month.groupby(COMPANY_COL, observed=True).agg({
         'rev_dom': 'sum',
         REVENUE_COL: 'sum',
         'company_dom_mean_monthly': 'mean'
     }).reset_index().rename(columns={'company_dom_mean_monthly':'dom_simple_mean'})
-    rev_weighted['dom_revenue_weighted'] = rev_weighted.apply(
-        lambda r: (r['rev_dom'] / r[REVENUE_COL]) if r[REVENUE_COL] > 0 else r['dom_simple_mean'], axis=1)
+    rev_weighted['dom_revenue_weighted'] = np.where(
+        rev_weighted[REVENUE_COL] > 0, rev_weighted['rev_dom'] / rev_weighted[REVENUE_COL], rev_weighted['dom_simple_mean'])
 
     # Merge overall and revenue-weighted
     company_df = overall.merge(rev_weighted[[COMPANY_COL, 'dom_revenue_weighted']], on=COMPANY_COL, how='left')
@@ -226,14 +198,12 @@ def main():
         plt.savefig(os.path.join(OUT_DIR, "Top10_companies_dom_weighted.png"), dpi=200)
         plt.close()
 
-    # Also save a table of top games per company (by overall game mean dominance)
-    game_dom = df.groupby([GAME_COL]).agg({
-        DOM_COL: 'mean'
-    }).reset_index().sort_values(DOM_COL, ascending=False)
-    # map game->company
-    # if we have company mapping in original df, take most frequent company per game
-    game_company_map = df.groupby(GAME_COL)[COMPANY_COL].agg(lambda x: x.dropna().mode().iloc[0] if len(x.dropna())>0 else "unknown").reset_index()
-    game_dom = game_dom.merge(game_company_map, on=GAME_COL, how='left').rename(columns={COMPANY_COL:'company'})
+    # Also save a table of top games per company (by overall game mean dominance);
+    # company = the game's most frequent company in the data
+    game_dom = rollup(df, DOM_COL, {}, game_col=GAME_COL, company_col=COMPANY_COL, date_col=DATE_COL)['game']
+    game_dom = game_dom[[GAME_COL, 'mean', COMPANY_COL]].rename(columns={'mean': DOM_COL, COMPANY_COL: 'company'})
+    game_dom['company'] = game_dom['company'].fillna("unknown")
+    game_dom = game_dom.sort_values(DOM_COL, ascending=False)
     game_dom.to_csv(os.path.join(OUT_DIR, "games_mean_dominance_with_company.csv"), index=False)
 
     # Save correlation top lists
@@ -255,6 +225,7 @@ def main():
     print("Files of interest:")
     for f in os.listdir(OUT_DIR):
         print(" -", f)
+    timer.report("company_sentiment_dominance_analysis", rows=len(df))
 
 if __name__ == "__main__":
     main()
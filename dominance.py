@@ -0,0 +1,177 @@
+# dominance.py
+# Computes a Dominance score for every (game, month) of FINAL_with_Dominance_MONTHLY.csv.
+#
+# Users, revenue and sentiment are laid out as game x month matrices and scored
+# per month, across all games at once:
+#   users, revenue    share of the month's leader   x / max over games  (0-1)
+#   sentiment         min-max within the month                          (0-1)
+#   IP strength       used as given (0-1) when an IP_Strength column exists
+# Dominance = weighted mean of the components a game has that month (weights are
+# renormalized over the ones present). Every month is scored only against itself,
+# so a newly arrived month can be scored on its own without touching history.
+# The score goes to its own file (game, month, Dominance_computed); the Dominance
+# column of the fact table, which the figures and analyses use, is left as it is
+# unless --write-back is given:
+#   python dominance.py                       recompute every month -> COMPUTED_FILE
+#   python dominance.py --append new.csv      score only the months in new.csv, append
+#                                             them to the fact table and COMPUTED_FILE
+#   python dominance.py --write-back          also overwrite the fact table's Dominance
+#   python dominance.py --figures             also redraw Dominance_Top5_trends_FIXED.png
+#                                             and Top10_Dominance_overall.png
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from lag_correlation import panel_matrices, month_index
+
+# CONFIG - update paths if needed
+DOM_FILE = r"C:\Disertation\processed\FINAL_with_Dominance_MONTHLY.csv"
+COMPUTED_FILE = r"C:\Disertation\processed\Dominance_computed_MONTHLY.csv"
+FIG_DIR = r"C:\Disertation\processed\Company_Analysis"
+GAME_COL = "game_norm"
+DATE_COL = "year_month"
+DOM_COL = "Dominance"
+COMPUTED_COL = "Dominance_computed"
+COMPONENTS = {   # component -> (column, weight)
+    'users': ("Monthly_Active_Users_Millions", 0.35),
+    'revenue': ("Monthly_Revenue_USD_Millions", 0.35),
+    'sentiment': ("avg_sentiment", 0.2),
+    'ip': ("IP_Strength", 0.1),
+}
+
+
+# ---------- Scores ----------
+def share_of_leader(m):
+    # games x months -> value / the month's largest value (negative values count as 0)
+    lead = np.fmax.reduce(m, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(lead > 0, np.clip(m, 0, None) / lead, np.where(np.isnan(m), np.nan, 1.0))
+
+
+def min_max(m):
+    # games x months -> 0-1 within each month (1 for every game when all are equal)
+    lo, hi = np.fmin.reduce(m, axis=0), np.fmax.reduce(m, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(hi > lo, (m - lo) / (hi - lo), np.where(np.isnan(m), np.nan, 1.0))
+
+
+def dominance_matrix(mats):
+    # {component: games x months} raw values -> Dominance, games x months
+    scores = {'users': share_of_leader, 'revenue': share_of_leader, 'sentiment': min_max,
+              'ip': lambda m: np.clip(m, 0, 1)}
+    num = den = 0.0
+    for name, m in mats.items():
+        s = scores[name](m)
+        w = COMPONENTS[name][1]
+        num = num + w * np.nan_to_num(s)
+        den = den + w * ~np.isnan(s)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / den, np.nan)
+
+
+def compute_dominance(df, game_col=GAME_COL, date_col=DATE_COL):
+    # Dominance for every row of a (game, month) table, as a Series on df's index;
+    # rows without a game or a parseable month get NaN
+    cols = {name: col for name, (col, _) in COMPONENTS.items() if col in df.columns}
+    games, months, mats = panel_matrices(df, list(cols.values()), game_col, date_col)
+    dom = dominance_matrix({name: mats[col] for name, col in cols.items()})
+    keys = month_index(df[date_col]).to_numpy(dtype=float)
+    g = games.get_indexer(df[game_col])
+    ok = (g >= 0) & ~np.isnan(keys)
+    t = np.searchsorted(months, keys[ok])
+    out = np.full(len(df), np.nan)
+    out[ok] = dom[g[ok], t]
+    return pd.Series(out, index=df.index, name=COMPUTED_COL)
+
+
+# ---------- Fact table ----------
+def write_csv(df, path):
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)   # never leave a half-written fact table behind
+
+
+def append_rows(df, path):
+    # append df under path's header, in path's column order
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    with open(path, "r+b") as f:   # make sure the last row ends with a newline
+        f.seek(0, os.SEEK_END)
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) not in (b"\n", b"\r"):
+                f.write(os.linesep.encode())
+    with open(path, "a", encoding="utf-8", newline="") as out:
+        df.reindex(columns=columns).to_csv(out, header=False, index=False)
+
+
+def computed_rows(df):
+    return pd.concat([df[[GAME_COL, DATE_COL]], compute_dominance(df)], axis=1)
+
+
+def recompute_all(path=DOM_FILE, out=COMPUTED_FILE, write_back=False):
+    df = pd.read_csv(path, low_memory=False)
+    scored = computed_rows(df)
+    write_csv(scored, out)
+    print(f"Computed Dominance for {scored[COMPUTED_COL].notna().sum()} of {len(df)} rows -> {out}")
+    if write_back:
+        df[DOM_COL] = scored[COMPUTED_COL]
+        write_csv(df, path)
+        print(f"Overwrote {DOM_COL} in {path}")
+    return df
+
+
+def append_months(new_path, path=DOM_FILE, out=COMPUTED_FILE, write_back=False):
+    # score the month(s) in new_path on their own and append them to the fact table
+    # (their Dominance is taken from new_path unless write_back) and to out
+    new = pd.read_csv(new_path, low_memory=False)
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    have = set(month_index(pd.read_csv(path, usecols=[DATE_COL])[DATE_COL]).dropna().astype(int))
+    overlap = sorted(set(month_index(new[DATE_COL]).dropna().astype(int)) & have)
+    if overlap:
+        shown = [f"{(m - 1) // 12:04d}-{(m - 1) % 12 + 1:02d}" for m in overlap]
+        raise SystemExit(f"⚠️ Month(s) already in {path}: {shown}. Run a full recompute instead.")
+    scored = computed_rows(new)
+    if write_back:
+        new[DOM_COL] = scored[COMPUTED_COL]
+    extra = [c for c in new.columns if c not in columns]
+    if extra:
+        print(f"⚠️ Columns not in the fact table are dropped: {extra}")
+    append_rows(new, path)
+    print(f"Appended {len(new)} rows ({new[DATE_COL].nunique()} month(s)) -> {path}")
+    if os.path.exists(out):
+        append_rows(scored, out)
+        print(f"Appended their computed Dominance -> {out}")
+    else:   # no earlier run: score every month, the new ones included
+        recompute_all(path, out)
+
+
+# ---------- Figures ----------
+def plot_figures(df, out_dir=FIG_DIR):
+    # the two Dominance figures of the README, through the figure renderer
+    # (redrawn only when the Dominance values behind them changed)
+    from render_figures import dominance_jobs, render
+    render(dominance_jobs(df, GAME_COL, DATE_COL, DOM_COL), out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute Dominance for the monthly fact table.")
+    parser.add_argument('--append', metavar='CSV',
+                        help="score only the new month(s) in CSV and append them to the fact table")
+    parser.add_argument('--write-back', action='store_true',
+                        help="also overwrite the Dominance column of the fact table with the computed score")
+    parser.add_argument('--figures', action='store_true', help="redraw the Dominance figures")
+    args = parser.parse_args()
+
+    if args.append:
+        append_months(args.append, write_back=args.write_back)
+        df = pd.read_csv(DOM_FILE, low_memory=False) if args.figures else None
+    else:
+        df = recompute_all(write_back=args.write_back)
+    if args.figures:
+        plot_figures(df)
+
+
+if __name__ == "__main__":
+    main()
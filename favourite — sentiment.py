@@ -1,13 +1,14 @@
 import pandas as pd, os
+
+from monthly_panel import load_panel
 DOM_FILE = r"C:\Disertation\processed\FINAL_with_Dominance_MONTHLY.csv"
 OUTDIR = r"C:\Disertation\processed\Company_Analysis"
 os.makedirs(OUTDIR, exist_ok=True)
 
-df = pd.read_csv(DOM_FILE, low_memory=False)
-df['game_norm'] = df['game_norm'].astype(str).str.lower().str.strip()
+df = load_panel(DOM_FILE)   # typed, cached panel with canonical (categorical) game_norm
 
 # mean sentiment and sd, mean users
-agg = df.groupby('game_norm').agg(
+agg = df.groupby('game_norm', observed=True).agg(
     mean_sent=('avg_sentiment','mean'),
     sd_sent=('avg_sentiment','std'),
     mean_users=('Monthly_Active_Users_Millions','mean'),
@@ -0,0 +1,266 @@
+# forecast_models.py
+# AR(1) / ARX forecasts for every game, fitted as one batched least-squares problem.
+#
+# The monthly panel (monthly_panel.py) is laid out as game x month matrices and
+# lagged design matrices are built for all games at once:
+#   AR(p):  y_t = c + a_1 y_{t-1} + ... + a_p y_{t-p}
+#   ARX(p): AR(p) + b_1 s_{t-1} + ... + b_p s_{t-p}      (s = avg_sentiment)
+# Per game, the last TEST_MONTHS usable months are held out and both models are
+# fitted on the same earlier months. The normal equations of all games are solved
+# in one batched call and the one-step-ahead RMSE on the held-out months is
+# written to forecast_summary_manual.csv (read by "AR1_RMSE vs ARX_RMSE.py").
+# --grid also fits other targets / lag orders, optionally on a process pool.
+# --backtest instead forecasts every month from the fit on the months before it
+# (rolling origin), extending the fits one month at a time by recursive least
+# squares; --window N keeps only the last N months in each fit. Its errors and
+# per-game RMSEs go to forecast_backtest_errors.csv / forecast_backtest_summary.csv.
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lag_correlation import panel_matrices
+from monthly_panel import load_panel, DOM_FILE
+
+# CONFIG - update paths if needed
+OUT_DIR = r"C:\Disertation\processed\Forecasts_manual"
+GAME_COL = "game_norm"
+DATE_COL = "year_month"
+TARGET_COL = "Monthly_Active_Users_Millions"
+EXOG_COL = "avg_sentiment"
+TEST_MONTHS = 12         # held-out months per game
+MIN_TRAIN = 12           # games with fewer training months get no forecast
+
+GRID_TARGETS = ["Monthly_Active_Users_Millions", "Monthly_Revenue_USD_Millions", "Dominance"]
+GRID_LAGS = [1, 2, 3]
+
+
+# ---------- Design matrices ----------
+def lagged(m, lag):
+    # games x months matrix shifted `lag` months later (NaN where there is no history)
+    out = np.full_like(m, np.nan)
+    if lag < m.shape[1]:
+        out[:, lag:] = m[:, :m.shape[1] - lag]
+    return out
+
+
+def design(mats, target, exogs=(), lags=1):
+    # -> X (games x months x k: constant, target lags, exog lags), y (games x months)
+    # and the months where every regressor and y are present
+    y = mats[target]
+    cols = [np.ones_like(y)] + [lagged(y, l) for l in range(1, lags + 1)]
+    cols += [lagged(mats[x], l) for x in exogs for l in range(1, lags + 1)]
+    X = np.stack(cols, axis=-1)
+    ok = ~np.isnan(y) & ~np.isnan(X).any(-1)
+    return X, y, ok
+
+
+def split_train_test(ok, test_months, min_train):
+    # last `test_months` usable months of each game are the test set; games with
+    # fewer than `min_train` months before that get neither
+    seen = np.cumsum(ok, axis=1)
+    n_ok = seen[:, -1:] if ok.shape[1] else np.zeros((ok.shape[0], 1), dtype=int)
+    test = ok & (seen > n_ok - test_months)
+    train = ok & ~test
+    enough = train.sum(1, keepdims=True) >= min_train
+    return train & enough, test & enough
+
+
+# ---------- Batched least squares ----------
+def fit_batched(X, y, mask):
+    # least squares per game over the months in `mask`, all games at once
+    # (pinv: a constant or too-short series gets the minimum-norm solution)
+    Xm = np.where(mask[..., None], X, 0.0)
+    ym = np.where(mask, y, 0.0)
+    XtX = np.einsum('gtk,gtl->gkl', Xm, Xm)
+    Xty = np.einsum('gtk,gt->gk', Xm, ym)
+    return np.einsum('gkl,gl->gk', np.linalg.pinv(XtX), Xty)
+
+
+def predict(X, beta):
+    return np.einsum('gtk,gk->gt', np.nan_to_num(X), beta)
+
+
+def rmse(y, pred, mask):
+    err2 = np.where(mask, (y - pred) ** 2, 0.0)
+    n = mask.sum(1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, np.sqrt(err2.sum(1) / n), np.nan)
+
+
+def fit_pair(mats, target, exog=EXOG_COL, lags=1, test_months=TEST_MONTHS, min_train=MIN_TRAIN):
+    # AR(lags) and ARX(lags) on the same train / test months
+    # -> dict of per-game arrays (n_train, n_test, AR/ARX coefficients and RMSE)
+    X, y, ok = design(mats, target, [exog], lags)
+    k_ar = 1 + lags   # ARX columns = AR columns + exog lags
+    train, test = split_train_test(ok, test_months, min_train)
+    out = {'n_train': train.sum(1), 'n_test': test.sum(1)}
+    for name, cols in (('AR', X[..., :k_ar]), ('ARX', X)):
+        beta = fit_batched(cols, y, train)
+        beta[out['n_train'] == 0] = np.nan
+        out[name + '_beta'] = beta
+        out[name + '_RMSE'] = np.where(out['n_train'] > 0, rmse(y, predict(cols, beta), test), np.nan)
+    return out
+
+
+# ---------- Rolling-origin backtest (recursive least squares) ----------
+def _rls_add(P, beta, x, y):
+    # add one observation per game: rank-one update of P = (X'X)^-1 and beta
+    Px = np.einsum('gkl,gl->gk', P, x)
+    gain = Px / (1 + np.einsum('gk,gk->g', x, Px))[:, None]
+    beta = beta + gain * (y - np.einsum('gk,gk->g', x, beta))[:, None]
+    return P - gain[:, :, None] * Px[:, None, :], beta
+
+
+def _rls_drop(P, beta, x, y):
+    # remove one observation per game (rank-one downdate)
+    Px = np.einsum('gkl,gl->gk', P, x)
+    gain = Px / (1 - np.einsum('gk,gk->g', x, Px))[:, None]
+    beta = beta - gain * (y - np.einsum('gk,gk->g', x, beta))[:, None]
+    return P + gain[:, :, None] * Px[:, None, :], beta
+
+
+def rls_backtest(X, y, ok, min_train=MIN_TRAIN, window=None):
+    # one-step-ahead error at every usable month of every game (NaN elsewhere), each
+    # forecast from the fit on the earlier usable months (only the last `window` of
+    # them if given). A fit starts from the normal equations of its first `min_train`
+    # months and is then extended, and for a window also shortened, by rank-one updates.
+    n_games, n_months, k = X.shape
+    window = max(window or 0, 0)
+    if window and window < min_train:
+        raise ValueError(f"window ({window}) must be at least min_train ({min_train})")
+    X, y = np.nan_to_num(X), np.nan_to_num(y)
+    XtX, Xty = np.zeros((n_games, k, k)), np.zeros((n_games, k))
+    P, beta = np.zeros((n_games, k, k)), np.zeros((n_games, k))
+    n_fit = np.zeros(n_games, dtype=int)
+    # usable months in order, per game (to find the month that leaves a window)
+    rank = np.cumsum(ok, axis=1) - 1
+    pos = np.zeros((n_games, n_months), dtype=int)
+    g_ok, t_ok = np.nonzero(ok)
+    pos[g_ok, rank[g_ok, t_ok]] = t_ok
+    err = np.full((n_games, n_months), np.nan)
+
+    for t in range(n_months):
+        x, yt = X[:, t], y[:, t]
+        fitted = ok[:, t] & (n_fit >= min_train)
+        g = np.flatnonzero(fitted)
+        if len(g):
+            err[g, t] = yt[g] - np.einsum('gk,gk->g', x[g], beta[g])
+            if window:
+                full = g[n_fit[g] >= window]
+                old = pos[full, rank[full, t] - window]
+                P[full], beta[full] = _rls_drop(P[full], beta[full], X[full, old], y[full, old])
+                n_fit[full] -= 1
+            P[g], beta[g] = _rls_add(P[g], beta[g], x[g], yt[g])
+        # games still collecting their first min_train months
+        warm = np.flatnonzero(ok[:, t] & ~fitted)
+        XtX[warm] += x[warm, :, None] * x[warm, None, :]
+        Xty[warm] += x[warm] * yt[warm, None]
+        n_fit[ok[:, t]] += 1
+        start = warm[n_fit[warm] == min_train]
+        if len(start):
+            P[start] = np.linalg.pinv(XtX[start])
+            beta[start] = np.einsum('gkl,gl->gk', P[start], Xty[start])
+    return err
+
+
+def backtest(games, months, mats, min_train=MIN_TRAIN, window=None):
+    # AR(1) vs ARX(1) on the users series at every forecast origin
+    # -> (per-origin errors, per-game summary with AR1_RMSE / ARX_RMSE)
+    X, y, ok = design(mats, TARGET_COL, [EXOG_COL], 1)
+    errs = {'AR1': rls_backtest(X[..., :2], y, ok, min_train, window),
+            'ARX': rls_backtest(X, y, ok, min_train, window)}
+    g, t = np.nonzero(~np.isnan(errs['ARX']))
+    keys = months[t]
+    errors = pd.DataFrame({'game': games.to_numpy()[g],
+                           'year_month': [f"{(m - 1) // 12:04d}-{(m - 1) % 12 + 1:02d}" for m in keys],
+                           'AR1_error': errs['AR1'][g, t], 'ARX_error': errs['ARX'][g, t]})
+    n = (~np.isnan(errs['ARX'])).sum(1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary = pd.DataFrame({'game': games.to_numpy(), 'n_origins': n,
+                                'AR1_RMSE': np.sqrt(np.nansum(errs['AR1'] ** 2, 1) / n),
+                                'ARX_RMSE': np.sqrt(np.nansum(errs['ARX'] ** 2, 1) / n)})
+    return errors, summary
+
+
+# ---------- Outputs ----------
+def forecast_summary(games, mats, test_months=TEST_MONTHS, min_train=MIN_TRAIN):
+    # AR(1) vs ARX(1) on the users series, one row per game (forecast_summary_manual.csv)
+    fit = fit_pair(mats, TARGET_COL, EXOG_COL, 1, test_months, min_train)
+    ar, arx = fit['AR_beta'], fit['ARX_beta']
+    return pd.DataFrame({
+        'game': games.to_numpy(), 'n_train': fit['n_train'], 'n_test': fit['n_test'],
+        'AR1_const': ar[:, 0], 'AR1_phi': ar[:, 1],
+        'ARX_const': arx[:, 0], 'ARX_phi': arx[:, 1], 'ARX_sent': arx[:, 2],
+        'AR1_RMSE': fit['AR_RMSE'], 'ARX_RMSE': fit['ARX_RMSE']
+    })
+
+
+def _grid_cell(games, mats, target, lags, test_months, min_train):
+    fit = fit_pair(mats, target, EXOG_COL, lags, test_months, min_train)
+    return pd.DataFrame({'game': games.to_numpy(), 'target': target, 'lags': lags,
+                         'n_train': fit['n_train'], 'n_test': fit['n_test'],
+                         'AR_RMSE': fit['AR_RMSE'], 'ARX_RMSE': fit['ARX_RMSE']})
+
+
+def forecast_grid(games, mats, targets=GRID_TARGETS, lags=GRID_LAGS, workers=1,
+                  test_months=TEST_MONTHS, min_train=MIN_TRAIN):
+    # AR(p) vs ARX(p) for every target x lag order; cells run on a process pool when workers > 1
+    cells = [(t, p) for t in targets for p in lags]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:   # each worker gets only its two matrices
+            futures = [pool.submit(_grid_cell, games, {t: mats[t], EXOG_COL: mats[EXOG_COL]}, t, p,
+                                   test_months, min_train) for t, p in cells]
+            parts = [f.result() for f in futures]
+    else:
+        parts = [_grid_cell(games, mats, t, p, test_months, min_train) for t, p in cells]
+    return pd.concat(parts, ignore_index=True)
+
+
+def load_matrices(path=None):
+    panel = load_panel(path or DOM_FILE)
+    for col in [TARGET_COL, EXOG_COL] + GRID_TARGETS:
+        if col not in panel.columns:
+            panel[col] = np.nan
+    return panel_matrices(panel, sorted(set([TARGET_COL, EXOG_COL] + GRID_TARGETS)), GAME_COL, DATE_COL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit AR(1) / ARX forecasts for all games.")
+    parser.add_argument('--test-months', type=int, default=TEST_MONTHS,
+                        help=f"held-out months per game (default {TEST_MONTHS})")
+    parser.add_argument('--grid', action='store_true',
+                        help="also fit every target x lag order into forecast_grid_manual.csv")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker processes for --grid (default 1 = serial)")
+    parser.add_argument('--backtest', action='store_true',
+                        help="score one-step forecasts at every origin instead of one train / test split")
+    parser.add_argument('--window', type=int, default=None,
+                        help="with --backtest: fit on the last N months only (default: expanding)")
+    args = parser.parse_args()
+
+    games, months, mats = load_matrices()
+    os.makedirs(OUT_DIR, exist_ok=True)
+    if args.backtest:
+        errors, summary = backtest(games, months, mats, window=args.window)
+        errors.to_csv(os.path.join(OUT_DIR, "forecast_backtest_errors.csv"), index=False)
+        summary.to_csv(os.path.join(OUT_DIR, "forecast_backtest_summary.csv"), index=False)
+        kind = f"{args.window}-month window" if args.window else "expanding window"
+        print(f"Backtested AR(1) / ARX ({kind}) over {len(errors)} origins in "
+              f"{(summary['n_origins'] > 0).sum()} games -> {OUT_DIR}")
+        return
+    summary = forecast_summary(games, mats, args.test_months)
+    summary.to_csv(os.path.join(OUT_DIR, "forecast_summary_manual.csv"), index=False)
+    fitted = summary['AR1_RMSE'].notna().sum()
+    print(f"Fitted AR(1) / ARX for {fitted} of {len(summary)} games -> {OUT_DIR}")
+
+    if args.grid:
+        grid = forecast_grid(games, mats, workers=args.workers, test_months=args.test_months)
+        grid.to_csv(os.path.join(OUT_DIR, "forecast_grid_manual.csv"), index=False)
+        print(f"Saved {len(grid)} grid fits to forecast_grid_manual.csv")
+
+
+if __name__ == "__main__":
+    main()
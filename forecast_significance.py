@@ -0,0 +1,107 @@
+# forecast_significance.py
+# Is ARX (with sentiment) really better than AR(1)? Tests on the per-origin forecast
+# errors written by `forecast_models.py --backtest` (forecast_backtest_errors.csv).
+#
+# Loss differential d_t = AR1_error_t^2 - ARX_error_t^2 (> 0: ARX was better), per
+# game and pooled over all games:
+#   Diebold-Mariano test with the Harvey-Leybourne-Newbold small-sample correction
+#   (one-step forecasts, t distribution with n - 1 df; no SciPy needed)
+#   moving-block bootstrap of mean(d): percentile 95% interval and a two-sided p-value.
+# Bootstrap draws are NumPy index arrays (replicates x blocks) per game; the pooled
+# statistic reuses the same replicates (blocks are drawn within games). Every game
+# has its own random stream, so results do not depend on the number of workers.
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lag_correlation import t_pvalue
+
+# CONFIG
+N_BOOT = 10000
+BLOCK_LEN = None         # None = ceil(n ** (1/3)) per game
+SEED = 2024
+CI = 0.95
+
+
+# ---------- Diebold-Mariano ----------
+def dm_test(d, h=1):
+    # -> (statistic, p-value) for mean loss differential 0, h-step forecasts
+    d = np.asarray(d, dtype=float)
+    n = len(d)
+    if n < 3:
+        return np.nan, np.nan
+    dc = d - d.mean()
+    lrv = dc @ dc / n
+    for lag in range(1, h):   # autocovariances up to h - 1
+        lrv += 2 * (dc[lag:] @ dc[:-lag]) / n
+    if lrv <= 0:
+        return np.nan, np.nan
+    stat = d.mean() / math.sqrt(lrv / n)
+    stat *= math.sqrt((n + 1 - 2 * h + h * (h - 1) / n) / n)   # Harvey et al. (1997)
+    return stat, float(t_pvalue(stat, n - 1))
+
+
+# ---------- Moving-block bootstrap ----------
+def block_indices(n, n_boot, block_len, rng):
+    # n_boot x n resample of positions 0..n-1 made of overlapping blocks
+    n_blocks = -(-n // block_len)
+    starts = rng.integers(0, n - block_len + 1, size=(n_boot, n_blocks))
+    return (starts[:, :, None] + np.arange(block_len)).reshape(n_boot, -1)[:, :n]
+
+
+def bootstrap_sums(d, n_boot=N_BOOT, block_len=BLOCK_LEN, seed=None):
+    # sum of d in each bootstrap replicate (n_boot,)
+    d = np.asarray(d, dtype=float)
+    n = len(d)
+    block_len = min(block_len or math.ceil(n ** (1 / 3)), n)
+    idx = block_indices(n, n_boot, block_len, np.random.default_rng(seed))
+    return d[idx].sum(1)
+
+
+def _game_sums(series, n_boot, block_len, seeds):
+    return [bootstrap_sums(d, n_boot, block_len, s) for d, s in zip(series, seeds)]
+
+
+def bootstrap_summary(mean, boot_means, ci=CI):
+    # percentile interval and two-sided p-value (replicates centred on the estimate)
+    lo, hi = np.percentile(boot_means, [50 * (1 - ci), 50 * (1 + ci)])
+    p = (np.abs(boot_means - mean) >= abs(mean)).mean()
+    return lo, hi, p
+
+
+# ---------- Per game + pooled ----------
+def significance(errors, game_col='game', n_boot=N_BOOT, block_len=BLOCK_LEN, seed=SEED, workers=1):
+    # per-origin errors (game, AR1_error, ARX_error) -> (per-game table, pooled dict)
+    errors = errors.dropna(subset=['AR1_error', 'ARX_error'])
+    d_all = (errors['AR1_error'] ** 2 - errors['ARX_error'] ** 2).to_numpy()
+    codes, games = pd.factorize(errors[game_col], sort=True)
+    order = np.argsort(codes, kind='stable')
+    series = np.split(d_all[order], np.cumsum(np.bincount(codes, minlength=len(games)))[:-1]) if len(games) else []
+    seeds = np.random.SeedSequence(seed).spawn(len(series))
+
+    if workers > 1 and len(series) > 1:
+        chunks = np.array_split(np.arange(len(series)), workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_game_sums, [series[i] for i in c], n_boot, block_len, [seeds[i] for i in c])
+                       for c in chunks if len(c)]
+            sums = [s for f in futures for s in f.result()]
+    else:
+        sums = _game_sums(series, n_boot, block_len, seeds)
+
+    rows = []
+    for game, d, s in zip(games, series, sums):
+        stat, p = dm_test(d)
+        lo, hi, bp = bootstrap_summary(d.mean(), s / len(d)) if len(d) >= 2 else (np.nan,) * 3
+        rows.append({'game': game, 'n_diff': len(d), 'mean_loss_diff': d.mean() if len(d) else np.nan,
+                     'DM_stat': stat, 'DM_p': p, 'boot_ci_low': lo, 'boot_ci_high': hi, 'boot_p': bp})
+    per_game = pd.DataFrame(rows, columns=['game', 'n_diff', 'mean_loss_diff', 'DM_stat', 'DM_p',
+                                           'boot_ci_low', 'boot_ci_high', 'boot_p'])
+
+    # pooled: mean over all origins; bootstrap = same replicates summed over games
+    pooled = {'game': 'ALL (pooled)', 'n_diff': len(d_all), 'mean_loss_diff': d_all.mean() if len(d_all) else np.nan}
+    pooled['DM_stat'], pooled['DM_p'] = dm_test(d_all)
+    pooled['boot_ci_low'], pooled['boot_ci_high'], pooled['boot_p'] = (
+        bootstrap_summary(d_all.mean(), np.sum(sums, axis=0) / len(d_all)) if len(d_all) >= 2 else (np.nan,) * 3)
+    return per_game, pooled
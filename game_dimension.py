@@ -0,0 +1,185 @@
+# game_dimension.py
+# Canonical game / company dimension shared by the analysis scripts.
+#
+# Built once from pushpa60_SORTED.csv (Game_Name, Company) and game_aliases.json,
+# then cached (rebuilt when either file changes):
+#   games:     game_id (int16), game_norm (canonical lower-case name), game_name, company_id
+#   companies: company_id (int16), company
+# attach_dimensions(df) adds integer ids plus categorical game_norm / Company columns
+# to a fact table. Names are normalized and resolved once per distinct value and the
+# company is joined by integer position, not by string. Names that match no game are
+# reported here, in one place (printed and listed in unmatched_games.csv).
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# CONFIG - update paths if needed
+META_FILE = r"C:\Disertation\final\pushpa60_SORTED.csv"
+CACHE_DIR = r"C:\Disertation\processed\dimension_cache"
+ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "game_aliases.json")   # alias -> canonical
+DIMENSION_VERSION = 1
+
+_BOM_PREFIXES = ('\ufeff', 'ï»¿')   # BOM decoded as utf-8 / as latin1
+
+
+def clean_column(name):
+    # column name without a leading BOM (in either decoding) and surrounding spaces
+    name = str(name)
+    for bom in _BOM_PREFIXES:
+        if name.startswith(bom):
+            name = name[len(bom):]
+    return name.strip()
+
+
+def _normalize(name):
+    name = clean_column(name).replace('\u2019', "'").replace('_', ' ').lower()
+    return ' '.join(name.split())
+
+
+def load_aliases(path=None):
+    path = path or ALIASES_FILE
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {_normalize(k): _normalize(v) for k, v in json.load(f).items()}
+
+
+def normalize_names(values, aliases=None):
+    # raw game names -> canonical keys as an object array (NaN stays NaN); each
+    # distinct value is normalized and alias-resolved once
+    aliases = load_aliases() if aliases is None else aliases
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    canon = np.array([aliases.get(n, n) for n in map(_normalize, uniques)] + [np.nan], dtype=object)
+    return canon[codes]   # code -1 (missing) picks the trailing NaN
+
+
+# ---------- Building & caching ----------
+def read_meta(path=None):
+    # Game_Name / Company columns of the metadata file, whatever its BOM handling
+    path = path or META_FILE
+    wanted = lambda c: clean_column(c) in ('Game_Name', 'Company')
+    try:
+        meta = pd.read_csv(path, encoding='utf-8-sig', usecols=wanted, dtype=str)
+    except UnicodeDecodeError:
+        meta = pd.read_csv(path, encoding='latin1', usecols=wanted, dtype=str)
+    meta.columns = [clean_column(c) for c in meta.columns]
+    return meta
+
+
+def _most_frequent(values):
+    counts = values.dropna().value_counts()
+    return counts.index[0] if len(counts) else np.nan
+
+
+def build_dimensions(meta, aliases=None):
+    # metadata rows -> (games, companies) tables with small integer ids
+    meta = pd.DataFrame({'game_norm': normalize_names(meta['Game_Name'], aliases),
+                         'game_name': meta['Game_Name'].str.strip(),
+                         'company': meta['Company'].str.strip().str.split().str.join(' ')})
+    meta = meta.dropna(subset=['game_norm'])
+    meta['company_key'] = meta['company'].str.lower()
+
+    # a company spelled several ways is one company, shown in its most common spelling
+    company_names = meta.groupby('company_key')['company'].agg(_most_frequent)
+    companies = pd.DataFrame({'company_id': np.arange(len(company_names), dtype=np.int16),
+                              'company': company_names.to_numpy()})
+    company_ids = pd.Series(companies['company_id'].to_numpy(), index=company_names.index)
+
+    # a game listed under several companies takes the one it is listed with most
+    by_game = meta.groupby('game_norm')
+    game_company = by_game['company_key'].agg(_most_frequent)
+    games = pd.DataFrame({'game_id': np.arange(len(game_company), dtype=np.int16),
+                          'game_norm': game_company.index.to_numpy(),
+                          'game_name': by_game['game_name'].agg(_most_frequent).to_numpy(),
+                          'company_id': game_company.map(company_ids).fillna(-1).astype(np.int16).to_numpy()})
+    return games, companies
+
+
+def _source_key(meta_path):
+    h = hashlib.sha1(f"{DIMENSION_VERSION}|{os.path.getsize(meta_path)}|{os.path.getmtime(meta_path)}".encode())
+    if os.path.exists(ALIASES_FILE):
+        with open(ALIASES_FILE, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _temp_path(path):
+    # a fresh temp file next to path, to write and then os.replace onto it; unique, so
+    # stages loading the same cache in parallel never write into each other's file
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(path))
+    os.close(fd)
+    return tmp
+
+
+_LOADED = {}
+
+
+def load_dimensions(meta_path=None, cache_dir=None):
+    # (games, companies), from the on-disk cache while the metadata / aliases are unchanged
+    meta_path = meta_path or META_FILE
+    cache_dir = cache_dir or CACHE_DIR
+    key = _source_key(meta_path)
+    if key in _LOADED:
+        return _LOADED[key]
+    cache = os.path.join(cache_dir, 'dimensions.pkl')
+    dims = None
+    if os.path.exists(cache):
+        cached = pd.read_pickle(cache)
+        if cached.get('key') == key:
+            dims = cached['games'], cached['companies']
+    if dims is None:
+        dims = build_dimensions(read_meta(meta_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = _temp_path(cache)
+        pd.to_pickle({'key': key, 'games': dims[0], 'companies': dims[1]}, tmp)
+        os.replace(tmp, cache)
+        games = dims[0]
+        print(f"Built game dimension: {len(games)} games, {len(dims[1])} companies"
+              f" ({(games['company_id'] < 0).sum()} games without a company)")
+    _LOADED[key] = dims
+    return dims
+
+
+# ---------- Joining ----------
+def report_unmatched(names, source, cache_dir=None):
+    # print names that match no game and keep them listed in unmatched_games.csv
+    names = sorted(set(names))
+    if not names:
+        return
+    print(f"⚠️ {len(names)} game name(s) in {source} match no game in the metadata: {names}")
+    path = os.path.join(cache_dir or CACHE_DIR, 'unmatched_games.csv')
+    new = pd.DataFrame({'game_norm': names, 'source': source})
+    if os.path.exists(path):
+        new = pd.concat([pd.read_csv(path), new]).drop_duplicates()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = _temp_path(path)
+    new.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def attach_dimensions(df, game_col='game_norm', company_col='Company', source='fact table'):
+    # adds game_id / company_id (int16, -1 = unknown) and replaces df[game_col] with the
+    # canonical name and df[company_col] with the company, both categorical
+    games, companies = load_dimensions()
+    codes, uniques = pd.factorize(pd.Series(df[game_col], dtype=object))
+    canon = pd.Index(normalize_names(uniques))
+    game_pos = pd.Index(games['game_norm']).get_indexer(canon)   # -1 where unmatched
+    report_unmatched(canon[(game_pos < 0) & canon.notna()], source)
+
+    # every distinct canonical name becomes a category (sorted, so groupby order is
+    # the same as for plain strings); unmatched games keep their name, no company
+    categories = pd.Index(canon.dropna().unique()).sort_values()
+    cat_codes = np.append(categories.get_indexer(canon), -1)[codes]
+    game_ids = np.append(game_pos, -1).astype(np.int16)   # game_id is the row in `games`
+    company_ids = np.append(games['company_id'].to_numpy(), -1).astype(np.int16)
+
+    df = df.copy()
+    df[game_col] = pd.Categorical.from_codes(cat_codes, categories=categories)
+    df['game_id'] = game_ids[codes]
+    df['company_id'] = company_ids[df['game_id'].to_numpy()]   # game_id -1 -> trailing -1
+    df[company_col] = pd.Categorical.from_codes(df['company_id'].to_numpy(), categories=companies['company'])
+    return df
@@ -0,0 +1,142 @@
+# lag_correlation.py
+# Pearson correlations of one panel column (e.g. avg_sentiment) against others
+# (users, revenue, Dominance) at lags 0..K for every game in one vectorized pass.
+#
+# The (game, month) panel is laid out once as game x month matrices on a calendar
+# month grid (missing months are NaN), the driver is shifted by 0..K months, and r,
+# n and the two-sided p-value are computed for all metrics x lags x games at once,
+# using only the months where both values are present. p-values come from the
+# Student t distribution via the regularized incomplete beta function, so SciPy is
+# not needed.
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# ---------- Panel layout ----------
+def month_index(values):
+    # "YYYY-MM" (or any date) values -> integer month key year*12 + month (NaN if unparseable)
+    dates = pd.to_datetime(pd.Series(values, dtype=object).astype(str).str[:7], format='%Y-%m', errors='coerce')
+    return dates.dt.year * 12 + dates.dt.month
+
+
+def panel_matrices(df, columns, game_col='game_norm', date_col='year_month'):
+    # -> (games, months, {column: games x months float array}); rows of the same
+    # game and month are averaged
+    months = month_index(df[date_col])
+    keep = months.notna().to_numpy() & df[game_col].notna().to_numpy()
+    game_codes, games = pd.factorize(df[game_col][keep], sort=True)
+    months = months[keep].astype(np.int64).to_numpy()
+    first = months.min() if len(months) else 0
+    n_months = (months.max() - first + 1) if len(months) else 0
+    cells = game_codes * n_months + (months - first)
+    shape = (len(games), n_months)
+
+    out = {}
+    for col in columns:
+        values = pd.to_numeric(df[col][keep], errors='coerce').to_numpy(dtype=float)
+        ok = ~np.isnan(values)
+        sums = np.bincount(cells[ok], weights=values[ok], minlength=shape[0] * shape[1])
+        counts = np.bincount(cells[ok], minlength=shape[0] * shape[1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[col] = (sums / counts).reshape(shape)   # 0/0 -> NaN for empty cells
+    month_keys = np.arange(first, first + n_months)
+    return pd.Index(games, name=game_col), month_keys, out
+
+
+# ---------- p-values without SciPy ----------
+_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def _betacf(a, b, x, iters=300):
+    # continued fraction of the incomplete beta function (modified Lentz), elementwise
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1, a - 1
+    c = np.ones_like(x)
+    d = 1 - qab * x / qap
+    d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+    h = d
+    for m in range(1, iters + 1):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+                   -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1 + aa * d
+            d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + aa / c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = d * c
+            h = h * delta
+        if np.all(np.abs(delta - 1) < 1e-15):
+            break
+    return h
+
+
+def betainc(a, b, x):
+    # regularized incomplete beta function I_x(a, b), elementwise
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        front = np.exp(_lgamma(a + b) - _lgamma(a) - _lgamma(b) + a * np.log(x) + b * np.log1p(-x))
+        swap = x > (a + 1) / (a + b + 2)   # the continued fraction converges fast on this side
+        xs = np.where(swap, 1 - x, x)
+        aa, bb = np.where(swap, b, a), np.where(swap, a, b)
+        part = front * _betacf(aa, bb, xs) / aa
+        out = np.where(swap, 1 - part, part)
+    out = np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, out))
+    return np.where(np.isnan(x) | np.isnan(a) | np.isnan(b), np.nan, out)
+
+
+def t_pvalue(t, df):
+    # two-sided p-value of a Student t statistic with df degrees of freedom
+    t = np.asarray(t, dtype=float)
+    df = np.asarray(df, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        x = np.where(df > 0, df / (df + t * t), np.nan)
+        p = betainc(np.where(df > 0, df / 2, np.nan), 0.5, x)
+    return np.where(np.isnan(t) | (df <= 0), np.nan, np.clip(p, 0.0, 1.0))
+
+
+def pearson_pvalue(r, n):
+    # two-sided p-value of Pearson r from n pairs (t test with n - 2 degrees of freedom)
+    r = np.asarray(r, dtype=float)
+    df = np.asarray(n, dtype=float) - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(df > 0, 1 - r * r, np.nan)   # df / (df + t^2) with t^2 = df r^2 / (1 - r^2)
+        p = betainc(np.where(df > 0, df / 2, np.nan), 0.5, x)
+    return np.where(np.isnan(r) | (df <= 0), np.nan, np.clip(p, 0.0, 1.0))
+
+
+# ---------- Engine ----------
+def lagged_pearson(x, ys, max_lag):
+    # x: games x months driver, ys: metrics x games x months. Correlates x[t - lag]
+    # with y[t] -> (r, p, n), each metrics x lags x games
+    n_games, n_months = x.shape
+    shifted = np.full((max_lag + 1, n_games, n_months), np.nan)
+    for lag in range(max_lag + 1):
+        if lag < n_months:
+            shifted[lag, :, lag:] = x[:, :n_months - lag]
+    X = shifted[None]                 # 1 x lags x games x months
+    Y = np.asarray(ys)[:, None]       # metrics x 1 x games x months
+    mask = ~np.isnan(X) & ~np.isnan(Y)
+    n = mask.sum(-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        Xm = np.where(mask, X, 0.0)
+        Ym = np.where(mask, Y, 0.0)
+        dx = np.where(mask, X - (Xm.sum(-1) / n)[..., None], 0.0)
+        dy = np.where(mask, Y - (Ym.sum(-1) / n)[..., None], 0.0)
+        sxx, syy = (dx * dx).sum(-1), (dy * dy).sum(-1)
+        r = (dx * dy).sum(-1) / np.sqrt(sxx * syy)
+    # like pearson_with_p: NaN for fewer than 2 pairs or a constant series
+    r = np.where((n < 2) | (sxx <= 0) | (syy <= 0), np.nan, np.clip(r, -1.0, 1.0))
+    return r, pearson_pvalue(r, n), n
+
+
+def lag_correlations(df, x_col, y_cols, max_lag=12, game_col='game_norm', date_col='year_month'):
+    # long table (game, metric, lag, r, p, n): corr(x_col at month t - lag, metric at t)
+    games, _, mats = panel_matrices(df, [x_col] + list(y_cols), game_col, date_col)
+    r, p, n = lagged_pearson(mats[x_col], [mats[c] for c in y_cols], max_lag)
+    metrics, lags, game_idx = np.meshgrid(np.arange(len(y_cols)), np.arange(max_lag + 1),
+                                          np.arange(len(games)), indexing='ij')
+    return pd.DataFrame({'game': games.to_numpy()[game_idx.ravel()],
+                         'metric': np.asarray(y_cols, dtype=object)[metrics.ravel()],
+                         'lag': lags.ravel(), 'r': r.ravel(), 'p': p.ravel(), 'n': n.ravel()})
@@ -0,0 +1,168 @@
+# monthly_panel.py
+# Typed, cached loader for the monthly fact file FINAL_with_Dominance_MONTHLY.csv
+# shared by the analysis scripts.
+#
+# The CSV is parsed once into one schema:
+#   game_norm, Company    categorical (canonical names from game_dimension.py),
+#                         plus game_id / company_id (int16, -1 = unknown)
+#   year_month            categorical "YYYY-MM"; month_key int32 = year*12 + month
+#   numeric columns       float32
+# and written to a Feather file next to a small JSON key (source size, mtime and
+# SHA-1, plus the game dimension key). Later loads memory-map the Feather file. If
+# only the mtime changed, the source is re-hashed and the cache kept when the
+# content is the same. Without pyarrow the cache is a pickle.
+#   python monthly_panel.py             build both caches if stale (the pipeline's
+#                                       'panel' stage, run before the analysis stages)
+#   python monthly_panel.py --rebuild
+import os
+import json
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import game_dimension
+from game_dimension import attach_dimensions
+
+try:
+    import pyarrow.feather as feather
+    ARROW_AVAILABLE = True
+except Exception:
+    ARROW_AVAILABLE = False
+
+# CONFIG - update paths if needed
+DOM_FILE = r"C:\Disertation\processed\FINAL_with_Dominance_MONTHLY.csv"
+CACHE_DIR = r"C:\Disertation\processed\panel_cache"
+PANEL_VERSION = 1
+
+GAME_COL = "game_norm"
+COMPANY_COL = "Company"
+DATE_COL = "year_month"
+
+
+# ---------- Typing ----------
+def month_columns(values):
+    # dates / "YYYY-MM" text -> (categorical "YYYY-MM", month_key int32, -1 if
+    # unparseable); each distinct value is parsed once
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    text = pd.Series(uniques, dtype=object).astype(str)
+    try:
+        dates = pd.to_datetime(text, format='ISO8601', errors='coerce')
+    except (ValueError, TypeError):   # e.g. mixed UTC offsets
+        dates = pd.to_datetime(text.str[:7], format='%Y-%m', errors='coerce')
+    keys = (dates.dt.year * 12 + dates.dt.month).fillna(-1).astype(np.int32).to_numpy()
+    ym = np.where(keys >= 0, [f"{(k - 1) // 12:04d}-{(k - 1) % 12 + 1:02d}" for k in keys], text.str[:7])
+    keys, ym = np.append(keys, -1).astype(np.int32), np.append(ym, np.nan).astype(object)   # code -1 (missing)
+    return pd.Categorical(ym[codes]), keys[codes]
+
+
+def build_panel(path):
+    # parse the CSV into the shared schema
+    df = pd.read_csv(path, low_memory=False)
+    if DATE_COL not in df.columns:
+        for cand in ["Date", "date", "ds"]:
+            if cand in df.columns:
+                df[DATE_COL] = df[cand]
+                break
+    df = attach_dimensions(df, GAME_COL, COMPANY_COL, source=path)
+    df[DATE_COL], df['month_key'] = month_columns(df[DATE_COL])
+    for col in df.columns.difference(['game_id', 'company_id', 'month_key']):
+        if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+# ---------- Cache ----------
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_paths(path, cache_dir):
+    name = os.path.splitext(os.path.basename(path))[0]
+    data = os.path.join(cache_dir, name + ('.feather' if ARROW_AVAILABLE else '.pkl'))
+    return data, data + '.json'
+
+
+def _read_key(key_file):
+    try:
+        with open(key_file, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_key(key_file, key):
+    tmp = game_dimension._temp_path(key_file)
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(key, f, indent=1)
+    os.replace(tmp, key_file)
+
+
+def _cache_valid(key, path):
+    # size + mtime match -> valid without reading the source; a touched but
+    # unchanged file is recognised by its hash and the key refreshed
+    if key is None or key.get('version') != PANEL_VERSION or key.get('arrow') != ARROW_AVAILABLE:
+        return False
+    if key.get('dimension') != game_dimension._source_key(game_dimension.META_FILE):
+        return False
+    if key.get('size') != os.path.getsize(path):
+        return False
+    if key.get('mtime') == os.path.getmtime(path):
+        return True
+    if key.get('sha1') != _sha1(path):
+        return False
+    key['mtime'] = os.path.getmtime(path)
+    return 'touched'
+
+
+def load_panel(path=None, cache_dir=None, rebuild=False):
+    # the typed monthly panel, from the cache while the source file is unchanged
+    path = path or DOM_FILE
+    cache_dir = cache_dir or CACHE_DIR
+    data_file, key_file = _cache_paths(path, cache_dir)
+    key = _read_key(key_file)
+    valid = not rebuild and os.path.exists(data_file) and _cache_valid(key, path)
+    if valid:
+        if valid == 'touched':
+            _write_key(key_file, key)
+        if ARROW_AVAILABLE:
+            return feather.read_table(data_file, memory_map=True).to_pandas()
+        return pd.read_pickle(data_file)
+
+    df = build_panel(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = game_dimension._temp_path(data_file)
+    if ARROW_AVAILABLE:
+        feather.write_feather(df, tmp, compression='uncompressed')   # uncompressed so it can be memory-mapped
+    else:
+        pd.to_pickle(df, tmp)
+    try:
+        os.replace(tmp, data_file)
+    except PermissionError:
+        # another process has the old cache memory-mapped (Windows): use this panel
+        # uncached, the next load rebuilds
+        os.remove(tmp)
+        return df
+    _write_key(key_file, {'version': PANEL_VERSION, 'arrow': ARROW_AVAILABLE, 'source': path,
+                          'size': os.path.getsize(path), 'mtime': os.path.getmtime(path), 'sha1': _sha1(path),
+                          'dimension': game_dimension._source_key(game_dimension.META_FILE)})
+    print(f"Cached typed panel: {len(df)} rows -> {data_file}")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the game dimension and typed panel caches (if stale).")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the panel cache even if it is valid")
+    args = parser.parse_args()
+    game_dimension.load_dimensions()
+    df = load_panel(rebuild=args.rebuild)
+    print(f"Panel ready: {len(df)} rows, {df[GAME_COL].nunique()} games")
+
+
+if __name__ == "__main__":
+    main()
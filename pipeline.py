@@ -0,0 +1,311 @@
+# pipeline.py
+# Runs the project scripts as one pipeline: scrape -> score / aggregate -> dominance -> analysis.
+#
+# Every stage declares the script it runs, the code it depends on and the files /
+# folders it reads and writes. Stage order follows from the artifacts (a stage that
+# reads a file runs after the stage that writes it). A stage is run only when it is
+# stale: the SHA-1 of its code and inputs differs from the last successful run, or
+# one of its outputs is missing or was changed since. Hashes are cached by size and
+# mtime, so an unchanged tree costs one stat per file. Independent stages (e.g. the
+# rollups and the correlation tables) run in parallel.
+#   python pipeline.py                 run the stale stages
+#   python pipeline.py --dry-run       only show what would run and why
+#   python pipeline.py --scrape        also refresh the Steam reviews first (network)
+#   python pipeline.py --force rollups forecast    rerun these stages (no names = all)
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# CONFIG - update paths if needed
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = r"C:\Disertation\processed\pipeline_state.json"
+LOG_DIR = r"C:\Disertation\processed\pipeline_logs"
+REVIEWS = r"C:\Disertation\reviews\game reviews"
+REVIEW_STORE = r"C:\Disertation\reviews\review_store"
+MONTHLY_SENTIMENT = r"C:\Disertation\processed\monthly_sentiment_50games.csv"
+DOM_FILE = r"C:\Disertation\processed\FINAL_with_Dominance_MONTHLY.csv"
+DOM_COMPUTED = r"C:\Disertation\processed\Dominance_computed_MONTHLY.csv"
+META_FILE = r"C:\Disertation\final\pushpa60_SORTED.csv"
+ANALYSIS = r"C:\Disertation\processed\Company_Analysis"
+FORECASTS = r"C:\Disertation\processed\Forecasts_manual"
+
+
+def _here(*names):
+    return [os.path.join(HERE, n) for n in names]
+
+
+def _out(folder, *names):
+    return [os.path.join(folder, n) for n in names]
+
+
+DIMENSION_CODE = _here("game_dimension.py", "monthly_panel.py", "lag_correlation.py")
+DIMENSION_DATA = [DOM_FILE, META_FILE] + _here("game_aliases.json")
+
+# name -> script (+ args), code, inputs, outputs; manual stages run only when asked for.
+# 'after' lists stages to wait for without a shared artifact: the analysis stages wait
+# for 'panel', so the panel / dimension caches are built once, not by each of them at once;
+# 'figures' waits for 'correlations', which draws its histogram into the same figures_manifest.json.
+# The monthly sentiment is merged with users / revenue into FINAL_with_Dominance_MONTHLY.csv
+# outside this repo, so the dominance stage starts from that file; it writes its score to
+# its own file and leaves the fact table (an input of every later stage) untouched.
+STAGES = {
+    'scrape': {'cmd': ["steam_review_scraper.py", "--refresh"], 'manual': True,
+               'code': _here("steam_review_scraper.py"),
+               'inputs': _here("steam_apps.csv", "selected 50 games.txt"), 'outputs': [REVIEWS]},
+    'review_store': {'cmd': ["review_store.py"], 'code': _here("review_store.py"),
+                     'inputs': [REVIEWS], 'outputs': [REVIEW_STORE]},
+    'aggregate': {'cmd': ["aggregate_monthly_sentiment_allgames.py"],
+                  'code': _here("aggregate_monthly_sentiment_allgames.py", "calculate_sentiment_score.py",
+                                "sentiment_lexicon.py"),
+                  'inputs': [REVIEWS] + _here("sentiment_lexicon.json"), 'outputs': [MONTHLY_SENTIMENT]},
+    'dominance': {'cmd': ["dominance.py"], 'code': _here("dominance.py", "lag_correlation.py"),
+                  'inputs': [DOM_FILE], 'outputs': [DOM_COMPUTED]},
+    'panel': {'cmd': ["monthly_panel.py"], 'code': _here("monthly_panel.py", "game_dimension.py"),
+              'inputs': DIMENSION_DATA, 'outputs': []},
+    'game_summary': {'cmd': ["company_and_game_summary.py"],
+                     'code': _here("company_and_game_summary.py", "rollups.py") + DIMENSION_CODE,
+                     'inputs': DIMENSION_DATA, 'after': ['panel'],
+                     'outputs': _out(ANALYSIS, "games_mean_dominance.csv", "companies_mean_dominance.csv")},
+    'company_analysis': {'cmd': ["company analysis.py"],
+                         'code': _here("company analysis.py", "rollups.py") + DIMENSION_CODE,
+                         'inputs': DIMENSION_DATA, 'after': ['panel'],
+                         'outputs': _out(ANALYSIS, "company_dominance.csv", "company_sentiment_correlation.csv")},
+    'sentiment_summary': {'cmd': ["favourite — sentiment.py"],
+                          'code': _here("favourite — sentiment.py") + DIMENSION_CODE,
+                          'inputs': DIMENSION_DATA, 'after': ['panel'],
+                          'outputs': _out(ANALYSIS, "games_sentiment_users_summary.csv")},
+    'correlations': {'cmd': ["company_sentiment_dominance_analysis.py"],
+                     'code': _here("company_sentiment_dominance_analysis.py", "rollups.py", "render_figures.py")
+                     + DIMENSION_CODE,
+                     'inputs': DIMENSION_DATA, 'after': ['panel'],
+                     'outputs': _out(ANALYSIS, "per_game_sentiment_lag_corr.csv", "per_game_sentiment_users_corr.csv",
+                                     "per_game_sentiment_users_lag1_corr.csv", "company_dominance_summary.csv",
+                                     "games_mean_dominance_with_company.csv", "hist_sentiment_users_r.png")},
+    'rollups': {'cmd': ["rollups.py"], 'code': _here("rollups.py") + DIMENSION_CODE,
+                'inputs': DIMENSION_DATA, 'after': ['panel'],
+                'outputs': _out(ANALYSIS, "rollup_game.csv", "rollup_company.csv", "rollup_market.csv")},
+    'forecast': {'cmd': ["forecast_models.py"], 'code': _here("forecast_models.py") + DIMENSION_CODE,
+                 'inputs': DIMENSION_DATA, 'after': ['panel'],
+                 'outputs': _out(FORECASTS, "forecast_summary_manual.csv")},
+    'backtest': {'cmd': ["forecast_models.py", "--backtest"], 'code': _here("forecast_models.py") + DIMENSION_CODE,
+                 'inputs': DIMENSION_DATA, 'after': ['panel'],
+                 'outputs': _out(FORECASTS, "forecast_backtest_errors.csv", "forecast_backtest_summary.csv")},
+    'forecast_tests': {'cmd': ["AR1_RMSE vs ARX_RMSE.py"],
+                       'code': _here("AR1_RMSE vs ARX_RMSE.py", "forecast_significance.py", "lag_correlation.py"),
+                       'inputs': _out(FORECASTS, "forecast_backtest_errors.csv", "forecast_summary_manual.csv"),
+                       'outputs': _out(ANALYSIS, "forecast_AR1_vs_ARX_comparison.csv",
+                                       "forecast_AR1_vs_ARX_pooled_significance.csv")},
+    'figures': {'cmd': ["render_figures.py"],
+                'code': _here("render_figures.py", "forecast_models.py", "dominance.py") + DIMENSION_CODE,
+                'inputs': DIMENSION_DATA, 'after': ['panel', 'correlations'],
+                'outputs': _out(ANALYSIS, "figures_manifest.json")},
+}
+
+
+# ---------- Hashing ----------
+class Hasher:
+    # SHA-1 of files and folders; a file is re-read only when its size / mtime changed
+    def __init__(self, cache=None):
+        self.cache = cache or {}   # path -> [size, mtime_ns, sha1]
+
+    def file(self, path):
+        st = os.stat(path)
+        hit = self.cache.get(path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return hit[2]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        self.cache[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def artifact(self, path):
+        # file -> its hash; folder -> hash of (relative path, hash) of every file; missing -> None
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        h = hashlib.sha1()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(f"{os.path.relpath(full, path)}\0{self.file(full)}\n".encode())
+        return h.hexdigest()
+
+
+def stage_key(stage, hasher):
+    # one hash over the command, the code and the inputs; None when an input is missing
+    parts = [json.dumps(stage['cmd'])]
+    for path in stage['code'] + stage['inputs']:
+        h = hasher.artifact(path)
+        if h is None:
+            return None
+        parts.append(f"{path}\0{h}")
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+
+# ---------- Graph ----------
+def dependencies(stages):
+    # stage -> stages that write one of its inputs, plus its 'after' stages
+    writers = {}
+    for name, st in stages.items():
+        for path in st['outputs']:
+            writers.setdefault(os.path.normcase(path), []).append(name)
+    return {name: sorted({w for path in st['inputs'] for w in writers.get(os.path.normcase(path), [])
+                          if w != name} | (set(st.get('after', [])) & stages.keys())) for name, st in stages.items()}
+
+
+def topo_order(deps):
+    order, seen = [], {}
+
+    def visit(name):
+        if seen.get(name) == 1:
+            raise SystemExit(f"⚠️ Pipeline has a cycle through stage '{name}'")
+        if not seen.get(name):
+            seen[name] = 1
+            for d in deps[name]:
+                visit(d)
+            seen[name] = 2
+            order.append(name)
+
+    for name in deps:
+        visit(name)
+    return order
+
+
+# ---------- Run ----------
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'stages': {}, 'hashes': {}}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def why_stale(name, stage, record, hasher, forced):
+    # reason the stage must run, "" when it is up to date, None when an input is missing
+    key = stage_key(stage, hasher)
+    if key is None:
+        return None
+    if forced:
+        return "forced"
+    if not record:
+        return "never run"
+    if record['key'] != key:
+        return "code or inputs changed"
+    for path, h in record['outputs'].items():
+        if hasher.artifact(path) != h:
+            return f"output changed or missing: {os.path.basename(path)}"
+    return ""
+
+
+def run_stage(name, stage, log_dir=LOG_DIR):
+    # the stage's script in a fresh interpreter; output goes to <log_dir>/<name>.log
+    os.makedirs(log_dir, exist_ok=True)
+    start = time.time()
+    with open(os.path.join(log_dir, name + ".log"), 'w', encoding='utf-8') as log:
+        code = subprocess.call([sys.executable, os.path.join(HERE, stage['cmd'][0])] + stage['cmd'][1:],
+                               cwd=HERE, stdout=log, stderr=subprocess.STDOUT)
+    return code, time.time() - start
+
+
+def run_pipeline(stages=STAGES, include_manual=False, force=None, dry_run=False, workers=4,
+                 state_path=STATE_FILE, log_dir=LOG_DIR):
+    # force: None = nothing, [] = every stage, [names] = these stages
+    stages = {n: s for n, s in stages.items() if include_manual or not s.get('manual')}
+    unknown = sorted(set(force or []) - set(stages))
+    if unknown:
+        raise SystemExit(f"⚠️ Unknown stage(s): {unknown}. Stages: {list(stages)}")
+    forced = set(stages) if force == [] else set(force or [])
+    deps = dependencies(stages)
+    order = topo_order(deps)
+    state = load_state(state_path)
+    hasher = Hasher(state.get('hashes'))
+    status = {}   # stage -> 'fresh' / 'ran' / 'failed' / 'skipped' / 'would run'
+
+    def check(name):
+        # decide a stage once all its upstream stages are settled
+        up = [status[d] for d in deps[name]]
+        if any(s in ('failed', 'skipped') for s in up):
+            return 'skipped', "upstream stage failed"
+        if dry_run and 'would run' in up:
+            return 'would run', "upstream stage would run"
+        reason = why_stale(name, stages[name], state['stages'].get(name), hasher, name in forced)
+        if reason is None:
+            return 'skipped', "input missing"
+        return ('would run' if dry_run else 'run', reason) if reason else ('fresh', "")
+
+    start = time.time()
+    pending, running = list(order), {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while pending or running:
+            for name in [n for n in pending if all(d in status for d in deps[n])]:
+                pending.remove(name)
+                result, reason = check(name)
+                if result == 'run':
+                    print(f"▶ {name}: {reason}")
+                    running[pool.submit(run_stage, name, stages[name], log_dir)] = name
+                else:
+                    status[name] = result
+                    print(f"{'·' if result == 'fresh' else '▶' if result == 'would run' else '⚠️'} {name}"
+                          f"{': ' + reason if reason else ': up to date'}")
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                code, secs = fut.result()
+                if code:
+                    status[name] = 'failed'
+                    print(f"⚠️ {name} failed (exit {code}) after {secs:.1f}s, see {os.path.join(log_dir, name + '.log')}")
+                    continue
+                status[name] = 'ran'
+                st = stages[name]   # hashes after the run (in-place stages change their input)
+                outputs = {p: hasher.artifact(p) for p in st['outputs']}
+                state['stages'][name] = {'key': stage_key(st, hasher), 'outputs': outputs,
+                                         'finished': time.strftime('%Y-%m-%d %H:%M:%S')}
+                for other in state['stages'].values():   # a file rewritten in place by a later stage
+                    for p in other['outputs'].keys() & outputs.keys():
+                        other['outputs'][p] = outputs[p]
+                print(f"✔ {name} ({secs:.1f}s)")
+                if not dry_run:
+                    state['hashes'] = hasher.cache
+                    save_state(state, state_path)
+    if not dry_run:
+        state['hashes'] = hasher.cache
+        save_state(state, state_path)
+    counts = {s: list(status.values()).count(s) for s in sorted(set(status.values()))}
+    print(f"Pipeline {'dry run ' if dry_run else ''}finished in {time.time() - start:.1f}s: {counts}")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stale stages of the project pipeline.")
+    parser.add_argument('--dry-run', action='store_true', help="show what would run, run nothing")
+    parser.add_argument('--scrape', action='store_true', help="include the Steam scrape stage (network)")
+    parser.add_argument('--force', nargs='*', metavar='STAGE', help="rerun these stages (no names = all)")
+    parser.add_argument('--workers', type=int, default=4, help="stages run at once (default 4)")
+    args = parser.parse_args()
+    status = run_pipeline(include_manual=args.scrape, force=args.force, dry_run=args.dry_run,
+                          workers=args.workers)
+    if 'failed' in status.values():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# render_figures.py
+# Headless batch renderer for the figure pack:
+#   <game>_manual_forecast.png       actual vs AR(1) / ARX one-step forecasts, every game
+#   Dominance_Top5_trends_FIXED.png  Dominance over the last 36 months, top 5 games
+#   Top10_Dominance_overall.png      top 10 games by mean Dominance
+#   hist_sentiment_users_r.png       per-game Pearson r, sentiment vs users (drawn by
+#                                    company_sentiment_dominance_analysis.py through
+#                                    correlation_jobs / render)
+#
+# Each figure is a job: a file name plus the small arrays it is drawn from. The
+# arrays are hashed and the hashes kept in figures_manifest.json next to the
+# images, so a figure whose data did not change is not redrawn. Changed jobs are
+# drawn on a process pool with the Agg backend (no pyplot global state); every
+# worker keeps one Figure per size and clears it between plots.
+import os
+import json
+import pickle
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    PLOTTING = True
+except Exception:
+    PLOTTING = False
+
+# CONFIG - update paths if needed
+OUT_DIR = r"C:\Disertation\processed\Company_Analysis"
+MANIFEST = "figures_manifest.json"
+DPI = 200
+RENDER_VERSION = 1       # bump when the drawing code changes, to redraw everything
+FORECAST_MONTHS = 24     # months shown in each forecast figure
+TREND_MONTHS = 36        # months shown in the top-5 trend figure
+SIZES = {'forecast': (9, 5), 'trend': (12, 6), 'top10': (9, 6), 'hist': (7, 5)}
+
+
+def _ym(keys):
+    return [f"{(int(m) - 1) // 12:04d}-{(int(m) - 1) % 12 + 1:02d}" for m in keys]
+
+
+def slug(name):
+    # "The Witcher 3" -> "the_witcher_3"
+    return "_".join("".join(c if c.isalnum() else " " for c in str(name).lower()).split())
+
+
+# ---------- Jobs ----------
+def forecast_jobs(games, months, mats, last_months=FORECAST_MONTHS):
+    # per game: actual users and the AR(1) / ARX one-step forecasts of the last months
+    import forecast_models as fm
+    X, y, ok = fm.design(mats, fm.TARGET_COL, [fm.EXOG_COL], 1)
+    fit = fm.fit_pair(mats, fm.TARGET_COL)
+    preds = {'AR(1)': fm.predict(X[..., :2], fit['AR_beta']), 'ARX': fm.predict(X, fit['ARX_beta'])}
+    jobs = []
+    for i, game in enumerate(games):
+        t = np.flatnonzero(ok[i])[-last_months:]
+        if fit['n_train'][i] == 0 or not len(t):
+            continue
+        data = {'game': str(game), 'months': _ym(months[t]), 'actual': y[i, t]}
+        data.update({name: p[i, t] for name, p in preds.items()})
+        jobs.append({'file': f"{slug(game)}_manual_forecast.png", 'kind': 'forecast', 'data': data})
+    return jobs
+
+
+def dominance_jobs(df, game_col="game_norm", date_col="year_month", dom_col="Dominance"):
+    # top-5 trend and top-10 bar chart from a (game, month, Dominance) table
+    from lag_correlation import month_index
+    df = df.assign(_month=month_index(df[date_col]).to_numpy()).dropna(subset=['_month', dom_col])
+    if df.empty:
+        return []
+    df = df.assign(**{game_col: df[game_col].astype(str)})
+    overall = df.groupby(game_col)[dom_col].mean().sort_values(ascending=False)
+    recent = df[df['_month'] > df['_month'].max() - TREND_MONTHS]
+    trend = recent[recent[game_col].isin(overall.index[:5])].pivot_table(
+        index='_month', columns=game_col, values=dom_col, aggfunc='mean')
+    return [
+        {'file': "Dominance_Top5_trends_FIXED.png", 'kind': 'trend',
+         'data': {'months': _ym(trend.index), 'series': {g: trend[g].to_numpy() for g in trend.columns}}},
+        {'file': "Top10_Dominance_overall.png", 'kind': 'top10',
+         'data': {'games': list(overall.index[:10]), 'values': overall.to_numpy()[:10], 'label': game_col}},
+    ]
+
+
+def correlation_jobs(r_values):
+    r = np.asarray(r_values, dtype=float)
+    return [{'file': "hist_sentiment_users_r.png", 'kind': 'hist', 'data': {'r': r[~np.isnan(r)]}}]
+
+
+def job_hash(job):
+    return hashlib.sha1(pickle.dumps((RENDER_VERSION, job['kind'], job['data']), protocol=4)).hexdigest()
+
+
+# ---------- Drawing ----------
+def _draw_forecast(fig, d):
+    ax = fig.add_subplot()
+    x = np.arange(len(d['months']))
+    ax.plot(x, d['actual'], marker='o', label='Actual')
+    ax.plot(x, d['AR(1)'], marker='s', color='tab:red', label='AR(1)')
+    ax.plot(x, d['ARX'], marker='x', color='tab:orange', label='ARX (sentiment)')
+    step = max(1, len(x) // 12)
+    ax.set_xticks(x[::step], d['months'][::step], rotation=45)
+    ax.set_title(f"{d['game']} — Manual Forecast Models")
+    ax.legend()
+
+
+def _draw_trend(fig, d):
+    ax = fig.add_subplot()
+    dates = np.array(d['months'], dtype='datetime64[M]')
+    for game, values in d['series'].items():
+        ax.plot(dates, values, marker='o', label=game)
+    ax.set_title("Dominance over time — Top 5 games")
+    ax.set_ylabel("Dominance")
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend()
+
+
+def _draw_top10(fig, d):
+    ax = fig.add_subplot()
+    ax.barh(d['games'][::-1], d['values'][::-1])
+    ax.set_title("Top 10 Games by Average Dominance (overall)")
+    ax.set_xlabel("Dominance (0-1)")
+    ax.set_ylabel(d['label'])
+
+
+def _draw_hist(fig, d):
+    ax = fig.add_subplot()
+    ax.hist(d['r'], bins=18)
+    ax.set_title("Distribution of per-game Pearson r (sentiment vs users)")
+    ax.set_xlabel("Pearson r")
+    ax.set_ylabel("Count")
+
+
+_DRAW = {'forecast': _draw_forecast, 'trend': _draw_trend, 'top10': _draw_top10, 'hist': _draw_hist}
+_FIGURES = {}   # per process: figure size -> reused Figure
+
+
+def render_batch(jobs, out_dir):
+    # draw a list of jobs in this process; -> [(file, hash or None if it failed)]
+    done = []
+    for job in jobs:
+        size = SIZES[job['kind']]
+        fig = _FIGURES.get(size)
+        if fig is None:
+            fig = _FIGURES[size] = Figure(figsize=size)
+        fig.clf()
+        try:
+            _DRAW[job['kind']](fig, job['data'])
+            fig.tight_layout()
+            fig.savefig(os.path.join(out_dir, job['file']), dpi=DPI)
+            done.append((job['file'], job_hash(job)))
+        except Exception as e:
+            print(f"⚠️ {job['file']}: {e}")
+            done.append((job['file'], None))
+    return done
+
+
+def render(jobs, out_dir=OUT_DIR, workers=1, force=False):
+    # draw the jobs whose data changed since the last run (all with force=True)
+    if not PLOTTING:
+        print("⚠️ matplotlib not available, figures skipped.")
+        return
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    todo = [j for j in jobs if force or manifest.get(j['file']) != job_hash(j)
+            or not os.path.exists(os.path.join(out_dir, j['file']))]
+
+    if workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_batch, todo[i::workers], out_dir) for i in range(workers)]
+            results = [r for f in futures for r in f.result()]
+    else:
+        results = render_batch(todo, out_dir)
+    for name, h in results:
+        if h is None:
+            manifest.pop(name, None)
+        else:
+            manifest[name] = h
+    tmp = manifest_path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    print(f"Figures: {sum(h is not None for _, h in results)} drawn, "
+          f"{len(jobs) - len(todo)} unchanged -> {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the figure pack (only figures whose data changed).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="redraw every figure")
+    args = parser.parse_args()
+
+    import forecast_models as fm
+    from monthly_panel import load_panel
+    panel = load_panel()
+    games, months, mats = fm.load_matrices()
+    render(forecast_jobs(games, months, mats) + dominance_jobs(panel), workers=args.workers, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# review_store.py
+# Usage: py review_store.py              (convert new / changed review CSVs into the store)
+#        py review_store.py --rebuild    (convert every review CSV again)
+#
+# Partitioned Parquet copy of the raw review CSVs, written once so later runs
+# skip encoding / delimiter guessing and read only the columns and partitions
+# they need:
+#   STORE_DIR/game=<game>/year_month=<YYYY-MM>/<source file>-<i>.parquet
+# Columns: timestamp (int64 epoch seconds, UTC), review (Arrow string),
+# sentiment / score (float64, null where the source file has no such column);
+# game and year_month come from the partition path (read back as categoricals).
+import os
+import re
+import json
+import shutil
+import argparse
+from urllib.parse import unquote
+
+import numpy as np
+import pandas as pd
+
+import aggregate_monthly_sentiment_allgames as agg
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+# CONFIG - update paths if needed
+REVIEWS_FOLDER = r"C:\Disertation\reviews\game reviews"
+STORE_DIR = r"C:\Disertation\reviews\review_store"
+SOURCES_FILE = "_sources.json"   # inside STORE_DIR; source file -> size / mtime / games written
+
+STORE_COLUMNS = ['timestamp', 'review', 'sentiment', 'score']
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise SystemExit("The review store needs pyarrow: pip install pyarrow")
+
+
+def store_schema():
+    return pa.schema([('timestamp', pa.int64()), ('review', pa.string()),
+                      ('sentiment', pa.float64()), ('score', pa.float64()),
+                      ('game', pa.string()), ('year_month', pa.string())])
+
+
+def store_partitioning():
+    return ds.partitioning(pa.schema([('game', pa.string()), ('year_month', pa.string())]), flavor='hive')
+
+
+def open_store(store_dir=None):
+    # the store as a pyarrow dataset; game / year_month are dictionary (categorical) columns
+    store_dir = store_dir or STORE_DIR
+    _require_pyarrow()
+    part = ds.HivePartitioning.discover(infer_dictionary=True)
+    return ds.dataset(store_dir, format='parquet', partitioning=part)
+
+
+def store_filter(games=None, months=None):
+    # partition filter for the given games / "YYYY-MM" months (None = all)
+    expr = None
+    for field, values in (('game', games), ('year_month', months)):
+        if values is not None:
+            cond = ds.field(field).isin(list(values))
+            expr = cond if expr is None else expr & cond
+    return expr
+
+
+def read_reviews(columns=None, games=None, months=None, store_dir=None):
+    # reviews as a DataFrame, reading only `columns` of the matching partitions
+    dataset = open_store(store_dir)
+    return dataset.to_table(columns=columns, filter=store_filter(games, months)).to_pandas()
+
+
+def iter_review_batches(columns=None, games=None, months=None, batch_size=200000, store_dir=None, dataset=None):
+    # same as read_reviews, as a stream of DataFrames of about batch_size rows
+    # (small partition files are coalesced, so each DataFrame is worth processing)
+    dataset = dataset if dataset is not None else open_store(store_dir)
+    pending, rows = [], 0
+    for batch in dataset.to_batches(columns=columns, filter=store_filter(games, months), batch_size=batch_size):
+        if batch.num_rows:
+            pending.append(batch)
+            rows += batch.num_rows
+        if rows >= batch_size:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+
+def store_games(store_dir=None):
+    # game names present in the store (from the partition directories)
+    store_dir = store_dir or STORE_DIR
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(unquote(d[len('game='):]) for d in os.listdir(store_dir) if d.startswith('game='))
+
+
+# ---------- Conversion ----------
+def normalize_chunk(chunk, date_col, text_col, sent_col, score_col):
+    # aggregator chunk (parsed dates, game column) -> Arrow table in the store schema
+    n = len(chunk)
+    table = {
+        'timestamp': chunk[date_col].astype('datetime64[s, UTC]').astype('int64').to_numpy(),
+        'review': chunk[text_col].astype(object).where(chunk[text_col].notna(), None).to_numpy()
+                  if text_col and text_col in chunk.columns else np.full(n, None, dtype=object),
+        'sentiment': pd.to_numeric(chunk[sent_col], errors='coerce').to_numpy(dtype=float)
+                     if sent_col and sent_col in chunk.columns else np.full(n, np.nan),
+        'score': pd.to_numeric(chunk[score_col], errors='coerce').to_numpy(dtype=float)
+                 if score_col and score_col in chunk.columns else np.full(n, np.nan),
+        'game': chunk['game'].astype(str).to_numpy(),
+        'year_month': agg.month_key_text(agg.month_keys(chunk[date_col])).to_numpy(),
+    }
+    return pa.Table.from_pydict(table, schema=store_schema())
+
+
+def part_prefix(fn):
+    # partition files written from source file fn are named <prefix>-<i>.parquet
+    return os.path.splitext(fn)[0].strip().replace('/', '_')
+
+
+def remove_source(fn, store_dir=None):
+    # delete the partition files written from source file fn (other files writing the
+    # same game keep theirs); directories left empty go too
+    store_dir = store_dir or STORE_DIR
+    own = re.compile(re.escape(part_prefix(fn)) + r'-\d+\.parquet')
+    for root, dirs, names in os.walk(store_dir, topdown=False):
+        if root == store_dir:
+            continue
+        for name in names:
+            if own.fullmatch(name):
+                os.remove(os.path.join(root, name))
+        if not os.listdir(root):
+            os.rmdir(root)
+
+
+def convert_file(fn, store_dir=None):
+    # one review CSV -> its game partitions; returns (games written, rows)
+    store_dir = store_dir or STORE_DIR
+    path = os.path.join(REVIEWS_FOLDER, fn)
+    # sentiment / score read as text: unlike read_stats, a half-written conversion
+    # cannot restart when a value past the probed sample is not a number
+    probe = dict(agg.probe_file(path), numeric=[])
+    date_col, text_col, sent_col, score_col = agg.review_columns(probe)
+    game_name = os.path.splitext(fn)[0].strip()
+    record = {'rows_processed': 0}
+    games = set()
+
+    def batches():
+        for chunk in agg.iter_review_chunks(path, probe, game_name, record):
+            table = normalize_chunk(chunk, date_col, text_col, sent_col, score_col)
+            games.update(table.column('game').unique().to_pylist())
+            record['rows_processed'] += table.num_rows
+            yield from table.to_batches()
+
+    ds.write_dataset(batches(), store_dir, schema=store_schema(), format='parquet',
+                     partitioning=store_partitioning(), existing_data_behavior='overwrite_or_ignore',
+                     basename_template=part_prefix(fn) + "-{i}.parquet")
+    return sorted(games), record['rows_processed']
+
+
+def main():
+    _require_pyarrow()
+    parser = argparse.ArgumentParser(description="Convert the review CSVs into the partitioned Parquet store.")
+    parser.add_argument('--rebuild', action='store_true', help="convert every file again")
+    args = parser.parse_args()
+
+    sources_path = os.path.join(STORE_DIR, SOURCES_FILE)
+    sources = {}
+    if os.path.exists(sources_path) and not args.rebuild:
+        with open(sources_path, encoding='utf-8') as f:
+            sources = json.load(f)
+    if args.rebuild and os.path.isdir(STORE_DIR):
+        shutil.rmtree(STORE_DIR)
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    files = sorted([f for f in os.listdir(REVIEWS_FOLDER) if f.lower().endswith('.csv')])
+    for fn in files:
+        path = os.path.join(REVIEWS_FOLDER, fn)
+        stat = {'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)}
+        old = sources.get(fn)
+        if old and old['size'] == stat['size'] and old['mtime'] == stat['mtime']:
+            print(f"Unchanged {fn}")
+            continue
+        if stat['size'] < 50:   # tiny/empty file
+            print(f"Skipping (empty/small): {fn}")
+            continue
+        # a changed file replaces every partition file it wrote last time
+        remove_source(fn)
+        try:
+            games, rows = convert_file(fn)
+        except Exception as e:
+            sources.pop(fn, None)
+            print(f"Error converting {fn}: {e}")
+            continue
+        sources[fn] = dict(stat, games=games)
+        print(f"Converted {fn}: rows={rows} games={len(games)}")
+
+    # forget files that are gone from the folder (their partitions go too)
+    for fn in [f for f in sources if f not in files]:
+        sources.pop(fn)
+        remove_source(fn)
+    with open(sources_path, 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=1)
+    print("Review store written to:", STORE_DIR)
+
+
+if __name__ == "__main__":
+    main()
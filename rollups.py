@@ -0,0 +1,187 @@
+# rollups.py
+# Game -> company -> market rollups of the monthly panel in one vectorized pass.
+#
+# The (game, month) rows are reduced once, with np.bincount, to sufficient statistics
+# per (period, game, company) leaf: count, sum, sum of squares, min, max and weighted
+# sums. Games, companies and the whole market are then combined from those leaves,
+# so no level goes back to the rows. Every level gets:
+#   n_obs, n_months                      values present / distinct months with a value
+#   mean, std, min, max                  of the value column (Dominance by default)
+#   revenue_weighted, users_weighted     value averaged with revenue / users weights
+#   revenue_total, users_total, revenue_mean, users_mean
+# Optional: a trailing window (last N months of the panel) and per-year or
+# per-month periods (period column added to every key).
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from monthly_panel import load_panel, month_columns, DOM_FILE
+
+# CONFIG - update paths if needed
+OUT_DIR = r"C:\Disertation\processed\Company_Analysis"
+GAME_COL = "game_norm"
+COMPANY_COL = "Company"
+DATE_COL = "year_month"
+VALUE_COL = "Dominance"
+WEIGHT_COLS = {'revenue': "Monthly_Revenue_USD_Millions", 'users': "Monthly_Active_Users_Millions"}
+WINDOWS = [None, 3, 6, 12]   # None = all months
+
+
+# ---------- Sufficient statistics ----------
+def _leaf_stats(codes, n_leaves, x, weights):
+    ok = ~np.isnan(x)
+    c, xv = codes[ok], x[ok]
+    st = {'rows': np.bincount(codes, minlength=n_leaves).astype(float),
+          'n': np.bincount(c, minlength=n_leaves).astype(float),
+          'sum': np.bincount(c, xv, n_leaves), 'sumsq': np.bincount(c, xv * xv, n_leaves),
+          'min': np.full(n_leaves, np.inf), 'max': np.full(n_leaves, -np.inf)}
+    np.fmin.at(st['min'], c, xv)
+    np.fmax.at(st['max'], c, xv)
+    for name, w in weights.items():
+        has_w = ~np.isnan(w)
+        both = ok & has_w
+        st[name + '_total'] = np.bincount(codes[has_w], w[has_w], n_leaves)
+        st[name + '_count'] = np.bincount(codes[has_w], minlength=n_leaves).astype(float)
+        st[name + '_w'] = np.bincount(codes[both], w[both], n_leaves)
+        st[name + '_wx'] = np.bincount(codes[both], w[both] * x[both], n_leaves)
+    return st
+
+
+def _combine(st, parent, n_parents):
+    # statistics of the parents (e.g. companies) from those of their children
+    out = {}
+    for key, v in st.items():
+        if key == 'min':
+            out[key] = np.full(n_parents, np.inf)
+            np.fmin.at(out[key], parent, v)
+        elif key == 'max':
+            out[key] = np.full(n_parents, -np.inf)
+            np.fmax.at(out[key], parent, v)
+        else:
+            out[key] = np.bincount(parent, v, n_parents)
+    return out
+
+
+def _finish(st, shift, weights):
+    # statistics -> output columns (values were shifted by `shift` for a stable std)
+    n = st['n']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = st['sum'] / n
+        var = (st['sumsq'] - st['sum'] * mean) / (n - 1)
+        out = {'n_obs': n.astype(int),
+               'mean': mean + shift,
+               'std': np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan),
+               'min': np.where(n > 0, st['min'] + shift, np.nan),
+               'max': np.where(n > 0, st['max'] + shift, np.nan)}
+        for name in weights:
+            out[name + '_weighted'] = np.where(st[name + '_w'] > 0, st[name + '_wx'] / st[name + '_w'] + shift, np.nan)
+        for name in weights:
+            out[name + '_total'] = st[name + '_total']
+            out[name + '_mean'] = st[name + '_total'] / st[name + '_count']
+    return out
+
+
+def _distinct_months(group, month, ok, n_groups):
+    # number of distinct months with a value, per group
+    span = month.max() + 1 if len(month) else 1
+    pairs = np.unique(group[ok].astype(np.int64) * span + month[ok])
+    return np.bincount(pairs // span, minlength=n_groups)
+
+
+# ---------- Rollup ----------
+def rollup(df, value_col=VALUE_COL, weight_cols=None, window=None, period=None,
+           game_col=GAME_COL, company_col=COMPANY_COL, date_col=DATE_COL):
+    # -> {'game', 'company', 'market'} tables. window: last N months of the panel only;
+    # period: None, 'year' or 'month' (rollups per calendar year / "YYYY-MM" month)
+    weight_cols = WEIGHT_COLS if weight_cols is None else weight_cols
+    month = df['month_key'].to_numpy() if 'month_key' in df.columns else month_columns(df[date_col])[1]
+    keep = (month >= 0) & df[game_col].notna().to_numpy()
+    if window and keep.any():
+        keep &= month > month[keep].max() - window
+    df, month = df[keep], month[keep].astype(np.int64)
+
+    per = {None: np.zeros_like(month), 'year': (month - 1) // 12, 'month': month}[period]
+    p_vals, p_code = np.unique(per, return_inverse=True)
+    if period == 'month':
+        p_vals = np.array([f"{(m - 1) // 12:04d}-{(m - 1) % 12 + 1:02d}" for m in p_vals], dtype=object)
+    g_code, games = pd.factorize(df[game_col], sort=True)
+    if company_col in df.columns:
+        c_code, companies = pd.factorize(df[company_col], sort=True)
+    else:
+        c_code, companies = np.full(len(df), -1), pd.Index([])
+    n_g, n_c = len(games), len(companies) + 1   # last company code = no company
+    c_code = np.where(c_code < 0, n_c - 1, c_code)
+    games = np.asarray(games, dtype=object)
+    company_names = np.append(np.asarray(companies, dtype=object), np.nan)
+
+    # the one pass over the rows: statistics per (period, game, company) leaf
+    leaf_keys, leaf = np.unique((p_code * n_g + g_code) * n_c + c_code, return_inverse=True)
+    leaf_pg, leaf_c = leaf_keys // n_c, leaf_keys % n_c
+    leaf_p = leaf_pg // n_g if n_g else leaf_pg
+    x = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=float)
+    ok = ~np.isnan(x)
+    shift = x[ok].mean() if ok.any() else 0.0
+    weights = {name: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float) if col in df.columns
+               else np.full(len(df), np.nan) for name, col in weight_cols.items()}
+    st = _leaf_stats(leaf, len(leaf_keys), x - shift, weights)
+
+    def table(group_of_leaf, group_of_row, n_groups, p, cols):
+        out = _finish(_combine(st, group_of_leaf, n_groups), shift, weights)
+        out['n_months'] = _distinct_months(group_of_row, month, ok, n_groups)
+        keys = {} if period is None else {period: p_vals[p]}
+        return pd.DataFrame({**keys, **cols, **out})
+
+    # games; company = the one with most rows (first in sort order on ties)
+    game_keys, game_of_leaf = np.unique(leaf_pg, return_inverse=True)
+    order = np.lexsort((leaf_c, -st['rows'], game_of_leaf))
+    top = order[np.r_[True, np.diff(game_of_leaf[order]) != 0]] if len(order) else order
+    game_tbl = table(game_of_leaf, np.searchsorted(game_keys, p_code * n_g + g_code), len(game_keys),
+                     game_keys // n_g if n_g else game_keys,
+                     {game_col: games[game_keys % n_g] if n_g else games, company_col: company_names[leaf_c[top]]})
+
+    # companies (leaves without a company are left out)
+    comp_keys, comp_of_leaf = np.unique(leaf_p * n_c + leaf_c, return_inverse=True)
+    named = comp_keys % n_c < n_c - 1
+    comp_tbl = table(comp_of_leaf, np.searchsorted(comp_keys, p_code * n_c + c_code), len(comp_keys),
+                     comp_keys // n_c, {company_col: company_names[comp_keys % n_c],
+                                        'n_games': np.bincount(comp_of_leaf, minlength=len(comp_keys))})
+    comp_tbl = comp_tbl[named].reset_index(drop=True)
+
+    # whole market
+    market_tbl = table(leaf_p, p_code, len(p_vals), np.arange(len(p_vals)),
+                       {'n_games': np.bincount(game_keys // n_g if n_g else game_keys, minlength=len(p_vals)),
+                        'n_companies': np.bincount(comp_keys[named] // n_c, minlength=len(p_vals))})
+    return {'game': game_tbl, 'company': comp_tbl, 'market': market_tbl}
+
+
+def rollup_windows(df, windows=WINDOWS, period=None, **kwargs):
+    # rollup() for several trailing windows, stacked with a `window` column ("all", "3m", ...)
+    out = {}
+    for w in windows:
+        for level, tbl in rollup(df, window=w, period=period, **kwargs).items():
+            tbl.insert(0, 'window', f"{w}m" if w else "all")
+            out.setdefault(level, []).append(tbl)
+    return {level: pd.concat(parts, ignore_index=True) for level, parts in out.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game / company / market rollups of the monthly panel.")
+    parser.add_argument('--value', default=VALUE_COL, help=f"column to roll up (default {VALUE_COL})")
+    parser.add_argument('--period', choices=['year', 'month'], default=None,
+                        help="also split every rollup by calendar year / month")
+    args = parser.parse_args()
+
+    panel = load_panel(DOM_FILE)
+    tables = rollup_windows(panel, value_col=args.value, period=args.period)
+    os.makedirs(OUT_DIR, exist_ok=True)
+    suffix = f"_by_{args.period}" if args.period else ""
+    for level, tbl in tables.items():
+        path = os.path.join(OUT_DIR, f"rollup_{level}{suffix}.csv")
+        tbl.to_csv(path, index=False)
+        print(f"Saved {len(tbl)} {level} rows -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# score_combined_reviews.py
+# Streams the combined reviews file through calculate_sentiment_score on all cores.
+#
+# The file is cut into byte blocks of about BLOCK_BYTES that end on a record boundary
+# (a newline outside quotes), so a review with line breaks is never split. Each
+# block is parsed, scored with calculate_sentiment_score_batch (same values as the
+# row-by-row function) and written back to CSV text in a worker process; the
+# parent only cuts blocks and writes results in input order. At most 2 blocks per
+# worker are in flight, so memory stays flat whatever the size of the file.
+#   python score_combined_reviews.py                   all columns + sentiment_score
+#   python score_combined_reviews.py --aligned         only sentiment_score, one row per review
+#   python score_combined_reviews.py --workers 8
+#   python score_combined_reviews.py --store           every review in the Parquet store
+#                                                      (review_store.py): game, year_month,
+#                                                      timestamp + sentiment_score
+# Values pandas reads as missing ("", NA, ...) are written back empty, as in
+# append_cod_pubg_reviews_fixed.py. A malformed record (more fields than the header)
+# stops the run with its line number: skipping it would shift every later row of
+# the --aligned output.
+import io
+import os
+import re
+import codecs
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculate_sentiment_score import calculate_sentiment_score_batch
+from stage_timer import StageTimer
+
+# CONFIG - update paths if needed
+COMBINED_FILE = r"C:\Disertation\reviews\combined_reviews_50_games_final.csv"
+SCORED_FILE = r"C:\Disertation\reviews\combined_reviews_50_games_scored.csv"    # all columns + score
+SCORES_FILE = r"C:\Disertation\reviews\combined_reviews_50_games_scores.csv"    # --aligned: score only
+STORE_SCORED_FILE = r"C:\Disertation\reviews\review_store_scores.csv"           # --store
+SCORE_COL = "sentiment_score"
+BLOCK_BYTES = 16 << 20
+STORE_BATCH_ROWS = 200000
+STORE_KEY_COLUMNS = ['game', 'year_month', 'timestamp']
+TEXT_CANDIDATES = ['content', 'review', 'comment', 'body', 'text']       # as in the aggregator
+USER_SCORE_CANDIDATES = ['score', 'rating', 'stars', 'rate']
+
+
+def pick_column(columns, candidates):
+    lower = [c.strip().lower() for c in columns]
+    for cand in candidates:
+        if cand in lower:
+            return columns[lower.index(cand)]
+    return None
+
+
+def file_encoding(path):
+    # the sidecar index of append_cod_pubg_reviews_fixed.py knows it; else a utf-8 check
+    try:
+        with open(path + ".index.json", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("size") == os.path.getsize(path):
+            return index["encoding"]
+    except (OSError, ValueError, KeyError):
+        pass
+    from append_cod_pubg_reviews_fixed import file_encoding as check_encoding
+    return check_encoding(path)
+
+
+# ---------- Blocks ----------
+def record_ends(buf):
+    # (positions of the newlines ending a record, of all newlines) in buf (buf starts at
+    # a record). A newline ends a record when an even number of quote characters
+    # precede it ("" escapes count twice).
+    b = np.frombuffer(buf, dtype=np.uint8)
+    newlines = np.flatnonzero(b == 10)
+    quotes = np.flatnonzero(b == 34)
+    return newlines[np.searchsorted(quotes, newlines) % 2 == 0], newlines
+
+
+def record_end(buf):
+    # offset just past the last complete record in buf; 0 when it holds none
+    ends = record_ends(buf)[0]
+    return int(ends[-1]) + 1 if len(ends) else 0
+
+
+def record_line(block, line, k):
+    # file line number of record k (0-based) of a block whose first line is `line`
+    ends, newlines = record_ends(block)
+    start = int(ends[k - 1]) + 1 if 0 < k <= len(ends) else 0
+    return line + int(np.searchsorted(newlines, start))
+
+
+def iter_blocks(path, block_bytes=BLOCK_BYTES):
+    # -> header line, then generator of (line number of the block's first line in the
+    # file, block of whole records as bytes)
+    f = open(path, 'rb')
+    header = f.readline()
+
+    def blocks():
+        with f:
+            carry, line = b"", 2
+            while True:
+                data = f.read(block_bytes)
+                buf = carry + data
+                if not data:
+                    if buf.strip():
+                        yield line, buf
+                    return
+                end = record_end(buf)
+                if end:   # else: one record longer than a block, keep reading
+                    yield line, buf[:end]
+                    line += buf.count(b"\n", 0, end)
+                    buf = buf[end:]
+                carry = buf
+    return header, blocks()
+
+
+def encode_continued(text, encoding):
+    # text encoded for the middle of a file: without the BOM that utf-8-sig / utf-16
+    # put in front of every encode() (only the header line carries it)
+    encoder = codecs.getincrementalencoder(encoding)(errors="replace")
+    encoder.encode("")   # the BOM, if the encoding has one
+    return encoder.encode(text, final=True)
+
+
+def score_block(header, line, block, encoding, text_col, user_col, score_col, aligned):
+    # one block -> (CSV bytes without header, rows)
+    try:
+        df = pd.read_csv(io.BytesIO(header + block), encoding=encoding, dtype=str)
+    except pd.errors.ParserError as e:
+        # pandas counts records from the header (line 1)
+        m = re.search(r"Expected (\d+) fields in line (\d+), saw (\d+)", str(e))
+        if not m:
+            raise ValueError(f"Malformed record in the block starting at line {line}: {e}")
+        raise ValueError(f"Malformed record at line {record_line(block, line, int(m.group(2)) - 2)}: "
+                         f"{m.group(3)} fields, the header has {m.group(1)}")
+    # the block is read as text, so an empty user score is NaN (which would clamp the
+    # score to 10); like score_store_batch, a missing or non-numeric one counts as 5
+    users = None if user_col is None else pd.to_numeric(df[user_col], errors='coerce').fillna(5).to_numpy()
+    scores = calculate_sentiment_score_batch(df[text_col], users)
+    out = pd.DataFrame({score_col: scores}) if aligned else df.assign(**{score_col: scores})
+    return encode_continued(out.to_csv(index=False, header=False), encoding), len(df)
+
+
+def score_store_batch(df, score_col):
+    # one review store batch -> (CSV bytes without header, rows); the store's score
+    # column is the user score. It is null where the source file had none: 5 adds
+    # (5 - 5) / 2 = 0, the same as passing no user score
+    scores = calculate_sentiment_score_batch(df['review'], df['score'].fillna(5).to_numpy())
+    out = df[STORE_KEY_COLUMNS].assign(**{score_col: scores})
+    return out.to_csv(index=False, header=False).encode("utf-8"), len(df)
+
+
+def run_ordered(func, tasks, workers, write, timer):
+    # func(*task) for every task, on `workers` processes; results are passed to write()
+    # in task order, with at most 2 tasks per worker in flight
+    if workers == 1:
+        for task in tasks:
+            with timer.stage('score'):
+                result = func(*task)
+            write(result)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(func, *task))
+            if len(pending) >= 2 * workers:   # bounded: wait for the oldest task
+                with timer.stage('wait'):
+                    result = pending.popleft().result()
+                write(result)
+        while pending:
+            with timer.stage('wait'):
+                result = pending.popleft().result()
+            write(result)
+
+
+# ---------- Run ----------
+def score_file(path=COMBINED_FILE, out_path=None, aligned=False, workers=None, text_col=None, user_col=None,
+               score_col=SCORE_COL, block_bytes=BLOCK_BYTES):
+    # score every review of `path` into out_path (written to .tmp, then renamed); -> rows
+    out_path = out_path or (SCORES_FILE if aligned else SCORED_FILE)
+    workers = workers or os.cpu_count() or 1
+    timer = StageTimer()
+    encoding = file_encoding(path)
+    header, blocks = iter_blocks(path, block_bytes)
+    if encoding.lower().replace("-", "") == "utf8" and header.startswith(b"\xef\xbb\xbf"):
+        encoding = "utf-8-sig"
+    columns = list(pd.read_csv(io.BytesIO(header), encoding=encoding, dtype=str).columns)
+    text_col = text_col or pick_column(columns, TEXT_CANDIDATES)
+    if text_col not in columns:
+        raise SystemExit(f"⚠️ No review text column in {path} (columns: {columns}); use --text-col")
+    if user_col == "none":
+        user_col = None
+    elif user_col is None:
+        user_col = pick_column(columns, USER_SCORE_CANDIDATES)
+    print(f"Scoring '{text_col}'" + (f" with user score '{user_col}'" if user_col else "") +
+          f" on {workers} process(es) -> {out_path}")
+
+    out_cols = [score_col] if aligned else columns + [c for c in [score_col] if c not in columns]
+    args = (encoding, text_col, user_col, score_col, aligned)
+    rows = 0
+    tmp = out_path + ".tmp"
+    with open(tmp, 'wb') as out:
+        out.write(pd.DataFrame(columns=out_cols).to_csv(index=False).encode(encoding, errors="replace"))
+
+        def write(result):
+            nonlocal rows
+            data, n = result
+            with timer.stage('write'):
+                out.write(data)
+            rows += n
+            timer.count('blocks')
+
+        try:
+            run_ordered(score_block, ((header, line, block) + args for line, block in blocks),
+                        workers, write, timer)
+        except ValueError as e:
+            out.close()
+            os.remove(tmp)
+            raise SystemExit(f"⚠️ {path}: {e}")
+    os.replace(tmp, out_path)
+    timer.report("score_combined_reviews", rows=rows)
+    return rows
+
+
+def score_store(out_path=STORE_SCORED_FILE, workers=None, games=None, score_col=SCORE_COL,
+                batch_rows=STORE_BATCH_ROWS):
+    # score every review of the Parquet review store (only the review / score columns
+    # and the key columns are read) into out_path; -> rows
+    import review_store
+    workers = workers or os.cpu_count() or 1
+    timer = StageTimer()
+    batches = review_store.iter_review_batches(STORE_KEY_COLUMNS + ['review', 'score'], games=games,
+                                               batch_size=batch_rows)
+    print(f"Scoring the review store {review_store.STORE_DIR} on {workers} process(es) -> {out_path}")
+    rows = 0
+    tmp = out_path + ".tmp"
+    with open(tmp, 'wb') as out:
+        out.write(pd.DataFrame(columns=STORE_KEY_COLUMNS + [score_col]).to_csv(index=False).encode("utf-8"))
+
+        def write(result):
+            nonlocal rows
+            data, n = result
+            with timer.stage('write'):
+                out.write(data)
+            rows += n
+            timer.count('blocks')
+
+        run_ordered(score_store_batch, ((df, score_col) for df in batches), workers, write, timer)
+    os.replace(tmp, out_path)
+    timer.report("score_combined_reviews --store", rows=rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the combined reviews file in parallel, chunk by chunk.")
+    parser.add_argument('--input', default=COMBINED_FILE)
+    parser.add_argument('--output', help=f"default {SCORED_FILE} (or {SCORES_FILE} with --aligned)")
+    parser.add_argument('--aligned', action='store_true',
+                        help="write only the score column (row i = review i) instead of a full copy")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--text-col', help="review text column (default: auto-detect)")
+    parser.add_argument('--user-score-col', help="user rating passed as user_score ('none' to ignore; default: auto)")
+    parser.add_argument('--block-mb', type=float, default=BLOCK_BYTES / 2 ** 20, help="block size in MB")
+    parser.add_argument('--store', action='store_true',
+                        help=f"score the Parquet review store instead of the combined file (-> {STORE_SCORED_FILE})")
+    parser.add_argument('--games', nargs='+', help="with --store: only these games")
+    args = parser.parse_args()
+    if args.store:
+        score_store(args.output or STORE_SCORED_FILE, args.workers, args.games)
+        return
+    score_file(args.input, args.output, args.aligned, args.workers, args.text_col, args.user_score_col,
+               block_bytes=int(args.block_mb * 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
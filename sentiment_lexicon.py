@@ -0,0 +1,370 @@
+# sentiment_lexicon.py
+# Shared sentiment lexicon engine. Weights live in sentiment_lexicon.json and each
+# lexicon is compiled once into a single-pass matcher:
+#   - "tokens" lexicons (calculate_sentiment_score): whole words, emojis and
+#     punctuation in one alternation regex; every occurrence counts, entries with
+#     a "cap" contribute count * weight clipped to +-cap
+#   - "substring" lexicons (aggregate_monthly_sentiment_allgames): each keyword
+#     counts once if it occurs anywhere in the text (same as `kw in text`)
+# Both match on text.lower(). score() scores one text, score_many() a whole
+# column with exactly the same results.
+import json
+import os
+import re
+
+import numpy as np
+
+LEXICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sentiment_lexicon.json")
+BATCH_BLOCK = 50000   # texts matched together per vectorized pass
+
+_SEP = "\x00"         # separator between joined texts (never part of an entry)
+WORD_RE = re.compile(r'\w+')
+
+def _alternation(entries):
+    # longest first, so e.g. "❤️" wins over "❤" at the same position
+    return '|'.join(re.escape(e) for e in sorted(entries, key=lambda e: (-len(e), e)))
+
+
+def _parse_weight(value):
+    # 2  or  {"weight": 0.1, "cap": 1}
+    if isinstance(value, dict):
+        return float(value["weight"]), (None if value.get("cap") is None else float(value["cap"]))
+    return float(value), None
+
+
+def _shape_index(entries):
+    # entries -> lookup by (first character, length): code point -> first-character
+    # row, (row, length) -> group (0 = no entry of that shape), and per group its
+    # length and (entry index, code points) members
+    firsts = sorted({e[0] for e in entries})
+    first = np.zeros(0x110000, dtype=np.int32)
+    first[[ord(c) for c in firsts]] = np.arange(1, len(firsts) + 1)
+    width = max(map(len, entries), default=0)
+    shape = np.zeros((len(firsts) + 1, width + 2), dtype=np.int64)
+    groups = [None]
+    for i, e in enumerate(entries):
+        key = (firsts.index(e[0]) + 1, len(e))
+        if not shape[key]:
+            shape[key] = len(groups)
+            groups.append((len(e), []))
+        groups[shape[key]][1].append((i, np.array([ord(c) for c in e], dtype=np.uint32)))
+    return first, shape, groups
+
+
+def _find(index, cps, starts, lengths):
+    # index of the entry spelled by cps[start:start + length], -1 where there is none;
+    # candidates are compared in full against the entries of their shape
+    first, shape, groups = index
+    out = np.full(len(starts), -1, dtype=np.int64)
+    group = shape[first[cps[starts]], np.minimum(lengths, shape.shape[1] - 1)]
+    for g in range(1, len(groups)):
+        at = np.flatnonzero(group == g)
+        length, members = groups[g]
+        window = cps[np.minimum(starts[at, None] + np.arange(length), len(cps) - 1)]
+        for entry, code_points in members:
+            out[at[(window == code_points).all(axis=1)]] = entry
+    return out
+
+
+_WORD_CHARS = []   # bool per code point: matches \w (built on first use)
+
+
+def _word_chars():
+    # one regex pass over every code point, ~0.2 s once per process
+    if not _WORD_CHARS:
+        table = np.zeros(0x110000, dtype=bool)
+        for m in WORD_RE.finditer(''.join(map(chr, range(0x110000)))):
+            table[m.start():m.end()] = True
+        _WORD_CHARS.append(table)
+    return _WORD_CHARS[0]
+
+
+def _joined(texts):
+    # texts joined with (and enclosed by) separators
+    joined = _SEP.join(["", *texts, ""])
+    if joined.count(_SEP) != len(texts) + 1:     # a text contains the separator itself
+        joined = _SEP.join(["", *(t.replace(_SEP, " ") for t in texts), ""])
+    return joined
+
+
+class TokenLexicon:
+    def __init__(self, name, spec):
+        self.name = name
+        self.base = float(spec.get("base", 0))
+        self.entries = {}        # text -> (weight, cap)
+        self.words = set()
+        for section in ("words", "emojis", "punctuation"):
+            for text, value in spec.get(section, {}).items():
+                text = text.lower()
+                is_word = WORD_RE.fullmatch(text) is not None
+                if section == "words" and not is_word:
+                    raise ValueError(f"{name}: word entry {text!r} must be a single \\w+ token")
+                if section != "words" and (WORD_RE.search(text) or _SEP in text or not text):
+                    raise ValueError(f"{name}: {section} entry {text!r} must not contain word characters")
+                self.entries[text] = _parse_weight(value)
+                if is_word:
+                    self.words.add(text)
+        self.symbols = [t for t in self.entries if t not in self.words]
+        self.capped = [t for t in self.entries if self.entries[t][1] is not None]
+
+        parts = []
+        if self.words:
+            parts.append(r'\b(?:' + _alternation(self.words) + r')\b')
+        if self.symbols:
+            parts.append(_alternation(self.symbols))
+        self.pattern = re.compile('|'.join(parts)) if parts else None
+        self._compile_vectors()
+
+    # ---------- one text ----------
+    def score(self, text):
+        # base + words, then capped entries, then emojis / other symbols; unclamped
+        words = 0.0
+        symbols = []
+        counts = {}
+        for m in (self.pattern.findall(text.lower()) if self.pattern else []):
+            weight, cap = self.entries[m]
+            if cap is not None:
+                counts[m] = counts.get(m, 0) + 1
+            elif m in self.words:
+                words += weight
+            else:
+                symbols.append(weight)
+        score = self.base + words
+        for key in self.capped:
+            weight, cap = self.entries[key]
+            score += min(max(counts.get(key, 0) * weight, -cap), cap)
+        for weight in symbols:   # one step at a time, in text order
+            score += weight
+        return score
+
+    # ---------- whole columns ----------
+    def _compile_vectors(self):
+        # entry ids, weights and caps as arrays; words and symbols indexed by
+        # (first character, length) for _find
+        self._ids = {t: i for i, t in enumerate(self.entries)}
+        self._weight = np.array([self.entries[t][0] for t in self.entries], dtype=float)
+        self._is_capped = np.array([self.entries[t][1] is not None for t in self.entries], dtype=bool)
+        words = sorted(self.words)
+        self._kw_index = _shape_index(words)
+        self._kw_ids = np.array([self._ids[w] for w in words], dtype=np.int64)
+        self._sym_index = _shape_index(self.symbols)
+        self._sym_ids = np.array([self._ids[s] for s in self.symbols], dtype=np.int64)
+        self._sym_lengths = sorted({len(s) for s in self.symbols}, reverse=True)
+
+    def _match_words(self, cps):
+        # start and entry id of every \w+ token that is a lexicon word; the block
+        # starts and ends with a separator, so run boundaries alternate start, end
+        is_word = _word_chars()[cps]
+        bounds = np.flatnonzero(is_word[1:] != is_word[:-1]) + 1
+        starts = bounds[0::2]
+        found = _find(self._kw_index, cps, starts, bounds[1::2] - starts)
+        return starts[found >= 0], self._kw_ids[found[found >= 0]]
+
+    def _match_symbols(self, cps):
+        # longest symbol entry at each candidate start, then left-to-right
+        # non-overlapping selection, as the regex scan does
+        starts = np.flatnonzero(self._sym_index[0][cps] > 0)
+        best = np.full(len(starts), -1, dtype=np.int64)
+        length = np.zeros(len(starts), dtype=np.int64)
+        for size in self._sym_lengths:
+            todo = np.flatnonzero(best < 0)
+            found = _find(self._sym_index, cps, starts[todo], np.full(len(todo), size))
+            hit = found >= 0
+            best[todo[hit]] = self._sym_ids[found[hit]]
+            length[todo[hit]] = size
+        matched = best >= 0
+        pos, ids, ends = starts[matched], best[matched], starts[matched] + length[matched]
+        if len(pos) > 1 and (pos[1:] < np.maximum.accumulate(ends)[:-1]).any():
+            keep = np.ones(len(pos), dtype=bool)
+            covered = -1
+            for i, (p, e) in enumerate(zip(pos.tolist(), ends.tolist())):
+                if p < covered:
+                    keep[i] = False
+                else:
+                    covered = e
+            pos, ids = pos[keep], ids[keep]
+        return pos, ids
+
+    def _score_block(self, texts):
+        # The block is lowered as one string (the same as lowering each text) and
+        # matched on its code points: word tokens and symbol entries are looked up
+        # by (first character, length) and compared in full, then summed per text.
+        n = len(texts)
+        joined = _joined(texts).lower()
+        if joined.isascii():
+            cps = np.frombuffer(joined.encode('ascii'), dtype=np.uint8).astype(np.uint32)
+        else:
+            cps = np.frombuffer(joined.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        seps = np.flatnonzero(cps == ord(_SEP))
+
+        def rows(positions):
+            return np.searchsorted(seps, positions) - 1
+
+        empty = np.zeros(0, dtype=np.int64)
+        word_pos, word_ids = self._match_words(cps) if self.words else (empty, empty)
+        sym_pos, sym_ids = self._match_symbols(cps) if self.symbols else (empty, empty)
+
+        # same order of additions as score()
+        plain = ~self._is_capped[word_ids]
+        score = self.base + np.bincount(rows(word_pos[plain]), weights=self._weight[word_ids[plain]], minlength=n)
+        for key in self.capped:
+            i = self._ids[key]
+            weight, cap = self.entries[key]
+            pos = word_pos[word_ids == i] if key in self.words else sym_pos[sym_ids == i]
+            score = score + np.clip(np.bincount(rows(pos), minlength=n) * weight, -cap, cap)
+
+        # symbols are applied one step at a time, in text order
+        plain = ~self._is_capped[sym_ids]
+        if plain.any():
+            s_rows, s_weights = rows(sym_pos[plain]), self._weight[sym_ids[plain]]
+            starts = np.flatnonzero(np.r_[True, s_rows[1:] != s_rows[:-1]])
+            step = np.arange(len(s_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(s_rows)]))
+            for j in range(step.max() + 1):
+                at = step == j
+                score[s_rows[at]] += s_weights[at]
+        return score
+
+    def score_many(self, texts):
+        # list / array of strings -> float array of score(text) values
+        texts = list(texts)
+        out = np.empty(len(texts))
+        for start in range(0, len(texts), BATCH_BLOCK):
+            out[start:start + BATCH_BLOCK] = self._score_block(texts[start:start + BATCH_BLOCK])
+        return out
+
+
+class SubstringLexicon:
+    def __init__(self, name, spec):
+        self.name = name
+        self.base = float(spec.get("base", 0))
+        self.weights = {}
+        for text, value in spec.get("words", {}).items():
+            text = text.lower()
+            if not text or _SEP in text:
+                raise ValueError(f"{name}: invalid keyword {text!r}")
+            self.weights[text] = _parse_weight(value)[0]
+        self.keys = list(self.weights)
+        # all keywords are tried at every position in one scan (lookahead), so
+        # overlapping keywords are all seen; a keyword that is a prefix of the
+        # one matched at a position is credited along with it
+        self.pattern = re.compile('(?=(' + _alternation(self.keys) + '))') if self.keys else None
+        self._credits = {k: [j for j, other in enumerate(self.keys) if k.startswith(other)] for k in self.keys}
+        self._compile_vectors()
+
+    def found(self, text):
+        # indices (into self.keys) of the keywords occurring in text
+        hits = set()
+        for m in (self.pattern.findall(text.lower()) if self.pattern else []):
+            hits.update(self._credits[m])
+        return hits
+
+    def score(self, text):
+        hits = self.found(text)
+        score = self.base
+        for j, key in enumerate(self.keys):
+            if j in hits:
+                score += self.weights[key]
+        return score
+
+    # ---------- whole columns ----------
+    def _compile_vectors(self):
+        # keywords as zero-padded code point rows, and a table from the first two
+        # characters at a position (first one only for non-ASCII keywords) to
+        # the keywords that can start there
+        self._ascii = all(k.isascii() for k in self.keys)
+        self._dtype = np.uint8 if self._ascii else np.uint32
+        width = max(map(len, self.keys), default=1)
+        self._key_rows = np.zeros((len(self.keys), width), dtype=self._dtype)
+        for j, k in enumerate(self.keys):
+            self._key_rows[j, :len(k)] = [ord(c) for c in k]
+        self._key_len = np.array([len(k) for k in self.keys], dtype=np.int64)
+
+        self._firsts = np.array(sorted({ord(k[0]) for k in self.keys}), dtype=np.uint32)
+        starts = {}
+        for j, k in enumerate(self.keys):
+            if not self._ascii:
+                codes = [int(np.searchsorted(self._firsts, ord(k[0])))]
+            elif len(k) == 1:
+                codes = range(ord(k) * 256, (ord(k) + 1) * 256)
+            else:
+                codes = [ord(k[0]) * 256 + ord(k[1])]
+            for code in codes:
+                starts.setdefault(code, []).append(j)
+        depth = max(map(len, starts.values()), default=1)
+        self._starts = np.full((256 * 256 if self._ascii else max(len(self._firsts), 1), depth), -1, dtype=np.int64)
+        for code, ids in starts.items():
+            self._starts[code, :len(ids)] = ids
+        self._can_start = self._starts[:, 0] >= 0
+
+    def _present_block(self, texts, ascii_only):
+        # (len(texts), len(keys)) bool matrix: keyword j occurs in text i
+        present = np.zeros((len(texts), len(self.keys)), dtype=bool)
+        if not self.keys:
+            return present
+        joined = _joined(texts)
+        if ascii_only:
+            codes = np.frombuffer(joined.encode('ascii').lower(), dtype=np.uint8)
+        else:
+            codes = np.frombuffer(joined.lower().encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+            if self._ascii:
+                # ASCII keywords never match a non-ASCII character: one proxy byte for all
+                codes = np.where(codes < 128, codes, 0x80).astype(np.uint8)
+        if self._ascii:
+            raw = codes.tobytes()
+            # every two-byte window as one big-endian number: first * 256 + second
+            prefix = np.ndarray(shape=(len(raw),), dtype='>u2', buffer=raw + b'\x00', strides=(1,))
+        else:
+            first = np.minimum(np.searchsorted(self._firsts, codes), len(self._firsts) - 1)
+            prefix = np.where(self._firsts[first] == codes, first, -1)
+        cand = np.flatnonzero(self._can_start[prefix] if self._ascii else prefix >= 0)
+        prefix = prefix[cand]
+        rows = np.searchsorted(np.flatnonzero(codes == 0), cand) - 1
+
+        # compare the remaining characters one column at a time, dropping
+        # candidates as soon as they stop matching
+        last = len(codes) - 1
+        for depth in range(self._starts.shape[1]):
+            kid = self._starts[prefix, depth]
+            ok = np.flatnonzero(kid >= 0)
+            pos, kid = cand[ok], kid[ok]
+            for col in range(2 if self._ascii else 1, self._key_rows.shape[1]):
+                longer = self._key_len[kid] > col
+                same = codes[np.minimum(pos + col, last)] == self._key_rows[kid, col]
+                keep = ~longer | same
+                pos, kid, ok = pos[keep], kid[keep], ok[keep]
+            present[rows[ok], kid] = True
+        return present
+
+    def score_many(self, texts):
+        # list / array of strings -> float array of score(text) values
+        texts = list(texts)
+        n = len(texts)
+        out = np.empty(n)
+        is_ascii = np.fromiter(map(str.isascii, texts), dtype=bool, count=n)
+        for ascii_only in (True, False):
+            pos = np.flatnonzero(is_ascii == ascii_only)
+            for start in range(0, len(pos), BATCH_BLOCK):
+                block = pos[start:start + BATCH_BLOCK]
+                present = self._present_block([texts[i] for i in block.tolist()], ascii_only)
+                score = np.full(len(block), self.base)
+                for j, key in enumerate(self.keys):   # same order of additions as score()
+                    score = score + np.where(present[:, j], self.weights[key], 0.0)
+                out[block] = score
+        return out
+
+
+_LEXICON_TYPES = {"tokens": TokenLexicon, "substring": SubstringLexicon}
+_LOADED = {}
+
+
+def load_lexicon(name, path=LEXICON_FILE):
+    # compiled lexicon `name` from the config file, cached per (path, name)
+    key = (os.path.abspath(path), name)
+    if key not in _LOADED:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if name not in config:
+            raise KeyError(f"Lexicon '{name}' not found in {path}")
+        spec = config[name]
+        _LOADED[key] = _LEXICON_TYPES[spec.get("match", "tokens")](name, spec)
+    return _LOADED[key]
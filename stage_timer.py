@@ -0,0 +1,151 @@
+# stage_timer.py
+# Wall / CPU time, counters and peak memory per named stage of a script.
+#
+#   timer = StageTimer()
+#   with timer.stage('parse'):
+#       ...
+#   timer.count('chunks')
+#   record.update(timer.columns(rows=n, nbytes=size))   # flat dict for a log row
+#
+#   with timed("company analysis") as timer:             # prints a table at the end
+#       with timer.stage('load'):
+#           ...
+# Stage times are inclusive (a nested stage also counts in the outer one); CPU time
+# is the whole process's, so stages timed in threads overlap.
+# peak_rss_mb in columns() is the peak since the timer was created: on Linux each new
+# timer resets the kernel's high-water mark (VmHWM, via /proc/self/clear_refs), so a
+# timer per file gets that file's peak. Elsewhere it is NaN; process_peak_rss_mb is
+# always the whole process's peak.
+import sys
+import time
+import weakref
+import contextlib
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except Exception:
+    HAS_RESOURCE = False
+try:
+    import psutil
+    HAS_PSUTIL = True
+except Exception:
+    HAS_PSUTIL = False
+
+
+_PEAK_BEFORE_RESET = 0.0          # process peak (MB) up to the last VmHWM reset
+_RESET_TIMERS = weakref.WeakSet()  # live timers measuring their own peak
+
+
+def peak_rss_mb():
+    # high-water mark of this process's resident memory, MB (NaN when unknown)
+    if HAS_RESOURCE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10   # bytes on macOS, KB elsewhere
+        return max(peak, _PEAK_BEFORE_RESET)   # a VmHWM reset lowers ru_maxrss too
+    if HAS_PSUTIL:
+        mem = psutil.Process().memory_info()
+        return getattr(mem, 'peak_wset', mem.rss) / 2 ** 20
+    return float('nan')
+
+
+def _vm_hwm_mb():
+    # VmHWM (resident high-water mark since the last reset) from /proc, MB; None off Linux
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2 ** 10
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _reset_hwm():
+    # reset VmHWM to the current RSS -> True, False where that is not possible. The
+    # peak so far is first folded into the live timers and the process peak
+    global _PEAK_BEFORE_RESET
+    before = _vm_hwm_mb()
+    if before is None:
+        return False
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return False
+    _PEAK_BEFORE_RESET = max(_PEAK_BEFORE_RESET, before)
+    for timer in _RESET_TIMERS:
+        timer._peak = max(timer._peak, before)
+    return True
+
+
+class StageTimer:
+    def __init__(self):
+        self.wall, self.cpu, self.counts = {}, {}, {}
+        self._start = (time.perf_counter(), time.process_time())
+        self._peak = 0.0
+        self._own_peak = _reset_hwm()
+        if self._own_peak:
+            _RESET_TIMERS.add(self)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            self.wall[name] = self.wall.get(name, 0.0) + time.perf_counter() - wall
+            self.cpu[name] = self.cpu.get(name, 0.0) + time.process_time() - cpu
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def peak_mb(self):
+        # peak resident memory since this timer was created, MB (NaN when unknown)
+        if not self._own_peak:
+            return float('nan')
+        return max(self._peak, _vm_hwm_mb() or 0.0)
+
+    def columns(self, rows=None, nbytes=None, stages=None):
+        # -> {<stage>_wall_s, <stage>_cpu_s, ..., wall_s, cpu_s, rows_per_s, bytes_per_s,
+        # peak_rss_mb, process_peak_rss_mb, <counters>}; `stages` fixes the stage
+        # columns (0 for unused ones)
+        wall = time.perf_counter() - self._start[0]
+        out = {}
+        for name in stages or self.wall:
+            out[f"{name}_wall_s"] = round(self.wall.get(name, 0.0), 4)
+            out[f"{name}_cpu_s"] = round(self.cpu.get(name, 0.0), 4)
+        out['wall_s'] = round(wall, 4)
+        out['cpu_s'] = round(time.process_time() - self._start[1], 4)
+        if rows is not None:
+            out['rows_per_s'] = round(rows / wall, 1) if wall > 0 else float('nan')
+        if nbytes is not None:
+            out['bytes_per_s'] = round(nbytes / wall, 1) if wall > 0 else float('nan')
+        peak, process_peak = self.peak_mb(), peak_rss_mb()
+        out['peak_rss_mb'] = round(peak, 1)
+        out['process_peak_rss_mb'] = round(max(process_peak, peak) if peak == peak else process_peak, 1)
+        out.update(self.counts)
+        return out
+
+    def report(self, title=None, rows=None):
+        # print one line per stage and a total
+        total = time.perf_counter() - self._start[0]
+        print(f"⏱ {title or 'Timings'}:")
+        for name, wall in self.wall.items():
+            share = wall / total * 100 if total > 0 else 0.0
+            print(f"   {name:20s} {wall:9.3f}s wall {self.cpu[name]:9.3f}s cpu {share:5.1f}%")
+        line = f"   {'total':20s} {total:9.3f}s wall {time.process_time() - self._start[1]:9.3f}s cpu"
+        if rows:
+            line += f"  {rows / total:,.0f} rows/s" if total > 0 else ""
+        print(line + f"  peak {self.peak_mb() if self._own_peak else peak_rss_mb():.1f} MB"
+              + "".join(f"  {k}={v}" for k, v in self.counts.items()))
+
+
+@contextlib.contextmanager
+def timed(title=None):
+    # StageTimer for a whole script or step; prints its report when the block ends
+    timer = StageTimer()
+    try:
+        yield timer
+    finally:
+        timer.report(title)
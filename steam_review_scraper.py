@@ -0,0 +1,514 @@
+# steam_review_scraper.py
+# Usage: py steam_review_scraper.py                                   (every app in steam_apps.csv
+#                                                                      that is in "selected 50 games.txt")
+#        py steam_review_scraper.py --apps 1245620:"Elden Ring" 1086940:"Baldur's Gate 3"
+#        py steam_review_scraper.py --base-url http://127.0.0.1:8080     (e.g. a local stub server)
+#
+# Scrapes Steam reviews (the store's `appreviews` JSON cursor protocol) for many
+# apps at once on one asyncio event loop. All apps share a pooled HTTP client;
+# requests to each host go through a token bucket, so concurrency only fills the
+# time the one-app-at-a-time scrapers spent waiting, never exceeds the rate limit.
+# Failed requests (network errors, 429, 5xx, or a 200 whose body is not a valid
+# page: success != 1 or no reviews list) are retried with jittered backoff.
+# Each page is appended to OUTPUT_FOLDER/<game>.csv (or Parquet row groups) as it
+# arrives, and the cursor reached is checkpointed, so memory stays flat whatever
+# MAX_REVIEWS is and a run that dies at page 900 resumes there, not at page 1.
+# --refresh only fetches what is new since the last run: a sorted index of the
+# review IDs already saved (<game>.seen.npy) is checked page by page, newest first,
+# and paging stops at the first page that is entirely known.
+import io
+import os
+import csv
+import json
+import shutil
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from stage_timer import StageTimer
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except Exception:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+# CONFIG - update paths if needed
+STEAM_BASE_URL = "https://store.steampowered.com"
+OUTPUT_FOLDER = r"C:\Disertation\reviews\game reviews"
+APPS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "steam_apps.csv")   # app_id,game
+SELECTED_GAMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "selected 50 games.txt")
+MAX_REVIEWS = None         # per app; None = the full review history
+OUTPUT_FORMAT = "csv"      # "csv" -> <game>.csv, "parquet" -> <game>.parquet/part-*.parquet
+PARQUET_PAGES_PER_PART = 50   # pages (row groups) per Parquet part file
+REVIEWS_PER_PAGE = 100     # the most appreviews returns per request (default is 20)
+REQUESTS_PER_SECOND = 4.0  # per host, shared by every app being scraped
+BURST = 4                  # requests a host may get back to back after being idle
+CONCURRENT_APPS = 8
+MAX_CONNECTIONS = 8        # pooled keep-alive connections
+TIMEOUT = 30               # seconds per request
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0         # seconds; the retry delay is drawn from [0, BACKOFF_BASE * 2**attempt]
+BACKOFF_MAX = 60.0
+
+
+def _require_aiohttp():
+    if not AIOHTTP_AVAILABLE:
+        raise SystemExit("The Steam scraper needs aiohttp: pip install aiohttp")
+
+
+# ---------- Rate limiting ----------
+class TokenBucket:
+    # `rate` requests per second on average, up to `capacity` back to back
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()   # waiters are served in arrival order
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class HostRateLimiter:
+    # one TokenBucket per host name
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    async def acquire(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        await self.buckets[host].acquire()
+
+
+def backoff_delay(attempt, retry_after=None):
+    # "full jitter" exponential backoff; a server's Retry-After is a lower bound
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+class ScrapeError(Exception):
+    pass
+
+
+def page_error(data):
+    # why an appreviews 200 response is not a page (None if it is one); Steam reports
+    # failures as success != 1, and the end of the history as an empty reviews list
+    if not isinstance(data, dict):
+        return f"unexpected {type(data).__name__} body"
+    if data.get("success") != 1:
+        return f"success={data.get('success')!r}"
+    if not isinstance(data.get("reviews"), list):
+        return "no reviews list"
+    return None
+
+
+async def fetch_json(session, limiter, url, params, check=None):
+    # GET -> decoded JSON, retrying network errors, timeouts, 429, 5xx and 200s
+    # that `check` rejects (it returns the reason, or None for a good body)
+    error = retry_after = None
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt - 1, retry_after))
+        retry_after = None
+        await limiter.acquire(url)
+        try:
+            async with session.get(url, params=params) as resp:
+                if resp.status == 200:
+                    data = await resp.json(content_type=None)
+                    error = check(data) if check else None
+                    if error is None:
+                        return data
+                    error = f"HTTP 200 with {error}"
+                    continue
+                if resp.status != 429 and resp.status < 500:
+                    raise ScrapeError(f"HTTP {resp.status} for {resp.url}")
+                retry_after = resp.headers.get('Retry-After')
+                error = f"HTTP {resp.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+    raise ScrapeError(f"giving up on {url} after {MAX_RETRIES + 1} attempts ({error})")
+
+
+# ---------- Scraping ----------
+def review_row(r):
+    # one appreviews review -> output row
+    author = r.get("author", {})
+    return {
+        "recommendationid": r.get("recommendationid", ""),
+        "author": author.get("steamid", ""),
+        "review": r.get("review", ""),
+        "timestamp": r.get("timestamp_created", ""),
+        "voted_up": r.get("voted_up", ""),
+        "votes_up": r.get("votes_up", ""),
+        "votes_funny": r.get("votes_funny", ""),
+        "weighted_vote_score": r.get("weighted_vote_score", ""),
+        "playtime_forever": author.get("playtime_forever", ""),
+    }
+
+
+REVIEW_COLUMNS = list(review_row({}))
+
+
+# ---------- Streaming output & checkpoints ----------
+# <game>.checkpoint.json holds the cursor to continue from, the rows written up to
+# it and how much of the output they occupy (CSV bytes / closed Parquet parts).
+# It is rewritten after every committed page; a resumed run first cuts the output
+# back to that point, so a page is never written twice.
+def output_path(output_folder, game, fmt):
+    return os.path.join(output_folder, f"{game}.{fmt}")
+
+
+def checkpoint_path(output_folder, game):
+    return os.path.join(output_folder, f"{game}.checkpoint.json")
+
+
+def load_checkpoint(path, app_id, fmt):
+    # the last run's state for this app / format (finished or not), else None
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('app_id') != str(app_id) or state.get('format') != fmt:
+        return None
+    return state
+
+
+def save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)   # never leave a half-written checkpoint behind
+
+
+class CsvReviewWriter:
+    # appends pages to one CSV; every page is committed as soon as it is written
+    def __init__(self, path, position=None):
+        if position is not None and os.path.exists(path):
+            self.f = open(path, 'r+b')
+            self.f.truncate(position)   # drop anything written after the checkpoint
+            self.f.seek(position)
+        else:
+            self.f = open(path, 'wb')
+            self.f.write(self._encode([REVIEW_COLUMNS], bom=True))
+        self.size = self.f.tell()
+
+    @staticmethod
+    def _encode(rows, bom=False):
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator=os.linesep).writerows(rows)
+        return buf.getvalue().encode('utf-8-sig' if bom else 'utf-8')
+
+    def write(self, rows):
+        self.f.write(self._encode([[r[c] for c in REVIEW_COLUMNS] for r in rows]))
+        self.f.flush()
+        self.size = self.f.tell()
+        return True
+
+    def position(self):
+        return self.size
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetReviewWriter:
+    # pages become row groups of part-NNNNN.parquet files in a folder; a part (and
+    # the pages in it) is committed when it is closed, every PARQUET_PAGES_PER_PART pages
+    SCHEMA_TYPES = {'recommendationid': 'int64', 'author': 'string', 'review': 'string', 'timestamp': 'int64', 'voted_up': 'bool',
+                    'votes_up': 'int64', 'votes_funny': 'int64', 'weighted_vote_score': 'float64',
+                    'playtime_forever': 'int64'}
+
+    def __init__(self, path, position=None):
+        if not PYARROW_AVAILABLE:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        if position is None and os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+        self.parts = position or 0
+        for fn in os.listdir(path):   # parts left open by a crashed run
+            if fn.startswith('part-') and int(fn[5:10]) >= self.parts:
+                os.remove(os.path.join(path, fn))
+        self.schema = pa.schema([(c, pa.type_for_alias(t)) for c, t in self.SCHEMA_TYPES.items()])
+        self.writer = None
+        self.pages = 0
+
+    def _table(self, rows):
+        df = pd.DataFrame(rows, columns=REVIEW_COLUMNS)
+        for c, t in self.SCHEMA_TYPES.items():
+            if t in ('int64', 'float64'):
+                df[c] = pd.to_numeric(df[c], errors='coerce').astype('Int64' if t == 'int64' else 'float64')
+            elif t == 'bool':
+                df[c] = df[c].map({True: True, False: False}).astype('boolean')
+            else:
+                df[c] = df[c].astype(object).where(df[c].notna(), None)
+        return pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+
+    def write(self, rows):
+        if self.writer is None:
+            part = os.path.join(self.path, f"part-{self.parts:05d}.parquet")
+            self.writer = pq.ParquetWriter(part, self.schema)
+        self.writer.write_table(self._table(rows))
+        self.pages += 1
+        if self.pages >= PARQUET_PAGES_PER_PART:
+            self.close()
+            return True
+        return False
+
+    def position(self):
+        return self.parts
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.parts += 1
+            self.pages = 0
+
+
+def open_writer(fmt, path, position=None):
+    if fmt == 'csv':
+        return CsvReviewWriter(path, position)
+    if fmt == 'parquet':
+        return ParquetReviewWriter(path, position)
+    raise ValueError(f"unknown output format {fmt!r}")
+
+
+# ---------- Seen-ID index (delta refresh) ----------
+# A sorted int64 array of every recommendationid in the output, saved when a run
+# finishes. It is only trusted if the last run finished; otherwise it is rebuilt
+# from the output's recommendationid column.
+def index_path(output_folder, game):
+    return os.path.join(output_folder, f"{game}.seen.npy")
+
+
+def output_has_ids(path, fmt):
+    # older outputs were written without recommendationid and cannot be refreshed
+    if fmt == 'csv':
+        columns = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    else:
+        parts = sorted(fn for fn in os.listdir(path) if fn.startswith('part-'))
+        columns = pq.read_schema(os.path.join(path, parts[0])).names if parts else REVIEW_COLUMNS
+    return 'recommendationid' in columns
+
+
+def read_output_ids(path, fmt):
+    if fmt == 'csv':
+        ids = pd.read_csv(path, usecols=['recommendationid'], encoding='utf-8-sig')['recommendationid']
+    else:
+        ids = pd.read_parquet(path, columns=['recommendationid'])['recommendationid']
+    return np.unique(ids.dropna().to_numpy(dtype=np.int64))
+
+
+def load_seen_ids(path, output, fmt, trusted):
+    if trusted and os.path.exists(path):
+        return np.load(path)
+    return read_output_ids(output, fmt)
+
+
+def save_seen_ids(path, ids):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, ids)
+    os.replace(tmp, path)
+
+
+def known_ids(ids, seen):
+    # boolean mask: which of `ids` are in the sorted array `seen`
+    pos = np.minimum(np.searchsorted(seen, ids), max(len(seen) - 1, 0))
+    return seen[pos] == ids if len(seen) else np.zeros(len(ids), dtype=bool)
+
+
+async def scrape_app(session, limiter, app_id, game, max_reviews=MAX_REVIEWS, base_url=STEAM_BASE_URL,
+                     output_folder=None, fmt=OUTPUT_FORMAT, refresh=False):
+    # page through one app's reviews (newest first), streaming each page to disk and
+    # checkpointing the cursor; resumes an unfinished earlier run. With refresh, only
+    # reviews missing from the existing output are fetched and appended -> rows written
+    output_folder = output_folder or OUTPUT_FOLDER
+    out = output_path(output_folder, game, fmt)
+    ckpt = checkpoint_path(output_folder, game)
+    index = index_path(output_folder, game)
+    state = load_checkpoint(ckpt, app_id, fmt) if os.path.exists(out) else None
+    if state and not await asyncio.to_thread(output_has_ids, out, fmt):
+        print(f"⚠️ {game}: {out} has no recommendationid column, scraping it again")
+        state = None
+    trusted = bool(state and state['done'])
+    if state and not state['done']:
+        refresh = state.get('refresh', False)   # finish the interrupted run first
+        print(f"↪️ {game}: resuming after {state['rows']} reviews")
+    elif state and refresh:
+        state = dict(state, cursor='*', rows=0, done=False, refresh=True)   # append after the old rows
+    else:
+        if refresh:
+            print(f"⚠️ {game}: nothing to refresh yet, scraping the full history")
+            refresh = False
+        state = {'app_id': str(app_id), 'format': fmt, 'cursor': '*', 'rows': 0, 'position': None,
+                 'done': False, 'refresh': False}
+    writer = await asyncio.to_thread(open_writer, fmt, out, state['position'])
+    pending = {'cursor': state['cursor'], 'rows': state['rows']}   # written, maybe not yet committed
+    seen = base = None
+    if refresh:
+        # seen: every ID in the output; base: the IDs it had before this refresh began
+        # (the saved index, untouched until a refresh finishes). Only a page made of
+        # base IDs ends the refresh: pages shift as new reviews arrive, so a resumed
+        # refresh may well see reviews it wrote itself before reaching the old ones.
+        seen = await asyncio.to_thread(load_seen_ids, index, out, fmt, trusted)
+        base = seen if trusted or not os.path.exists(index) else await asyncio.to_thread(np.load, index)
+
+    def commit(done=False):
+        state.update(pending, position=writer.position(), done=done)
+        if done:   # the index is written before the checkpoint that vouches for it
+            save_seen_ids(index, seen if seen is not None else read_output_ids(out, fmt))
+        save_checkpoint(ckpt, state)
+
+    url = f"{base_url.rstrip('/')}/appreviews/{app_id}"
+    params = {"json": 1, "filter": "recent", "language": "english",
+              "day_range": "9223372036854775807", "review_type": "all", "purchase_type": "all",
+              "num_per_page": REVIEWS_PER_PAGE}
+    done = False
+    try:
+        while max_reviews is None or pending['rows'] < max_reviews:
+            params["cursor"] = pending['cursor']   # the client URL-encodes it ('+' -> %2B)
+            data = await fetch_json(session, limiter, url, params, check=page_error)
+            reviews = data["reviews"]
+            if max_reviews is not None:
+                reviews = reviews[:max_reviews - pending['rows']]
+            if not reviews:
+                break
+            rows = [review_row(r) for r in reviews]
+            if seen is not None:
+                ids = np.array([r["recommendationid"] for r in rows], dtype=np.int64)
+                if known_ids(ids, base).all():
+                    break   # a whole page saved by an earlier run: everything older is saved too
+                new = ~known_ids(ids, seen)
+                rows = [r for r, is_new in zip(rows, new) if is_new]
+                seen = np.union1d(seen, ids)
+            committed = await asyncio.to_thread(writer.write, rows)
+            cursor = data.get("cursor")
+            pending['rows'] += len(rows)
+            pending['cursor'] = cursor
+            if not cursor or cursor == params["cursor"]:   # the last page repeats its cursor
+                break
+            if committed:
+                await asyncio.to_thread(commit)
+        done = True
+    finally:
+        # a failed run still commits what it wrote cleanly; the checkpoint says where to go on
+        await asyncio.to_thread(writer.close)
+        await asyncio.to_thread(commit, done)
+    return pending['rows']
+
+
+async def scrape_apps(apps, max_reviews=MAX_REVIEWS, base_url=STEAM_BASE_URL, output_folder=None,
+                      concurrent_apps=CONCURRENT_APPS, rate=REQUESTS_PER_SECOND, burst=BURST, fmt=OUTPUT_FORMAT,
+                      refresh=False):
+    # scrape (app_id, game) pairs concurrently -> {game: rows written, or the exception}
+    _require_aiohttp()
+    output_folder = output_folder or OUTPUT_FOLDER
+    os.makedirs(output_folder, exist_ok=True)
+    limiter = HostRateLimiter(rate, burst)
+    slots = asyncio.Semaphore(concurrent_apps)
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def one(app_id, game):
+            async with slots:
+                print(f"⏳ Scraping Steam reviews for {game} ({app_id}) ...")
+                rows = await scrape_app(session, limiter, app_id, game, max_reviews, base_url, output_folder, fmt,
+                                        refresh)
+                print(f"✅ {game}: {rows} {'new ' if refresh else ''}reviews -> {output_path(output_folder, game, fmt)}")
+                return rows
+
+        results = await asyncio.gather(*(one(a, g) for a, g in apps), return_exceptions=True)
+    return {game: res for (_, game), res in zip(apps, results)}
+
+
+# ---------- App lists ----------
+def selected_games(path=None):
+    # lower-cased game names ticked in "selected 50 games.txt"
+    path = path or SELECTED_GAMES_FILE
+    with open(path, encoding="utf-8") as f:
+        return {line.split("✔", 1)[1].strip().lower() for line in f if "✔" in line}
+
+
+def load_apps(path=None, selected=None):
+    # (app_id, game) pairs from the apps CSV, optionally only games in `selected`
+    path = path or APPS_FILE
+    with open(path, encoding="utf-8", newline="") as f:
+        apps = [(row["app_id"].strip(), row["game"].strip()) for row in csv.DictReader(f)]
+    if selected is not None:
+        apps = [(a, g) for a, g in apps if g.lower() in selected]
+    return apps
+
+
+def parse_app(value):
+    # "1245620:Elden Ring" -> ("1245620", "Elden Ring")
+    app_id, sep, game = value.partition(":")
+    if not sep or not app_id.strip().isdigit() or not game.strip():
+        raise argparse.ArgumentTypeError(f"expected APP_ID:GAME, got {value!r}")
+    return app_id.strip(), game.strip()
+
+
+def main():
+    _require_aiohttp()
+    parser = argparse.ArgumentParser(description="Scrape Steam reviews for many apps concurrently.")
+    parser.add_argument('--apps', nargs='+', type=parse_app, metavar='APP_ID:GAME',
+                        help="apps to scrape (default: steam_apps.csv filtered by the selected games list)")
+    parser.add_argument('--max-reviews', type=int, default=MAX_REVIEWS, help="per app (default: full history)")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=OUTPUT_FORMAT)
+    parser.add_argument('--refresh', action='store_true',
+                        help="only fetch reviews newer than the saved ones and append them")
+    parser.add_argument('--rate', type=float, default=REQUESTS_PER_SECOND, help="requests per second per host")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENT_APPS, help="apps scraped at once")
+    parser.add_argument('--base-url', default=STEAM_BASE_URL)
+    parser.add_argument('--output', default=OUTPUT_FOLDER, help="folder for the per-game CSVs")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    with timer.stage('load apps'):
+        apps = args.apps or load_apps(selected=selected_games())
+    with timer.stage('scrape'):
+        results = asyncio.run(scrape_apps(apps, args.max_reviews, args.base_url, args.output,
+                                          args.concurrency, args.rate, fmt=args.format,
+                                          refresh=args.refresh))
+    failed = {g: e for g, e in results.items() if isinstance(e, BaseException)}
+    for game, e in failed.items():
+        print(f"❌ {game}: {e}")
+    reviews = sum(n for n in results.values() if isinstance(n, int))
+    print(f"\n🎉 DONE! {len(results) - len(failed)}/{len(results)} apps, {reviews} reviews")
+    timer.report("steam_review_scraper", rows=reviews)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# steam_stub_server.py
+# Local stand-in for the Steam store's `appreviews` endpoint, for testing
+# steam_review_scraper.py without the network (and without Steam's rate limit):
+#   python steam_stub_server.py --port 8080 --reviews 1000
+#   python steam_review_scraper.py --base-url http://127.0.0.1:8080 --apps 10:"Test Game" --output out
+#
+# Speaks the cursor protocol the scraper relies on: GET /appreviews/<app_id>?json=1
+# &cursor=*&num_per_page=N returns {"success": 1, "reviews": [...], "cursor": "..."},
+# newest review first. Cursors are opaque and contain '+' / '=' like Steam's, so a
+# client that does not URL-encode them gets the wrong page. Past the last review
+# the reviews list is empty and the cursor is repeated.
+# `faults` makes it misbehave: a list of responses served (in order) instead of the
+# real ones - an HTTP status (429 / 5xx, with Retry-After: 0 on 429) or "bad" for a
+# 200 with success=2. `fail_after` answers 500 to every request once that many
+# pages were served. Every request is logged (time, app, cursor, status).
+import time
+import argparse
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except Exception:
+    AIOHTTP_AVAILABLE = False
+
+# CONFIG
+FIRST_ID = 10 ** 8
+FIRST_TIMESTAMP = 1700000000   # newest review; older ones are an hour apart
+
+
+def make_review(app_id, i):
+    # review i of an app, 0 = newest
+    return {
+        "recommendationid": str(FIRST_ID * int(app_id) - i),
+        "author": {"steamid": str(76561197960265728 + i), "playtime_forever": 60 * (i % 50)},
+        "review": f"review {i} of app {app_id}: good fun!" if i % 3 else f"review {i}: buggy, laggy?",
+        "timestamp_created": FIRST_TIMESTAMP - 3600 * i,
+        "voted_up": i % 3 != 0,
+        "votes_up": i % 7,
+        "votes_funny": i % 2,
+        "weighted_vote_score": "0.5",
+    }
+
+
+def encode_cursor(offset):
+    return f"AoJ+{offset:x}/w=="
+
+
+def decode_cursor(cursor):
+    if cursor == "*":
+        return 0
+    if not (cursor.startswith("AoJ+") and cursor.endswith("/w==")):
+        raise ValueError(cursor)
+    return int(cursor[4:-4], 16)
+
+
+class StubSteam:
+    # reviews: {app_id: number of reviews}
+    def __init__(self, reviews, faults=None, fail_after=None):
+        self.reviews = {str(a): n for a, n in reviews.items()}
+        self.faults = list(faults or [])
+        self.fail_after = fail_after
+        self.served = 0
+        self.log = []   # (monotonic time, app_id, cursor, status)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/appreviews/{app_id}', self.appreviews)
+        return app
+
+    async def appreviews(self, request):
+        app_id = request.match_info['app_id']
+        cursor = request.query.get('cursor', '*')
+        status = 200
+        if self.faults:
+            status = self.faults.pop(0)
+        elif self.fail_after is not None and self.served >= self.fail_after:
+            status = 500
+        self.log.append((time.monotonic(), app_id, cursor, status))
+        if status == "bad":
+            return web.json_response({"success": 2})
+        if status != 200:
+            return web.Response(status=status, headers={'Retry-After': '0'} if status == 429 else None)
+        if app_id not in self.reviews:
+            return web.json_response({"success": 2})
+        try:
+            offset = decode_cursor(cursor)
+        except ValueError:
+            return web.Response(status=400, text=f"bad cursor {cursor!r}")
+        size = int(request.query.get('num_per_page', 20))
+        end = min(offset + size, self.reviews[app_id])
+        page = [make_review(app_id, i) for i in range(offset, end)]
+        self.served += 1
+        return web.json_response({
+            "success": 1,
+            "query_summary": {"num_reviews": len(page)},
+            "reviews": page,
+            "cursor": encode_cursor(end) if page else cursor,
+        })
+
+
+async def start(stub, host="127.0.0.1", port=0):
+    # run the stub in the current event loop -> (runner, base URL); runner.cleanup() stops it
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+
+def main():
+    if not AIOHTTP_AVAILABLE:
+        raise SystemExit("The stub server needs aiohttp: pip install aiohttp")
+    parser = argparse.ArgumentParser(description="Serve fake Steam appreviews pages locally.")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--reviews', type=int, default=1000, help="reviews per app")
+    parser.add_argument('--apps', nargs='+', default=["10"], help="app ids to serve")
+    parser.add_argument('--faults', nargs='*', default=[],
+                        help="responses to serve first, e.g. 429 503 bad")
+    args = parser.parse_args()
+    faults = [f if f == "bad" else int(f) for f in args.faults]
+    stub = StubSteam({a: args.reviews for a in args.apps}, faults)
+    print(f"Serving {args.reviews} reviews for app(s) {', '.join(args.apps)} on http://127.0.0.1:{args.port}")
+    web.run_app(stub.app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# synthetic_data.py
+# Deterministic synthetic data for benchmarks (the real reviews are not in the repo).
+#
+# Review corpus: one CSV per game, like the files in "game reviews":
+#   Steam-style  recommendationid, author, review, timestamp (epoch seconds), voted_up, ...  no score
+#   Play-style   reviewId, userName, content, score (1-5), thumbsUpCount, at (ISO date)
+# Files rotate through ',', ';' and '\t' delimiters and utf-8-sig / latin1 encodings
+# (latin1 files get accented words instead of emojis). Review texts are built from
+# the sentiment lexicon's words, filler words, emojis and '!' / '?', so every scorer
+# path is exercised. Rows are written in blocks, so 50M rows need no more memory than 10k;
+# the same (rows, games, seed) always gives byte-identical files.
+#   python synthetic_data.py --rows 1000000 --out <folder>
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from sentiment_lexicon import LEXICON_FILE
+
+# CONFIG
+OUT_DIR = r"C:\Disertation\benchmarks\corpus"
+N_GAMES = 50
+SEED = 2024
+BLOCK_ROWS = 200000
+FIRST_MONTH, LAST_MONTH = "2019-01", "2024-12"
+GAMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "selected 50 games.txt")
+FILLER = ["the", "game", "is", "and", "it", "really", "with", "my", "friends", "after", "update",
+          "graphics", "story", "servers", "price", "hours", "played", "this", "was", "but", "so", "very"]
+ACCENTED = ["très", "jeu", "génial", "déçu", "fantástico", "señor", "café", "naïve", "über", "ça"]
+SEPARATORS = [',', ';', '\t']
+ENCODINGS = ['utf-8-sig', 'latin1']
+
+
+def game_names(n_games):
+    names = []
+    if os.path.exists(GAMES_FILE):
+        with open(GAMES_FILE, encoding='utf-8') as f:
+            names = [line.split('✔', 1)[1].strip() for line in f if '✔' in line]
+    return (names + [f"game {i}" for i in range(len(names), n_games)])[:n_games]
+
+
+def rows_per_game(n_rows, n_games):
+    # popular games get more reviews (Zipf-like); counts add up to n_rows
+    w = 1 / np.arange(1, n_games + 1) ** 0.8
+    counts = np.floor(w / w.sum() * n_rows).astype(np.int64)
+    counts[:n_rows - counts.sum()] += 1
+    return counts
+
+
+def file_format(i):
+    # game i -> (style, separator, encoding); every combination appears among 12 games
+    return ('steam' if i % 2 == 0 else 'play'), SEPARATORS[i % 3], ENCODINGS[(i // 6) % 2]
+
+
+def phrase_pool(rng, encoding, size=4096):
+    # short phrases the review texts are glued together from
+    with open(LEXICON_FILE, encoding='utf-8') as f:
+        lex = json.load(f)
+    words = sorted(set(lex['review_score']['words']) | set(lex['keyword_estimate']['words']))
+    words += FILLER * 4 + (ACCENTED if encoding == 'latin1' else [])
+    emojis = [] if encoding == 'latin1' else sorted(lex['review_score']['emojis'])
+    words = np.array(words, dtype=object)
+    lengths = rng.integers(2, 8, size=size)
+    picks = np.split(rng.integers(0, len(words), size=lengths.sum()), np.cumsum(lengths)[:-1])
+    kind = rng.random(size)
+    marks = rng.integers(1, 4, size=size)
+    emoji = rng.integers(0, max(1, len(emojis)), size=size)
+    pool = []
+    for i, p in enumerate(picks):
+        text = " ".join(words[p])
+        if kind[i] < 0.15:
+            text = text.capitalize() + "!" * int(marks[i])
+        elif kind[i] < 0.2:
+            text += "?"
+        elif kind[i] < 0.3 and emojis:
+            text += " " + emojis[emoji[i]]
+        pool.append(text)
+    return np.array(pool, dtype=object)
+
+
+def review_block(rng, pool, style, n, months):
+    # n rows of one game's file
+    idx = rng.integers(0, len(pool), size=(3, n))
+    text = pool[idx[0]] + " " + pool[idx[1]]
+    long = rng.random(n) < 0.3
+    text[long] = text[long] + ". " + pool[idx[2][long]]
+    month = rng.integers(0, months, size=n)
+    secs = (np.datetime64(FIRST_MONTH, 's') + month.astype('timedelta64[M]').astype('timedelta64[s]')
+            + rng.integers(0, 28 * 86400, size=n).astype('timedelta64[s]'))
+    if style == 'steam':
+        return pd.DataFrame({
+            'recommendationid': rng.integers(10 ** 8, 10 ** 9, size=n), 'author': rng.integers(7 * 10 ** 16, 8 * 10 ** 16, size=n),
+            'review': text, 'timestamp': secs.astype(np.int64), 'voted_up': rng.random(n) < 0.75,
+            'votes_up': rng.poisson(2, n), 'votes_funny': rng.poisson(0.3, n),
+            'weighted_vote_score': rng.random(n).round(6), 'playtime_forever': rng.integers(0, 50000, size=n)})
+    return pd.DataFrame({
+        'reviewId': rng.integers(10 ** 8, 10 ** 9, size=n).astype(str), 'userName': "user",
+        'content': text, 'score': rng.integers(1, 6, size=n), 'thumbsUpCount': rng.poisson(1, n),
+        'at': np.datetime_as_string(secs, unit='s')})
+
+
+def generate_corpus(out_dir=OUT_DIR, n_rows=10000, n_games=N_GAMES, seed=SEED, block_rows=BLOCK_ROWS):
+    # write the corpus (unless the same one is already there) -> manifest dict, also
+    # saved as corpus.json: per file its game, rows, separator, encoding and columns
+    manifest_path = os.path.join(out_dir, "corpus.json")
+    params = {'rows': int(n_rows), 'games': int(n_games), 'seed': int(seed)}
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['params'] == params:
+            return manifest
+    except (OSError, ValueError, KeyError):
+        pass
+    os.makedirs(out_dir, exist_ok=True)
+    months = (pd.Period(LAST_MONTH, 'M') - pd.Period(FIRST_MONTH, 'M')).n + 1
+    files = []
+    for i, (game, n) in enumerate(zip(game_names(n_games), rows_per_game(n_rows, n_games))):
+        style, sep, enc = file_format(i)
+        rng = np.random.default_rng([seed, i])
+        pool = phrase_pool(rng, enc)
+        path = os.path.join(out_dir, f"{game}.csv")
+        with open(path, 'w', encoding=enc, newline='') as f:
+            for start in range(0, max(n, 1), block_rows):   # n == 0: header only
+                block = review_block(rng, pool, style, int(min(block_rows, n - start)), months)
+                block.to_csv(f, sep=sep, index=False, header=start == 0)
+        files.append({'file': os.path.basename(path), 'game': game, 'rows': int(n), 'style': style,
+                      'sep': sep, 'encoding': enc, 'text': 'review' if style == 'steam' else 'content',
+                      'score': None if style == 'steam' else 'score'})
+    manifest = {'params': params, 'files': files}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    return manifest
+
+
+def iter_texts(manifest, out_dir=OUT_DIR, limit=None, chunksize=BLOCK_ROWS):
+    # (texts, scores or None) chunks from a generated corpus, at most `limit` rows
+    left = limit
+    for entry in manifest['files']:
+        cols = [entry['text']] + ([entry['score']] if entry['score'] else [])
+        reader = pd.read_csv(os.path.join(out_dir, entry['file']), sep=entry['sep'], encoding=entry['encoding'],
+                             usecols=cols, dtype={entry['text']: str}, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            if left is not None:
+                chunk = chunk.iloc[:left]
+                left -= len(chunk)
+            yield chunk[entry['text']], chunk[entry['score']] if entry['score'] else None
+            if left is not None and left <= 0:
+                return
+
+
+# ---------- Monthly panel ----------
+def synthetic_panel(n_rows=3600, n_months=72, seed=SEED):
+    # (game, month) fact table shaped like FINAL_with_Dominance_MONTHLY.csv, about n_rows rows
+    rng = np.random.default_rng(seed)
+    n_games = max(1, -(-n_rows // n_months))
+    names = game_names(n_games)
+    months = pd.period_range(FIRST_MONTH, periods=n_months, freq='M').astype(str)
+    game = np.repeat(np.arange(n_games), n_months)
+    size = rng.lognormal(2, 1, n_games)[game]
+    users = size * np.exp(np.cumsum(rng.normal(0, 0.05, n_games * n_months).reshape(n_games, -1), 1).ravel())
+    df = pd.DataFrame({
+        'game_norm': np.array(names, dtype=object)[game], 'year_month': np.tile(months, n_games),
+        'Company': np.array([f"Company {i}" for i in range(max(1, n_games // 3))], dtype=object)[game % max(1, n_games // 3)],
+        'avg_sentiment': rng.uniform(3, 9, len(game)), 'Monthly_Active_Users_Millions': users,
+        'Monthly_Revenue_USD_Millions': users * rng.uniform(0.2, 0.6, len(game)),
+        'Dominance': rng.uniform(0, 1, len(game))})
+    return df.iloc[:n_rows].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic review corpus.")
+    parser.add_argument('--rows', type=int, default=10000, help="total review rows (10k .. 50M)")
+    parser.add_argument('--games', type=int, default=N_GAMES)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--out', default=OUT_DIR)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.out, args.rows, args.games, args.seed)
+    print(f"{sum(f['rows'] for f in manifest['files'])} rows in {len(manifest['files'])} files -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# test_steam_review_scraper.py
+# steam_review_scraper.py against the local appreviews stub (steam_stub_server.py):
+# cursor paging, retries with backoff on 429 / 5xx / bad 200 bodies, the per-host
+# token bucket, and resuming from the checkpoint after a failed run.
+#   python -m pytest -q test_steam_review_scraper.py
+import json
+import time
+import asyncio
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import steam_review_scraper as scraper
+from steam_stub_server import StubSteam, start, make_review, encode_cursor
+
+APP, GAME = "10", "Test Game"
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(scraper, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(scraper, "REVIEWS_PER_PAGE", 100)
+
+
+def run(stub, tmp_path, **kwargs):
+    # scrape APP from the stub -> {game: rows or exception}
+    async def go():
+        runner, base_url = await start(stub)
+        try:
+            return await scraper.scrape_apps([(APP, GAME)], base_url=base_url, output_folder=str(tmp_path),
+                                             **{'rate': 1000.0, 'burst': 100, **kwargs})
+        finally:
+            await runner.cleanup()
+    return asyncio.run(go())
+
+
+def saved(tmp_path):
+    return pd.read_csv(tmp_path / f"{GAME}.csv", encoding="utf-8-sig", dtype={'recommendationid': str})
+
+
+def checkpoint(tmp_path):
+    with open(tmp_path / f"{GAME}.checkpoint.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_cursor_paging(tmp_path):
+    stub = StubSteam({APP: 250})
+    assert run(stub, tmp_path) == {GAME: 250}
+    df = saved(tmp_path)
+    assert df['recommendationid'].tolist() == [make_review(APP, i)["recommendationid"] for i in range(250)]
+    # '*', then the cursor of every page (sent URL-encoded, '+' intact), then the repeated last one
+    assert [c for _, _, c, _ in stub.log] == ["*", encode_cursor(100), encode_cursor(200), encode_cursor(250)]
+    assert checkpoint(tmp_path)['done'] and checkpoint(tmp_path)['rows'] == 250
+
+
+def test_retries_429_5xx_and_bad_pages(tmp_path):
+    stub = StubSteam({APP: 150}, faults=[429, 503, "bad", 500])
+    assert run(stub, tmp_path) == {GAME: 150}
+    assert [s for _, _, _, s in stub.log] == [429, 503, "bad", 500, 200, 200, 200]
+    assert saved(tmp_path)['recommendationid'].is_unique
+
+
+def test_gives_up_after_max_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "MAX_RETRIES", 2)
+    stub = StubSteam({APP: 150}, faults=["bad"] * 3)
+    result = run(stub, tmp_path)[GAME]
+    assert isinstance(result, scraper.ScrapeError) and "success=2" in str(result)
+    assert len(stub.log) == 3 and not checkpoint(tmp_path)['done']
+
+
+def test_token_bucket_rate_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "REVIEWS_PER_PAGE", 10)
+    rate, burst = 20.0, 2
+    stub = StubSteam({APP: 100})
+    start_time = time.monotonic()
+    assert run(stub, tmp_path, rate=rate, burst=burst) == {GAME: 100}
+    times = [t for t, _, _, _ in stub.log]
+    assert len(times) == 11
+    # never more than burst + rate * window requests in any window
+    for i in range(len(times)):
+        for j in range(i + 1, len(times)):
+            assert j - i + 1 <= burst + rate * (times[j] - times[i]) + 1e-6
+    assert time.monotonic() - start_time >= (len(times) - burst) / rate * 0.95
+
+
+def test_resume_from_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper, "MAX_RETRIES", 1)
+    monkeypatch.setattr(scraper, "REVIEWS_PER_PAGE", 50)
+    failing = StubSteam({APP: 180}, fail_after=2)
+    result = run(failing, tmp_path)[GAME]
+    assert isinstance(result, scraper.ScrapeError)
+    state = checkpoint(tmp_path)
+    assert not state['done'] and state['rows'] == 100 and state['cursor'] == encode_cursor(100)
+
+    healthy = StubSteam({APP: 180})
+    assert run(healthy, tmp_path) == {GAME: 180}
+    assert healthy.log[0][2] == encode_cursor(100)   # picked up where the failed run stopped
+    df = saved(tmp_path)
+    assert df['recommendationid'].tolist() == [make_review(APP, i)["recommendationid"] for i in range(180)]
+    assert checkpoint(tmp_path)['done'] and checkpoint(tmp_path)['rows'] == 180